@@ -1,16 +1,37 @@
+import asyncio
 import json
 import base64
-from typing import Optional
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional, Tuple
 
-import firebase_admin
-from firebase_admin import auth, credentials
-from fastapi import Header, HTTPException, status
+import structlog
+from fastapi import Depends, Header, HTTPException, status
 
+from core.admission import Overloaded, user_quota
 from core.config import settings
+from core.singleflight import SingleFlight
+
+log = structlog.get_logger(__name__)
+
+# firebase_admin is imported on first use (start_auth at startup, or the first
+# request that misses the token cache): it is slow to import and unused by
+# anything else.
+
+
+def _firebase_ready() -> bool:
+    import firebase_admin
+
+    return bool(firebase_admin._apps)
 
 
 def _init_firebase() -> None:
     """Initialize the Firebase app if it hasn't been already."""
+    import firebase_admin
+    from firebase_admin import credentials
+
     if not firebase_admin._apps:
         raw = settings.firebase_service_account_json
         if not raw:
@@ -23,6 +44,107 @@ def _init_firebase() -> None:
         firebase_admin.initialize_app(cred)
 
 
+class TokenCache:
+    """
+    Verified ID tokens keyed by SHA-256 of the token, never past the token's `exp`.
+
+    Entries also expire after `max_ttl` seconds so a disabled account stops
+    being served from cache within that window.
+    """
+
+    def __init__(self, max_entries: int, max_ttl: float, skew: float = 30.0) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_ttl = max_ttl
+        self.skew = skew
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, uid: str, exp: float) -> None:
+        expires_at = min(exp - self.skew, time.time() + self.max_ttl)
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._data[key] = (expires_at, uid)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+token_cache = TokenCache(settings.auth_cache_max_entries, settings.auth_cache_max_ttl)
+_verify_flight: SingleFlight[dict] = SingleFlight("auth")
+_cert_refresh_task: Optional[asyncio.Task] = None
+
+
+def _prefetch_certs() -> None:
+    """
+    Fetch ID-token signing certs through the SDK's own HTTP session, which caches
+    them per Cache-Control, so request-path verification finds them fresh.
+    """
+    import firebase_admin
+    from firebase_admin import auth
+    from firebase_admin._token_gen import ID_TOKEN_CERT_URI
+
+    client = auth._get_client(firebase_admin.get_app())
+    client._token_verifier.request(url=ID_TOKEN_CERT_URI, method="GET")
+
+
+async def _refresh_certs_forever() -> None:
+    while True:
+        await asyncio.sleep(settings.auth_cert_refresh_seconds)
+        try:
+            await asyncio.to_thread(_prefetch_certs)
+        except Exception as e:
+            log.warning("auth.cert_refresh_failed", error=str(e))
+
+
+async def start_auth() -> bool:
+    """Initialize Firebase, warm the cert cache and keep it fresh in the background.
+
+    Returns False (after logging why) if Firebase could not be set up; requests
+    then retry the initialization themselves."""
+    global _cert_refresh_task
+    try:
+        await asyncio.to_thread(_init_firebase)
+        await asyncio.to_thread(_prefetch_certs)
+    except Exception as e:
+        log.warning("auth.startup_failed", error=str(e))
+        return False
+    if settings.auth_cert_refresh_seconds > 0 and _cert_refresh_task is None:
+        _cert_refresh_task = asyncio.create_task(_refresh_certs_forever())
+    return True
+
+
+async def stop_auth() -> None:
+    global _cert_refresh_task
+    if _cert_refresh_task is not None:
+        _cert_refresh_task.cancel()
+        _cert_refresh_task = None
+
+
 async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
     """Validate the Authorization header and return the user's UID."""
     if not authorization or not authorization.startswith("Bearer "):
@@ -31,11 +153,20 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
             detail="Missing or invalid Authorization header",
         )
 
-    _init_firebase()
-
     token = authorization.split(" ", 1)[1]
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    uid = token_cache.get(key)
+    if uid:
+        return uid
+
+    if not _firebase_ready():
+        await asyncio.to_thread(_init_firebase)
+    from firebase_admin import auth
+
     try:
-        decoded = auth.verify_id_token(token)
+        decoded = await _verify_flight.do(
+            key, lambda: asyncio.to_thread(auth.verify_id_token, token)
+        )
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,4 +178,24 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
+    token_cache.set(key, uid, float(decoded.get("exp", 0)))
     return uid
+
+
+async def admitted_user(uid: str = Depends(get_current_user)) -> AsyncIterator[str]:
+    """
+    `get_current_user` plus the per-user quota; 429 when the user is over it.
+    Not for streaming endpoints, whose body outlives this cleanup.
+    """
+    try:
+        user_quota.acquire(uid)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        ) from None
+    try:
+        yield uid
+    finally:
+        user_quota.release(uid)
@@ -1,28 +1,118 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
 from fastapi import APIRouter, UploadFile, File, HTTPException, status, Request, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 from core.schemas import (
+    BatchImageItemResult,
+    BatchImageSolveResponse,
+    BatchItemResult,
+    BatchSolveRequest,
+    BatchSolveResponse,
+    BoundingBox,
+    ImageProblemResult,
+    ImageProblemsResponse,
+    JobAccepted,
+    JobStatus,
     TextSolveRequest,
     SolveResponse,
     ImageSolveResponse,
     Step,
     ModelInfo,
+    TimingSpan,
 )
-from reasoner.graph import get_workflow
+from reasoner.batch import packable, solve_packed
+from reasoner.graph import get_workflow, _guess_task
+from reasoner.fastpath import FAST_PATH_TASKS
+from reasoner.verify import parse_question, verify_answer
+from reasoner.cache import image_cache, solution_cache, solution_cache_key
+from providers.model_factory import models
 from providers.vision import solve_image_json
 from utils.image_ocr import extract_text
-from api.deps import get_current_user
+from utils.image_prep import InvalidImage, PreparedImage, prepare_image
+from utils.image_segment import Region, segment
+from api.deps import admitted_user, get_current_user
+from api.uploads import read_upload
+from core.admission import Overloaded, user_quota
+from core.config import settings
+from core.executor import ExecutorBusy
+from core.jobs import JobFailed, JobRejected, job_queue
+from core.metrics import STREAM_FIRST_STEP_SECONDS, trace
+from core.streaming import (
+    EventSink,
+    current_sink,
+    emit,
+    event_sink,
+    format_ndjson,
+    format_sse,
+)
+from core.singleflight import SingleFlight
 import structlog
-import io
-import os
-from PIL import Image, UnidentifiedImageError
+import asyncio
+import contextlib
+import hashlib
+import time
 
 log = structlog.get_logger(__name__)
 
 router = APIRouter()
 
+# Identical questions / images arriving together share one solve.
+text_flight: SingleFlight[SolveResponse] = SingleFlight("solve_text")
+image_flight: SingleFlight[ImageSolveResponse] = SingleFlight("solve_image")
+
+
+def _timing(spans: list, t0: float) -> list[TimingSpan]:
+    out = [TimingSpan(**s) for s in spans]
+    out.append(TimingSpan(name="total", seconds=round(time.perf_counter() - t0, 6)))
+    return out
+
+
+async def _solve_question(question: str, level: str, locale: str) -> SolveResponse:
+    """Run the reasoner graph on a question, going through the solution cache."""
+    key = solution_cache_key(question, level, locale)
+    if solution_cache is not None:
+        cached = await solution_cache.get(key)
+        if cached is not None:
+            log.debug("solve_cache.hit", key=key[:12])
+            return SolveResponse(**cached)
+    return await text_flight.do(
+        key, lambda: _run_workflow(key, question, level, locale)
+    )
+
+
+async def _solve_question_streaming(
+    question: str, level: str, locale: str
+) -> SolveResponse:
+    """`_solve_question` without the single-flight, so this request sees its own events."""
+    key = solution_cache_key(question, level, locale)
+    if solution_cache is not None:
+        cached = await solution_cache.get(key)
+        if cached is not None:
+            return SolveResponse(**cached)
+    return await _run_workflow(key, question, level, locale)
+
+
+async def _run_workflow(
+    key: str, question: str, level: str, locale: str
+) -> SolveResponse:
+    state = {
+        "question": question,
+        "original_question": question,
+        "ir": {"text": question, "latex": []},
+        "level": level,
+        "locale": locale,
+    }
+    wf = get_workflow()
+    result = await wf.ainvoke(state)
+    resp = SolveResponse.from_state(result)
+    if solution_cache is not None and resp.final_answer:
+        await solution_cache.set(key, resp.model_dump())
+    return resp
+
 
 @router.post("/solve-text", response_model=SolveResponse)
 async def solve_text(
-    req: TextSolveRequest, request: Request, uid: str = Depends(get_current_user)
+    req: TextSolveRequest, request: Request, uid: str = Depends(admitted_user)
 ):
     log.debug(
         "solve_text.request",
@@ -37,95 +127,679 @@ async def solve_text(
             status_code=status.HTTP_400_BAD_REQUEST, detail="question must not be empty"
         )
 
-    state = {
-        "question": q,
-        "original_question": q,
-        "ir": {"text": q, "latex": []},
-        "level": req.level or "auto",
-        "locale": req.locale or "en",
-    }
-    wf = get_workflow()
-    result = await wf.ainvoke(state)
-    return SolveResponse.from_state(result)
+    t0 = time.perf_counter()
+    with trace() as spans:
+        resp = await _solve_question(q, req.level or "auto", req.locale or "en")
+    if req.include_timing:
+        resp = resp.model_copy(update={"timing": _timing(spans, t0)})
+    return resp
 
 
-@router.post("/solve-image", response_model=ImageSolveResponse)
+@router.post(
+    "/solve-image",
+    response_model=ImageSolveResponse,
+    responses={202: {"model": JobAccepted}},
+)
 async def solve_image(
-    file: UploadFile = File(...), uid: str = Depends(get_current_user)
+    file: UploadFile = File(...),
+    include_timing: bool = False,
+    job: bool = False,
+    uid: str = Depends(admitted_user),
 ):
     log.debug(
         "solve_image.request",
         uid=uid,
         filename=file.filename,
         content_type=file.content_type,
+        job=job,
+    )
+    img_bytes = await read_upload(file)
+    if job:
+        return await _submit_image_job(uid, img_bytes)
+
+    key = hashlib.sha256(img_bytes).hexdigest()
+    t0 = time.perf_counter()
+    with trace() as spans:
+        resp = await image_flight.do(key, lambda: _solve_image_bytes(img_bytes))
+    if include_timing:
+        resp = resp.model_copy(update={"timing": _timing(spans, t0)})
+    return resp
+
+
+# ---------- Job mode ----------
+async def _image_job(img_bytes: bytes | memoryview) -> dict:
+    """Job handler: the /solve-image pipeline, with HTTP errors kept on the job."""
+    key = hashlib.sha256(img_bytes).hexdigest()
+    try:
+        resp = await image_flight.do(key, lambda: _solve_image_bytes(img_bytes))
+    except HTTPException as e:
+        raise JobFailed(e.status_code, str(e.detail)) from None
+    except Overloaded as e:
+        raise JobFailed(429, e.detail) from None
+    return resp.model_dump()
+
+
+if job_queue is not None:
+    job_queue.register("solve_image", _image_job)
+
+
+async def _submit_image_job(uid: str, img_bytes: memoryview) -> JSONResponse:
+    if job_queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="job mode is disabled"
+        )
+    try:
+        job_id = await job_queue.submit(uid, "solve_image", img_bytes)
+    except JobRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        ) from None
+    accepted = JobAccepted(job_id=job_id, status="queued", poll_url=f"/jobs/{job_id}")
+    return JSONResponse(
+        accepted.model_dump(),
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": accepted.poll_url},
     )
-    max_size = 5 * 1024 * 1024  # 5MB limit
-    file_size = getattr(file, "size", None)
-    if file_size is None:
-        file.file.seek(0, os.SEEK_END)
-        file_size = file.file.tell()
-        file.file.seek(0)
-    if file_size and file_size > max_size:
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, wait: float = 0.0, uid: str = Depends(get_current_user)):
+    """Poll a job; `wait` long-polls up to JOBS_MAX_WAIT_SECONDS for it to finish."""
+    if job_queue is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not found")
+    wait = min(max(wait, 0.0), settings.jobs_max_wait_seconds)
+    job = await job_queue.get(job_id, wait=wait, uid=uid)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not found")
+    return JobStatus(**{k: v for k, v in job.items() if k not in ("uid", "kind")})
+
+
+# ---------- Batch ----------
+Outcome = Tuple[int, BaseModel | None, str | None]
+
+
+async def _outcome(sem: asyncio.Semaphore, run: Callable[[], Awaitable]) -> Outcome:
+    """(status, result, error) for one batch item; errors stay with the item."""
+    async with sem:
+        try:
+            return 200, await run(), None
+        except HTTPException as e:
+            return e.status_code, None, str(e.detail)
+        except Overloaded as e:
+            return 429, None, e.detail
+        except Exception as e:
+            log.exception("solve_batch.item_failed", error=str(e))
+            return 500, None, "internal error"
+
+
+def _check_batch_size(n: int) -> None:
+    if n > settings.batch_max_items:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail="file too large",
+            detail=f"at most {settings.batch_max_items} items per batch",
         )
 
-    img_bytes = await file.read()
 
+async def _solve_packed_group(
+    keys: List[str], items: Dict[str, Tuple[str, str, str]], outcomes: Dict
+) -> None:
+    """One LLM call for several short questions; accepted answers fill `outcomes`."""
     try:
-        with Image.open(io.BytesIO(img_bytes)) as img:
-            mime_type = Image.MIME.get(img.format, "")
-    except UnidentifiedImageError:
-        mime_type = ""
+        states = await solve_packed(models.text_default(), [items[k][0] for k in keys])
+    except Exception as e:
+        log.warning("solve_batch.pack_failed", error=str(e), size=len(keys))
+        return
+    for k, state in zip(keys, states):
+        if state is None:
+            continue
+        resp = SolveResponse.from_state({**state, "level": items[k][1]})
+        outcomes[k] = (200, resp, None)
+        if solution_cache is not None:
+            await solution_cache.set(k, resp.model_dump())
+
+
+@router.post("/solve-batch", response_model=BatchSolveResponse)
+async def solve_batch(req: BatchSolveRequest, uid: str = Depends(admitted_user)):
+    """
+    Solve a worksheet in one request. Duplicate questions (same cache key) are
+    solved once; short LLM-bound questions may share a packed prompt; results
+    come back in request order, each with its own status.
+    """
+    _check_batch_size(len(req.items))
+    log.debug("solve_batch.request", uid=uid, items=len(req.items))
+    items = [
+        (it.question.strip(), it.level or "auto", it.locale or "en") for it in req.items
+    ]
+    keys = [solution_cache_key(*it) for it in items]
+    unique: Dict[str, Tuple[str, str, str]] = {}
+    for k, it in zip(keys, items):
+        unique.setdefault(k, it)
+
+    outcomes: Dict[str, Outcome] = {}
+    if solution_cache is not None:
+        for k in unique:
+            cached = await solution_cache.get(k)
+            if cached is not None:
+                outcomes[k] = (200, SolveResponse(**cached), None)
+    pending = [k for k in unique if k not in outcomes]
+
+    sem = asyncio.Semaphore(max(1, settings.batch_concurrency))
+    size = settings.batch_pack_size
+    if req.pack and size > 1:
+        candidates = [k for k in pending if packable(unique[k][0])]
+        groups = [candidates[i : i + size] for i in range(0, len(candidates), size)]
+        await asyncio.gather(
+            *(
+                _outcome(sem, lambda g=g: _solve_packed_group(g, unique, outcomes))
+                for g in groups
+                if len(g) > 1
+            )
+        )
+
+    rest = [k for k in pending if k not in outcomes]
+    results = await asyncio.gather(
+        *(_outcome(sem, lambda k=k: _solve_question(*unique[k])) for k in rest)
+    )
+    outcomes.update(zip(rest, results))
+    return BatchSolveResponse(
+        results=[
+            BatchItemResult(
+                index=i,
+                status=outcomes[k][0],
+                result=outcomes[k][1],
+                error=outcomes[k][2],
+            )
+            for i, k in enumerate(keys)
+        ]
+    )
+
+
+@router.post("/solve-batch-images", response_model=BatchImageSolveResponse)
+async def solve_batch_images(
+    files: List[UploadFile] = File(...), uid: str = Depends(admitted_user)
+):
+    """Image counterpart of /solve-batch; identical uploads are solved once."""
+    _check_batch_size(len(files))
+    log.debug("solve_batch_images.request", uid=uid, items=len(files))
+    sem = asyncio.Semaphore(max(1, settings.batch_concurrency))
+    keys: List[str] = []
+    uploads: Dict[str, memoryview] = {}
+    outcomes: Dict[str, Outcome] = {}
+    for i, f in enumerate(files):
+        try:
+            data = await read_upload(f)
+        except HTTPException as e:
+            keys.append(f"error:{i}")
+            outcomes[keys[-1]] = (e.status_code, None, str(e.detail))
+            continue
+        keys.append(hashlib.sha256(data).hexdigest())
+        uploads.setdefault(keys[-1], data)
 
-    if not mime_type.startswith("image/"):
+    todo = list(uploads)
+    results = await asyncio.gather(
+        *(
+            _outcome(
+                sem,
+                lambda k=k: image_flight.do(k, lambda: _solve_image_bytes(uploads[k])),
+            )
+            for k in todo
+        )
+    )
+    outcomes.update(zip(todo, results))
+    return BatchImageSolveResponse(
+        results=[
+            BatchImageItemResult(
+                index=i,
+                status=outcomes[k][0],
+                result=outcomes[k][1],
+                error=outcomes[k][2],
+            )
+            for i, k in enumerate(keys)
+        ]
+    )
+
+
+# ---------- Worksheet photos ----------
+def _problem_result(
+    index: int, page: PreparedImage, region: Region, outcome: Outcome
+) -> ImageProblemResult:
+    code, resp, error = outcome
+    x, y, w, h = page.upload_box(*region.box)
+    return ImageProblemResult(
+        index=index,
+        label=region.label,
+        bbox=BoundingBox(x=x, y=y, width=w, height=h),
+        status=code,
+        ocr_text=resp.ocr_text if resp is not None else "",
+        result=SolveResponse(**resp.result) if resp is not None else None,
+        error=error,
+    )
+
+
+@router.post("/solve-image/problems", response_model=ImageProblemsResponse)
+async def solve_image_problems(
+    file: UploadFile = File(...),
+    include_timing: bool = False,
+    uid: str = Depends(admitted_user),
+):
+    """
+    Solve every numbered problem on a worksheet photo. The page is split at its
+    problem labels (utils.image_segment) and up to SEGMENT_CONCURRENCY regions
+    take the /solve-image pipeline at once; each result has its label, its box
+    in the upload and its own status. Regions past SEGMENT_MAX_PROBLEMS get 413.
+    """
+    log.debug(
+        "solve_image_problems.request",
+        uid=uid,
+        filename=file.filename,
+        content_type=file.content_type,
+    )
+    img_bytes = await read_upload(file)
+    t0 = time.perf_counter()
+    with trace() as spans:
+        page = await _prepare(img_bytes)
+        try:
+            regions = await segment(page)
+        except (TimeoutError, ExecutorBusy):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="image processing is busy, please retry",
+            ) from None
+        if not regions:
+            raise _no_question_error()
+        sem = asyncio.Semaphore(max(1, settings.segment_concurrency))
+        solvable = regions[: max(1, settings.segment_max_problems)]
+        outcomes: List[Outcome] = await asyncio.gather(
+            *(_outcome(sem, lambda r=r: _solve_prepared(r.image)) for r in solvable)
+        )
+    too_many: Outcome = (
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        None,
+        f"at most {settings.segment_max_problems} problems per image",
+    )
+    outcomes += [too_many] * (len(regions) - len(solvable))
+    resp = ImageProblemsResponse(
+        problems=[
+            _problem_result(i, page, r, o)
+            for i, (r, o) in enumerate(zip(regions, outcomes))
+        ]
+    )
+    if include_timing:
+        resp.timing = _timing(spans, t0)
+    return resp
+
+
+# ---------- Streaming variants ----------
+def _stream_format(request: Request) -> tuple[Callable[[str, dict], str], str]:
+    """SSE when the client asks for text/event-stream, NDJSON otherwise."""
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return format_sse, "text/event-stream"
+    return format_ndjson, "application/x-ndjson"
+
+
+def _streaming_response(
+    request: Request, endpoint: str, uid: str, run: Callable[[], Awaitable[BaseModel]]
+) -> StreamingResponse:
+    fmt, media_type = _stream_format(request)
+    return StreamingResponse(
+        _event_stream(run, fmt, endpoint, uid),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _event_stream(
+    run: Callable[[], Awaitable[BaseModel]],
+    fmt: Callable[[str, dict], str],
+    endpoint: str,
+    uid: str,
+) -> AsyncIterator[str]:
+    """
+    Run the solve in a task and relay its events: "route", "attempt", "step",
+    "verify", "escalate", then "result" (or "error"). Steps of an attempt that
+    gets superseded are followed by a new "attempt" event.
+
+    The user's quota is held here, for as long as the body streams: cleanup
+    of a yield dependency such as `admitted_user` runs before a
+    StreamingResponse body is sent. Over quota is an "error" event with
+    status 429.
+    """
+    try:
+        user_quota.acquire(uid)
+    except Overloaded as e:
+        yield fmt(
+            "error", {"status": 429, "detail": e.detail, "retry_after": e.retry_after}
+        )
+        return
+    sink = EventSink()
+    t0 = time.perf_counter()
+    task: asyncio.Task | None = None
+    try:
+        with event_sink(sink):
+            task = asyncio.create_task(run())
+        task.add_done_callback(lambda _: sink.close())
+        steps_sent = 0
+        while (item := await sink.queue.get()) is not None:
+            event, data = item
+            if event == "step":
+                if steps_sent == 0:
+                    STREAM_FIRST_STEP_SECONDS.observe(
+                        time.perf_counter() - t0, endpoint=endpoint
+                    )
+                steps_sent += 1
+            yield fmt(event, data)
+
+        try:
+            resp = task.result()
+        except HTTPException as e:
+            yield fmt("error", {"status": e.status_code, "detail": e.detail})
+            return
+        except Overloaded as e:
+            yield fmt(
+                "error",
+                {"status": 429, "detail": e.detail, "retry_after": e.retry_after},
+            )
+            return
+        except Exception as e:
+            log.exception("solve_stream.failed", endpoint=endpoint, error=str(e))
+            yield fmt("error", {"status": 500, "detail": "internal error"})
+            return
+        body = resp.model_dump()
+        if steps_sent == 0:
+            # Cache hit or fast path: nothing was streamed, send the steps now.
+            steps = body.get("steps") or (body.get("result") or {}).get("steps") or []
+            if steps:
+                STREAM_FIRST_STEP_SECONDS.observe(
+                    time.perf_counter() - t0, endpoint=endpoint
+                )
+            for i, step in enumerate(steps):
+                yield fmt("step", {"attempt": "final", "index": i, **step})
+        yield fmt("result", body)
+    finally:
+        if task is not None and not task.done():
+            task.cancel()  # client went away
+        user_quota.release(uid)
+
+
+@router.post("/solve-text/stream")
+async def solve_text_stream(
+    req: TextSolveRequest, request: Request, uid: str = Depends(get_current_user)
+):
+    log.debug("solve_text_stream.request", uid=uid)
+    q = (req.question or "").strip()
+    level, locale = req.level or "auto", req.locale or "en"
+    return _streaming_response(
+        request, "text", uid, lambda: _solve_question_streaming(q, level, locale)
+    )
+
+
+@router.post("/solve-image/stream")
+async def solve_image_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    uid: str = Depends(get_current_user),
+):
+    log.debug(
+        "solve_image_stream.request",
+        uid=uid,
+        filename=file.filename,
+        content_type=file.content_type,
+    )
+    img_bytes = await read_upload(file)
+    return _streaming_response(
+        request, "image", uid, lambda: _solve_image_bytes(img_bytes)
+    )
+
+
+def _vision_response(data: dict) -> SolveResponse | None:
+    if not (
+        data and isinstance(data, dict) and "steps" in data and "final_answer" in data
+    ):
+        return None
+    steps = data.get("steps") or []
+    steps = [
+        Step(title=s.get("title", "Step"), explanation=s.get("explanation", ""))
+        for s in steps
+        if isinstance(s, dict)
+    ]
+    return SolveResponse(
+        final_answer=str(data.get("final_answer", "")),
+        steps=steps if steps else [Step(title="Explanation", explanation="")],
+        verified=False,  # you can verify on FE or extend here for special cases
+        latex=None,
+        level="auto",
+        confidence=float(data.get("confidence", 0.6) or 0.0),
+        difficulty=int(data.get("difficulty", 2) or 0),
+        model=ModelInfo(provider="auto", name="vision"),
+    )
+
+
+def _no_question_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail="Could not extract a valid math question from image. Please upload a clearer photo or re-type the question.",
+    )
+
+
+def _ocr_is_clean(ocr_text: str) -> bool:
+    """OCR produced a single line the deterministic/text pipeline can take on its own."""
+    t = (ocr_text or "").strip()
+    if not t or "\n" in t or len(t) > 200:
+        return False
+    task, _ = _guess_task(t)
+    return task in FAST_PATH_TASKS
+
+
+async def _prepare(img_bytes: bytes | memoryview) -> PreparedImage:
+    """
+    Decode and normalize the upload once for both OCR and vision. Nothing
+    reads the upload afterwards, so a buffer from `read_upload` is released
+    here rather than held while the request waits on the model.
+    """
+    try:
+        return await prepare_image(img_bytes)
+    except InvalidImage:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="file must be an image"
+        ) from None
+    except (TimeoutError, ExecutorBusy):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="image processing is busy, please retry",
+        ) from None
+    finally:
+        if isinstance(img_bytes, memoryview):
+            # BufferError: a timed-out thread is still reading it
+            with contextlib.suppress(BufferError):
+                img_bytes.release()
+
+
+async def _solve_image_bytes(img_bytes: bytes | memoryview) -> ImageSolveResponse:
+    return await _solve_prepared(await _prepare(img_bytes))
+
+
+async def _solve_prepared(image: PreparedImage) -> ImageSolveResponse:
+    ocr_task: asyncio.Task | None = None
+    if image_cache is not None:
+        cached = image_cache.get(image.phash, image.dhash, image.digest)
+        if cached is None and image_cache.has_near(image.phash, image.dhash):
+            # A look-alike is only the same problem if it reads the same; the
+            # OCR run is handed on to the solve below rather than repeated.
+            ocr_task = asyncio.create_task(extract_text(image.pixels))
+            ocr_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            try:
+                ocr_text, _ = await asyncio.shield(ocr_task)
+            except Exception:
+                ocr_text = ""
+            cached = image_cache.get(image.phash, image.dhash, image.digest, ocr_text)
+        if cached is not None:
+            log.debug("image_cache.hit", phash=f"{image.phash:016x}")
+            return ImageSolveResponse(**cached)
+
+    if settings.image_solve_mode == "sequential":
+        resp = await _solve_image_sequential(image, ocr_task)
+    else:
+        resp = await _solve_image_concurrent(image, ocr_task)
+    if image_cache is not None and resp.result.get("final_answer"):
+        image_cache.set(
+            image.phash, image.dhash, image.digest, resp.ocr_text, resp.model_dump()
         )
+    return resp
 
+
+async def _solve_image_sequential(
+    image: PreparedImage, ocr_task: asyncio.Task | None = None
+) -> ImageSolveResponse:
     # 1) OCR hint (weak)
-    ocr_text, _ = await extract_text(img_bytes)
+    ocr_text, _ = await (ocr_task or extract_text(image.pixels))
 
     # 2) Vision-first: ask the model to solve from pixels
     data = await solve_image_json(
-        img_bytes, ocr_hint=ocr_text, use_stronger_if_low_conf=True
-    )
-    if data and isinstance(data, dict) and "steps" in data and "final_answer" in data:
-        steps = data.get("steps") or []
-        steps = [
-            Step(title=s.get("title", "Step"), explanation=s.get("explanation", ""))
-            for s in steps
-            if isinstance(s, dict)
-        ]
-        resp = SolveResponse(
-            final_answer=str(data.get("final_answer", "")),
-            steps=steps if steps else [Step(title="Explanation", explanation="")],
-            verified=False,  # you can verify on FE or extend here for special cases
-            latex=None,
-            level="auto",
-            confidence=float(data.get("confidence", 0.6) or 0.0),
-            difficulty=int(data.get("difficulty", 2) or 0),
-            model=ModelInfo(provider="auto", name="vision"),
-        )
+        image.data,
+        ocr_hint=ocr_text,
+        use_stronger_if_low_conf=True,
+        mime_type=image.mime_type,
+    )
+    resp = _vision_response(data)
+    if resp is not None:
         return ImageSolveResponse(ocr_text=ocr_text or "", result=resp.model_dump())
 
     # 3) Fallback: if Vision returns nothing AND OCR found text → try text pipeline
     if not ocr_text:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Could not extract a valid math question from image. Please upload a clearer photo or re-type the question.",
-        )
+        raise _no_question_error()
 
-    state = {
-        "question": ocr_text.strip(),
-        "original_question": ocr_text.strip(),
-        "ir": {"text": ocr_text.strip(), "latex": []},
-        "level": "auto",
-        "locale": "en",
-    }
-    wf = get_workflow()
-    result = await wf.ainvoke(state)
-    return ImageSolveResponse(
-        ocr_text=ocr_text, result=SolveResponse.from_state(result).model_dump()
+    resp = await _solve_question(ocr_text.strip(), "auto", "en")
+    return ImageSolveResponse(ocr_text=ocr_text, result=resp.model_dump())
+
+
+async def _solve_image_concurrent(
+    image: PreparedImage, ocr_task: asyncio.Task | None = None
+) -> ImageSolveResponse:
+    """
+    Start vision right away and race it against the text pipeline.
+
+    OCR runs alongside; its text goes into the vision prompt only if it is
+    ready within IMAGE_OCR_HINT_WAIT_SECONDS, otherwise it is offered to the
+    stronger vision call as a follow-up. When OCR yields a clean equation the
+    text pipeline runs speculatively; the first verified answer wins and the
+    other task is cancelled. The speculative run's progress events are held
+    back and replayed only if its answer is the one returned. `ocr_task` is
+    an OCR run already started for this image, if any.
+    """
+    if ocr_task is None:
+        ocr_task = asyncio.create_task(extract_text(image.pixels))
+        ocr_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    ocr_text = ""
+    try:
+        ocr_text, _ = await asyncio.wait_for(
+            asyncio.shield(ocr_task), settings.image_ocr_hint_wait_seconds
+        )
+    except asyncio.TimeoutError:
+        pass
+    except Exception:
+        pass  # surfaced (and logged) by the wait loop below
+    vision_task = asyncio.create_task(
+        solve_image_json(
+            image.data,
+            ocr_hint=ocr_text,
+            use_stronger_if_low_conf=True,
+            ocr_followup=None if ocr_task.done() else ocr_task,
+            mime_type=image.mime_type,
+        )
     )
+    text_task: asyncio.Task | None = None
+    text_sink = EventSink() if current_sink() is not None else None
+    vision_resp: SolveResponse | None = None
+    text_resp: SolveResponse | None = None
+    vision_error: BaseException | None = None
+
+    async def _solve_text(question: str) -> SolveResponse:
+        if text_sink is None:
+            return await _solve_question(question, "auto", "en")
+        with event_sink(text_sink):
+            return await _solve_question(question, "auto", "en")
+
+    def _start_text() -> None:
+        nonlocal text_task
+        if text_task is None and _ocr_is_clean(ocr_text):
+            log.debug("solve_image.speculative_text", preview=ocr_text[:80])
+            text_task = asyncio.create_task(_solve_text(ocr_text.strip()))
+            pending.add(text_task)
+
+    def _text_won() -> ImageSolveResponse:
+        if text_sink is not None:
+            for event, data in text_sink.drain():
+                emit(event, **data)
+        return ImageSolveResponse(ocr_text=ocr_text, result=text_resp.model_dump())
+
+    pending: set = {vision_task}
+    if ocr_task.done():
+        _start_text()
+    else:
+        pending.add(ocr_task)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            if ocr_task in done:
+                try:
+                    ocr_text = ocr_task.result()[0] or ""
+                except Exception as e:
+                    log.warning("solve_image.ocr_failed", error=str(e))
+                _start_text()
+
+            if vision_task in done:
+                try:
+                    vision_resp = _vision_response(vision_task.result())
+                except Exception as e:
+                    vision_error = e
+                problem = None
+                if vision_resp is not None and ocr_text.strip():
+                    problem = await parse_question(ocr_text)
+                if problem is not None:
+                    verdict = await verify_answer(problem, vision_resp.final_answer)
+                    vision_resp.verified = bool(verdict)
+                    if verdict is not None:
+                        emit("verify", attempt="vision", verified=verdict)
+
+            # Checked after vision's verify so a text answer that landed meanwhile counts.
+            if text_task is not None and text_task.done() and text_task in pending:
+                pending.discard(text_task)
+                done.add(text_task)
+            if text_task is not None and text_task in done:
+                try:
+                    text_resp = text_task.result()
+                except Exception as e:
+                    log.warning("solve_image.text_failed", error=str(e))
+
+            if text_resp is not None and text_resp.verified:
+                log.info("solve_image.winner", path="text")
+                return _text_won()
+            # An unverified vision answer only waits on a text race still running.
+            if vision_resp is not None and (
+                vision_resp.verified or text_task is None or text_task.done()
+            ):
+                log.info("solve_image.winner", path="vision")
+                return ImageSolveResponse(
+                    ocr_text=ocr_text, result=vision_resp.model_dump()
+                )
+    finally:
+        # OCR is left to finish: cancelling it would kill and respawn a pool worker.
+        for t in (vision_task, text_task):
+            if t is not None and not t.done():
+                t.cancel()
+
+    if vision_resp is None and text_resp is not None:
+        return _text_won()
+    resp = vision_resp
+    if resp is None and ocr_text.strip() and text_task is None:
+        resp = await _solve_question(ocr_text.strip(), "auto", "en")
+    if resp is None:
+        if vision_error is not None:
+            raise vision_error
+        raise _no_question_error()
+    return ImageSolveResponse(ocr_text=ocr_text, result=resp.model_dump())
@@ -0,0 +1,165 @@
+"""
+Startup lifecycle: pay a fresh worker's one-off costs before its traffic does.
+
+Slow libraries are imported where they are first used (langchain in
+providers.model_factory, langgraph in reasoner.graph, firebase_admin in
+api.deps, cv2/pytesseract in the CPU pool), so importing the app is quick and
+a new worker answers liveness probes almost at once. `Warmup.run` then builds
+the LLM clients, compiles the shared graph, initialises Firebase, starts the
+CPU pool, loads the OCR engine and runs one SymPy check end to end. `/ready`
+answers 503 until the steps every text request depends on ("models",
+"graph", "cpu_pool", "sympy") have succeeded; Tesseract and Firebase only
+report their state.
+
+STARTUP_WARMUP picks when: "background" (default) warms while already
+serving, "blocking" holds the lifespan until warm, "off" leaves everything
+to the first requests.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import structlog
+
+from api.deps import start_auth
+from core.config import settings
+from core.executor import cpu_pool
+from providers.model_factory import models
+from reasoner.fastpath import solve_fast
+from reasoner.graph import get_workflow
+from reasoner.verify import parse_question, verify_answer
+from utils.image_ocr import tesseract_version
+
+log = structlog.get_logger(__name__)
+
+REQUIRED_STEPS = ("models", "graph", "cpu_pool", "sympy")
+_ROLES = ("text_default", "text_stronger", "vision_default", "vision_stronger")
+
+
+def _build_models() -> Dict[str, str]:
+    return {role: models.get(role).name for role in _ROLES}
+
+
+async def _warm_models() -> Dict[str, str]:
+    return await asyncio.to_thread(_build_models)
+
+
+async def _warm_graph() -> None:
+    await asyncio.to_thread(get_workflow)
+
+
+async def _warm_firebase() -> None:
+    if not await start_auth():
+        raise RuntimeError("Firebase is not initialised (see auth.startup_failed)")
+
+
+async def _probe_tesseract() -> str:
+    # Once per worker: with tesserocr this loads each worker's OCR engine.
+    versions = await asyncio.gather(
+        *(
+            cpu_pool.run(tesseract_version, timeout=settings.ocr_timeout_seconds)
+            for _ in range(cpu_pool.max_workers)
+        )
+    )
+    return versions[0]
+
+
+async def _warm_sympy() -> None:
+    problem = await parse_question("2x + 3 = 11")
+    if problem is None or await verify_answer(problem, "x = 4") is not True:
+        raise RuntimeError("SymPy self-check failed")
+    # One fast-path solve per worker: SymPy's solvers load lazily on first use.
+    await asyncio.gather(
+        *(
+            cpu_pool.run(
+                solve_fast,
+                "solve_equation",
+                "2x + 3 = 11",
+                {},
+                timeout=settings.fast_path_timeout_seconds,
+            )
+            for _ in range(cpu_pool.max_workers)
+        )
+    )
+
+
+class Warmup:
+    """Runs the warm-up steps once and reports their state for /ready."""
+
+    def __init__(self, mode: str) -> None:
+        self.mode = (mode or "background").lower()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _step(self, name: str, fn: Callable[[], Awaitable[Any]]) -> bool:
+        self.steps[name] = {"state": "running"}
+        t0 = time.perf_counter()
+        try:
+            detail = await fn()
+        except Exception as e:
+            log.warning("startup.step_failed", step=name, error=str(e))
+            self.steps[name] = {
+                "state": "failed",
+                "seconds": round(time.perf_counter() - t0, 3),
+                "error": str(e),
+            }
+            return False
+        self.steps[name] = {
+            "state": "ok",
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+        if detail:
+            self.steps[name]["detail"] = detail
+        return True
+
+    async def run(self) -> None:
+        t0 = time.perf_counter()
+
+        async def llm() -> None:
+            if await self._step("models", _warm_models):
+                await self._step("graph", _warm_graph)
+
+        async def cpu() -> None:
+            if await self._step("cpu_pool", cpu_pool.warm):
+                await self._step("sympy", _warm_sympy)
+                await self._step("tesseract", _probe_tesseract)
+
+        await asyncio.gather(llm(), cpu(), self._step("firebase", _warm_firebase))
+        self.seconds = round(time.perf_counter() - t0, 3)
+        log.info("startup.warm", seconds=self.seconds, ready=self.ready)
+
+    async def start(self) -> None:
+        if self.mode == "off":
+            return
+        if self.mode == "blocking":
+            await self.run()
+        else:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        if self.mode == "off":
+            return True
+        return all(self.steps.get(s, {}).get("state") == "ok" for s in REQUIRED_STEPS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "seconds": self.seconds,
+            "steps": {name: dict(step) for name, step in self.steps.items()},
+        }
+
+
+warmup = Warmup(settings.startup_warmup)
@@ -0,0 +1,114 @@
+"""
+Image uploads: the body size cutoff while it streams in, and reading a file
+into the one buffer every later step shares.
+"""
+
+import asyncio
+from typing import BinaryIO, Dict, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+
+from core.config import settings
+from utils.image_prep import SNIFF_BYTES, sniff_format
+
+# Room in a multipart body for boundaries, part headers and small form fields
+_FORM_OVERHEAD = 64 * 1024
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="file too large",
+    )
+
+
+class UploadLimit:
+    """
+    ASGI middleware that refuses a multipart body bigger than its files may
+    be: at once when Content-Length says so, else as soon as the streamed
+    body crosses the limit. Without it the form parser spools the whole body
+    (to disk past 1 MB) before a route can look at a file's size.
+
+    The limit is UPLOAD_MAX_BYTES per file; `max_files` gives the paths that
+    accept several (default one).
+    """
+
+    def __init__(
+        self, app, max_bytes: int, max_files: Optional[Dict[str, int]] = None
+    ) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_files = max_files or {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/"):
+            return await self.app(scope, receive, send)
+
+        limit = self.max_bytes * self.max_files.get(scope["path"], 1) + _FORM_OVERHEAD
+        length = headers.get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": "file too large"}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _fill(f: BinaryIO, view: memoryview) -> int:
+    n = 0
+    while n < len(view):
+        got = f.readinto(view[n:])
+        if not got:
+            break
+        n += got
+    return n
+
+
+async def read_upload(file: UploadFile) -> memoryview:
+    """
+    The uploaded file as one read-only buffer, shared by everything after it
+    (hashing, the CPU pool, the job store) rather than copied for each.
+
+    The format is sniffed from the first bytes before the rest is read (415
+    unless an image), and files over UPLOAD_MAX_BYTES get 413.
+    """
+    limit = settings.upload_max_bytes
+    if file.size is not None and 0 < limit < file.size:
+        raise _too_large()
+    await file.seek(0)
+    head = await file.read(SNIFF_BYTES)
+    if sniff_format(head) is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="file must be a JPEG, PNG, WebP, GIF, BMP or TIFF image",
+        )
+
+    # Without a size from the form parser, read up to one byte past the limit.
+    size = file.size if file.size is not None else (limit + 1 if limit > 0 else None)
+    if size is None:
+        buf = bytearray(head + await file.read())
+    else:
+        buf = bytearray(size)
+        buf[: len(head)] = head
+        n = len(head) + await asyncio.to_thread(
+            _fill, file.file, memoryview(buf)[len(head) :]
+        )
+        if n < len(buf):
+            buf = buf[:n]
+    if 0 < limit < len(buf):
+        raise _too_large()
+    return memoryview(buf).toreadonly()
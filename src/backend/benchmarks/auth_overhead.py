@@ -0,0 +1,103 @@
+"""
+Per-request auth overhead of `get_current_user`.
+
+    python -m benchmarks.auth_overhead --iterations 2000
+
+Firebase is replaced by a local RS256 verifier (same crypto as the real
+`verify_id_token`, minus the cert fetch), so the numbers isolate our own
+overhead: "inline" is the old path (sync verify on the event loop every
+request), "cold" is the new path on a cache miss (verify in a thread),
+"cached" is a repeat request with the same token.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+import firebase_admin  # noqa: E402
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from firebase_admin import auth  # noqa: E402
+from google.auth import crypt, jwt  # noqa: E402
+
+from api import deps  # noqa: E402
+
+
+def _make_verifier():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    signer = crypt.RSASigner.from_string(pem, key_id="bench")
+
+    def issue(uid: str) -> str:
+        now = int(time.time())
+        payload = {"sub": uid, "iat": now, "exp": now + 3600, "aud": "bench"}
+        return jwt.encode(signer, payload).decode()
+
+    def verify(token: str) -> dict:
+        claims = jwt.decode(token, certs=public, audience="bench")
+        claims["uid"] = claims["sub"]
+        return claims
+
+    return issue, verify
+
+
+async def _timeit(fn, iterations: int) -> list[float]:
+    samples = []
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        await fn(i)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    qs = statistics.quantiles(samples, n=100)
+    print(
+        f"{label:<7} mean={statistics.fmean(samples):9.1f}us "
+        f"p50={qs[49]:9.1f}us p99={qs[98]:9.1f}us"
+    )
+
+
+async def _main(iterations: int) -> None:
+    issue, verify = _make_verifier()
+    auth.verify_id_token = verify
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+
+    tokens = [issue(f"user-{i}") for i in range(iterations)]
+    shared = f"Bearer {tokens[0]}"
+
+    async def inline(i: int) -> None:
+        verify(tokens[i])
+
+    async def cold(i: int) -> None:
+        await deps.get_current_user(f"Bearer {tokens[i]}")
+
+    async def cached(_i: int) -> None:
+        await deps.get_current_user(shared)
+
+    _report("inline", await _timeit(inline, iterations))
+    _report("cold", await _timeit(cold, iterations))
+    _report("cached", await _timeit(cached, iterations))
+    print(deps.token_cache.stats())
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--iterations", type=int, default=2000)
+    args = ap.parse_args()
+    asyncio.run(_main(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark problems with expected answers, covering every `_guess_task` category.
+
+    python -m benchmarks.corpus
+
+lists the corpus with the task `_guess_task` assigns to each question, and
+fails if any category is missing or any problem is filed under the wrong one.
+Image problems are the same questions rendered as PNGs, one per category.
+"""
+
+import argparse
+import io
+from dataclasses import dataclass
+from typing import Dict, List
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+@dataclass(frozen=True)
+class Problem:
+    question: str
+    task: str  # what _guess_task should return
+    answer: str
+
+
+PROBLEMS: List[Problem] = [
+    Problem("2x + 3 = 11", "solve_equation", "x = 4"),
+    Problem("x^2 - 5x + 6 = 0", "solve_equation", "x = 2, x = 3"),
+    Problem("3(x - 2) = 2x + 5", "solve_equation", "x = 11"),
+    Problem("Solve for y: 4y/3 + 1 = 9", "solve_equation", "y = 6"),
+    Problem("Simplify (x^2 - 1)/(x - 1)", "simplify", "x + 1"),
+    Problem("Factor x^2 + 5x + 6", "simplify", "(x + 2)(x + 3)"),
+    Problem("Expand (x + 2)^3", "simplify", "x^3 + 6x^2 + 12x + 8"),
+    Problem("Differentiate x^3 sin(x)", "differentiate", "3x^2 sin(x) + x^3 cos(x)"),
+    Problem(
+        "Find the derivative of e^(2x) ln(x)", "differentiate", "e^(2x)(2 ln(x) + 1/x)"
+    ),
+    Problem("d/dx (x^2 + 1)^5", "differentiate", "10x(x^2 + 1)^4"),
+    Problem("Integrate x e^x dx", "integrate", "x e^x - e^x + C"),
+    Problem("Evaluate the integral of 1/(1 + x^2) from 0 to 1", "integrate", "pi/4"),
+    Problem("Integrate sin(x)^2 dx", "integrate", "x/2 - sin(2x)/4 + C"),
+    Problem("Find the limit of sin(x)/x as x -> 0", "limit", "1"),
+    Problem("Find the limit of (1 + 1/n)^n as n -> oo", "limit", "e"),
+    Problem("lim (x^2 - 4)/(x - 2) as x -> 2", "limit", "4"),
+    Problem("Find the determinant of [[1, 2], [3, 4]]", "matrix_op", "-2"),
+    Problem(
+        "Find the inverse of [[2, 0], [0, 4]]", "matrix_op", "[[1/2, 0], [0, 1/4]]"
+    ),
+    Problem("What is the rank of the matrix [[1, 2], [2, 4]]?", "matrix_op", "1"),
+    Problem("2 + 3 * 4", "evaluate", "14"),
+    Problem("(15 - 3) / 4", "evaluate", "3"),
+    Problem("2^10 - 24", "evaluate", "1000"),
+    Problem("Prove that the sum of two even numbers is even", "word_problem", "even"),
+    Problem("Show that sqrt(2) is irrational", "word_problem", "irrational"),
+    Problem(
+        "A train travels 120 km in 2 hours. What is its average speed?",
+        "unknown",
+        "60 km/h",
+    ),
+    Problem("How many ways can 5 books be arranged on a shelf?", "unknown", "120"),
+    Problem("What is the greatest common divisor of 84 and 36?", "unknown", "12"),
+]
+
+ANSWERS: Dict[str, str] = {p.question: p.answer for p in PROBLEMS}
+
+
+def render(question: str, width: int = 640, height: int = 120) -> bytes:
+    """`question` as black text on white, PNG-encoded."""
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:  # Pillow < 10.1 has a single fixed-size default font
+        font = ImageFont.load_default()
+    draw.text((20, height // 3), question, fill="black", font=font)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def image_problems() -> List[tuple]:
+    """(png bytes, Problem) for the first problem of each category."""
+    seen, out = set(), []
+    for p in PROBLEMS:
+        if p.task not in seen:
+            seen.add(p.task)
+            out.append((render(p.question), p))
+    return out
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[1]).parse_args()
+
+    from reasoner.graph import _guess_task
+
+    wrong = []
+    for p in PROBLEMS:
+        task, _ = _guess_task(p.question)
+        flag = "" if task == p.task else f"  <-- expected {p.task}"
+        if flag:
+            wrong.append(p)
+        print(f"{task:<15} {p.question}{flag}")
+    expected = {
+        "solve_equation",
+        "simplify",
+        "differentiate",
+        "integrate",
+        "limit",
+        "matrix_op",
+        "evaluate",
+        "word_problem",
+        "unknown",
+    }
+    missing = expected - {p.task for p in PROBLEMS}
+    print(f"\n{len(PROBLEMS)} problems, {len(image_problems())} images")
+    if wrong or missing:
+        raise SystemExit(f"misfiled: {len(wrong)}, missing categories: {missing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Latency and cost of the solve_llm escalation strategies against fake models.
+
+    python -m benchmarks.escalation --requests 300 --concurrency 16
+
+Both models are simulated: log-normal latency, a probability of returning
+the right answer and fixed token counts priced like the Gemini defaults.
+Questions are linear equations so every answer goes through SymPy
+verification. A call cancelled by hedge/race counts in `calls` but adds no
+cost here, while a real provider may still bill it, so treat the cost column
+for those strategies as a lower bound.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+os.environ.setdefault("CPU_EXECUTOR", "thread")
+
+import structlog  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+
+from core.config import settings  # noqa: E402
+from core.metrics import trace  # noqa: E402
+from providers.model_factory import LLM  # noqa: E402
+from reasoner.graph import solve_llm  # noqa: E402
+
+
+class _FakeChat:
+    def __init__(
+        self,
+        rng: random.Random,
+        median: float,
+        sigma: float,
+        p_correct: float,
+        confidence: float,
+        tokens: tuple[int, int],
+    ) -> None:
+        self.rng = rng
+        self.mu = math.log(median)
+        self.sigma = sigma
+        self.p_correct = p_correct
+        self.confidence = confidence
+        self.tokens = tokens
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.rng.lognormvariate(self.mu, self.sigma))
+        question = messages[-1].content.split("\n", 1)[0]
+        lhs, rhs = question.split("=")
+        k, m = int(lhs.split("+")[1]), int(rhs)
+        x = m - k if self.rng.random() < self.p_correct else m - k + 1
+        body = {
+            "steps": [{"title": "Isolate x", "explanation": f"x = {m} - {k}"}],
+            "final_answer": f"x = {x}",
+            "difficulty": 1,
+            "confidence": self.confidence,
+        }
+        return AIMessage(
+            content=json.dumps(body),
+            usage_metadata={
+                "input_tokens": self.tokens[0],
+                "output_tokens": self.tokens[1],
+                "total_tokens": sum(self.tokens),
+            },
+        )
+
+
+def _models(args, seed: int) -> tuple[LLM, LLM]:
+    rng = random.Random(seed)
+    base = _FakeChat(
+        rng, args.base_median, args.sigma, args.base_accuracy, 0.8, (400, 300)
+    )
+    strong = _FakeChat(
+        rng, args.strong_median, args.sigma, args.strong_accuracy, 0.9, (400, 600)
+    )
+    return (
+        LLM("gemini-2.5-flash", "fake", model=base),
+        LLM("gemini-2.5-pro", "fake", model=strong),
+    )
+
+
+async def _one(question: str, base: LLM, strong: LLM) -> tuple[float, float, int, bool]:
+    t0 = time.perf_counter()
+    with trace() as spans:
+        out = await solve_llm({"parsed": {"text": question}}, base, strong)
+    elapsed = time.perf_counter() - t0
+    calls = [s for s in spans if s["name"].startswith("llm.")]
+    cost = sum(s.get("cost_usd", 0.0) for s in calls)
+    return elapsed, cost, len(calls), out["verified"]
+
+
+async def _run(strategy: str, args) -> list[tuple[float, float, int, bool]]:
+    settings.solve_escalation_strategy = strategy
+    base, strong = _models(args, args.seed)
+    rng = random.Random(args.seed)
+    questions = [
+        f"x + {rng.randint(1, 50)} = {rng.randint(1, 100)}"
+        for _ in range(args.requests)
+    ]
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(q):
+        async with sem:
+            return await _one(q, base, strong)
+
+    return await asyncio.gather(*(bounded(q) for q in questions))
+
+
+def _report(label: str, rows) -> None:
+    latency = [r[0] * 1000.0 for r in rows]
+    qs = statistics.quantiles(latency, n=100)
+    print(
+        f"{label:<10} p50={qs[49]:7.0f}ms p95={qs[94]:7.0f}ms p99={qs[98]:7.0f}ms "
+        f"calls={statistics.fmean(r[2] for r in rows):4.2f} "
+        f"cost=${statistics.fmean(r[1] for r in rows) * 1000:6.3f}/1k "
+        f"verified={sum(r[3] for r in rows) / len(rows):5.1%}"
+    )
+
+
+async def _main(args) -> None:
+    # Fill the base-latency window the hedge delay is computed from.
+    await _run("sequential", argparse.Namespace(**{**vars(args), "requests": 50}))
+    for strategy in args.strategies.split(","):
+        _report(strategy, await _run(strategy, args))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--strategies", default="sequential,hedge,race")
+    ap.add_argument("--base-median", type=float, default=0.15, help="seconds")
+    ap.add_argument("--strong-median", type=float, default=0.4, help="seconds")
+    ap.add_argument("--sigma", type=float, default=0.5, help="log-normal sigma")
+    ap.add_argument("--base-accuracy", type=float, default=0.8)
+    ap.add_argument("--strong-accuracy", type=float, default=0.95)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Deterministic fake chat models for benchmarks: no network, no provider bill.
+
+`FakeChat` answers corpus questions (see benchmarks.corpus) after a log-normal
+delay. Per call it draws whether the answer is right (`accuracy`), the
+confidence it reports and whether the reply is broken JSON (`malformed_rate`).
+Every draw comes from an RNG seeded with (seed, model, prompt, repeat count),
+so a run does not depend on how requests happen to be scheduled.
+
+It understands the single-question solve prompt (including critique/strong
+retries), the packed /solve-batch prompt and the vision prompt; images are
+recognised by the exact bytes `prepare_image` produces for them (`image_keys`).
+`with_structured_output` mimics a provider's schema-constrained mode: the
+same answers, never malformed.
+
+    base = fake_llm("fake-flash", median=0.6, accuracy=0.85)
+    strong = fake_llm("fake-pro", median=2.0, accuracy=0.98)
+    workflow = get_workflow(base_llm=base, strong_llm=strong)
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage
+
+from benchmarks.corpus import ANSWERS, Problem
+from providers.model_factory import LLM, models
+from utils.image_prep import prepare_image_sync
+
+_PACKED_RE = re.compile(r"^Problem (\d+):\n(.*?)(?=\n\nProblem \d+:\n|\Z)", re.S | re.M)
+_NUMBER_RE = re.compile(r"-?\d+")
+
+
+def _wrong(answer: str) -> str:
+    """A plausible but incorrect variant of `answer`."""
+    m = _NUMBER_RE.search(answer)
+    if m:
+        return f"{answer[: m.start()]}{int(m.group()) + 1}{answer[m.end():]}"
+    return f"{answer} + 1"
+
+
+def image_keys(pairs: Sequence[Tuple[bytes, Problem]]) -> Dict[str, str]:
+    """sha256 of the base64 the vision prompt will carry -> question."""
+    keys = {}
+    for png, problem in pairs:
+        b64 = base64.b64encode(prepare_image_sync(png).data).decode("ascii")
+        keys[hashlib.sha256(b64.encode("ascii")).hexdigest()] = problem.question
+    return keys
+
+
+class FakeChat:
+    def __init__(
+        self,
+        name: str,
+        seed: int = 0,
+        median: float = 0.8,
+        sigma: float = 0.4,
+        accuracy: float = 0.9,
+        confidence: Tuple[float, float] = (0.7, 0.95),
+        malformed_rate: float = 0.0,
+        images: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.name = name
+        self.seed = seed
+        self.mu = math.log(median)
+        self.sigma = sigma
+        self.accuracy = accuracy
+        self.confidence = confidence
+        self.malformed_rate = malformed_rate
+        self.images = images or {}
+        self._repeats: Dict[str, int] = {}
+        self.calls = 0
+
+    def _rng(self, prompt: str) -> random.Random:
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        n = self._repeats.get(key, 0)
+        self._repeats[key] = n + 1
+        return random.Random(f"{self.seed}:{self.name}:{key}:{n}")
+
+    def _solution(self, rng: random.Random, question: Optional[str]) -> Dict:
+        answer = ANSWERS.get(question or "")
+        if answer is None:
+            return {
+                "steps": [{"title": "Read", "explanation": "Problem not recognised."}],
+                "final_answer": "",
+                "difficulty": 3,
+                "confidence": 0.2,
+            }
+        if rng.random() >= self.accuracy:
+            answer = _wrong(answer)
+        return {
+            "steps": [
+                {"title": "Set up", "explanation": f"Restate: {question}"},
+                {"title": "Solve", "explanation": f"Work it through to {answer}."},
+            ],
+            "final_answer": answer,
+            "difficulty": 2,
+            "confidence": round(rng.uniform(*self.confidence), 3),
+        }
+
+    def _malformed(self, rng: random.Random, body: Dict) -> str:
+        """The kinds of broken JSON models produce; only the last is unrecoverable."""
+        text = json.dumps(body)
+        kind = rng.randrange(4)
+        if kind == 0:
+            return f"Sure! Here is the solution:\n{text}\nHope this helps."
+        if kind == 1:
+            return text.replace("}]", "},]", 1)
+        if kind == 2:
+            return text.replace("Restate:", "Restate \\(q\\):", 1)  # LaTeX escape
+        return text[: len(text) // 3]
+
+    async def _reply(self, messages, structured: bool) -> Tuple[AIMessage, Dict]:
+        self.calls += 1
+        texts: List[str] = []
+        image: Optional[str] = None
+        for m in messages:
+            if isinstance(m.content, str):
+                texts.append(m.content)
+                continue
+            for part in m.content:
+                if part.get("type") == "text":
+                    texts.append(part["text"])
+                elif part.get("type") == "image_url":
+                    url = part["image_url"]
+                    url = url if isinstance(url, str) else url.get("url", "")
+                    image = url.split("base64,", 1)[-1]
+        user = texts[-1] if texts else ""
+        rng = self._rng("\n".join(texts) + (image or ""))
+        await asyncio.sleep(rng.lognormvariate(self.mu, self.sigma))
+
+        malformed = rng.random() < self.malformed_rate
+        if image is not None:
+            question = self.images.get(
+                hashlib.sha256(image.encode("ascii")).hexdigest()
+            )
+            body = {**self._solution(rng, question), "topic": "image"}
+        elif _PACKED_RE.match(user):
+            solutions = [
+                {"id": int(n), **self._solution(rng, q.strip())}
+                for n, q in _PACKED_RE.findall(user)
+            ]
+            body = {"solutions": solutions}
+        else:
+            question = user.split("\n\n---\n", 1)[0].strip()
+            body = {**self._solution(rng, question), "topic": "math"}
+        # Schema-constrained decoding cannot produce malformed JSON.
+        content = (
+            self._malformed(rng, body)
+            if malformed and not structured
+            else json.dumps(body)
+        )
+
+        prompt_tokens = sum(len(t) for t in texts) // 4 + (258 if image else 0)
+        completion_tokens = len(content) // 4
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return message, body
+
+    async def ainvoke(self, messages) -> AIMessage:
+        message, _ = await self._reply(messages, structured=False)
+        return message
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return _FakeStructured(self, schema, include_raw)
+
+
+class _FakeStructured:
+    """What `with_structured_output` returns: validated objects, like a provider's."""
+
+    def __init__(self, chat: FakeChat, schema, include_raw: bool) -> None:
+        self.chat = chat
+        self.schema = schema
+        self.include_raw = include_raw
+
+    async def ainvoke(self, messages):
+        message, body = await self.chat._reply(messages, structured=True)
+        try:
+            parsed, error = self.schema.model_validate(body), None
+        except ValueError as e:
+            parsed, error = None, e
+        if not self.include_raw:
+            if error is not None:
+                raise error
+            return parsed
+        return {"raw": message, "parsed": parsed, "parsing_error": error}
+
+
+def fake_llm(name: str, **kwargs) -> LLM:
+    """An `LLM` backed by `FakeChat`; kwargs go to `FakeChat`."""
+    return LLM(name, "fake", model=FakeChat(name, **kwargs))
+
+
+def pin_fakes(base: LLM, strong: LLM, vision: LLM, vision_strong: LLM) -> None:
+    """Make the shared model registry (hence the API) use fakes for every role."""
+    models.pin("text_default", base)
+    models.pin("text_stronger", strong)
+    models.pin("vision_default", vision)
+    models.pin("vision_stronger", vision_strong)
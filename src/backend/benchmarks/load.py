@@ -0,0 +1,189 @@
+"""
+Load test of the ASGI app against fake models: throughput, latency, per-node time.
+
+    python -m benchmarks.load --requests 500 --concurrency 32 --image-share 0.2
+
+Requests go in-process through httpx's ASGITransport, so the figures cover
+auth override, admission, routing, caches, the graph, SymPy verification and
+image preparation, but not sockets. Every model role is pinned to a
+`FakeChat` (benchmarks.fakes) answering the benchmarks.corpus problems.
+Solution and image caches are off unless --cache is given, so repeated
+questions still exercise the pipeline. Per-node figures come from the
+`include_timing` spans of each response.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--image-share", type=float, default=0.2)
+    ap.add_argument("--cache", action="store_true", help="keep the caches on")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--base-median", type=float, default=0.6)
+    ap.add_argument("--strong-median", type=float, default=2.0)
+    ap.add_argument("--sigma", type=float, default=0.4)
+    ap.add_argument("--base-accuracy", type=float, default=0.85)
+    ap.add_argument("--strong-accuracy", type=float, default=0.98)
+    ap.add_argument("--malformed-rate", type=float, default=0.02)
+    return ap.parse_args()
+
+
+def _quantiles(samples: List[float]) -> tuple:
+    if len(samples) < 2:
+        v = samples[0] if samples else 0.0
+        return v, v, v
+    qs = statistics.quantiles(samples, n=100)
+    return qs[49], qs[94], qs[98]
+
+
+def _report(results: List[Dict], wall: float, args) -> None:
+    codes = Counter(r["status"] for r in results)
+    errors = {c: n for c, n in sorted(codes.items()) if c != 200}
+    print(
+        f"requests={len(results)} concurrency={args.concurrency} "
+        f"wall={wall:.2f}s rps={len(results) / wall:.1f} errors={errors or 0}"
+    )
+    print(f"{'endpoint':<10} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+    by_endpoint = defaultdict(list)
+    for r in results:
+        by_endpoint[r["endpoint"]].append(r["seconds"] * 1000.0)
+        by_endpoint["all"].append(r["seconds"] * 1000.0)
+    for name, samples in by_endpoint.items():
+        p50, p95, p99 = _quantiles(samples)
+        print(f"{name:<10} {len(samples):5d} {p50:8.1f}ms {p95:8.1f}ms {p99:8.1f}ms")
+
+    spans = defaultdict(list)
+    for r in results:
+        for s in r["timing"]:
+            spans[s["name"]].append(s["seconds"] * 1000.0)
+    total = sum(spans.pop("total", [])) or 1.0
+    print(f"\n{'span':<20} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'share':>6}")
+    for name, samples in sorted(spans.items(), key=lambda kv: -sum(kv[1])):
+        p50, p95, p99 = _quantiles(samples)
+        print(
+            f"{name:<20} {len(samples):5d} {p50:8.1f}ms {p95:8.1f}ms {p99:8.1f}ms "
+            f"{sum(samples) / total:6.1%}"
+        )
+
+
+async def _run(args) -> None:
+    import httpx
+
+    import main as app_module
+    from api.deps import get_current_user
+    from benchmarks.corpus import PROBLEMS, image_problems
+    from benchmarks.fakes import fake_llm, image_keys, pin_fakes
+    from fastapi import Header
+
+    images = image_problems()
+    keys = image_keys(images)
+    common = dict(seed=args.seed, sigma=args.sigma, malformed_rate=args.malformed_rate)
+    pin_fakes(
+        fake_llm(
+            "fake-base", median=args.base_median, accuracy=args.base_accuracy, **common
+        ),
+        fake_llm(
+            "fake-strong",
+            median=args.strong_median,
+            accuracy=args.strong_accuracy,
+            **common,
+        ),
+        fake_llm(
+            "fake-vision",
+            median=args.base_median,
+            accuracy=args.base_accuracy,
+            images=keys,
+            **common,
+        ),
+        fake_llm(
+            "fake-vision-strong",
+            median=args.strong_median,
+            accuracy=args.strong_accuracy,
+            images=keys,
+            **common,
+        ),
+    )
+
+    async def bench_user(authorization: str = Header("Bearer bench")) -> str:
+        return authorization.split(" ", 1)[-1]
+
+    app_module.app.dependency_overrides[get_current_user] = bench_user
+
+    rng = random.Random(args.seed)
+    plan = [
+        (
+            ("image", rng.randrange(len(images)))
+            if rng.random() < args.image_share
+            else ("text", rng.randrange(len(PROBLEMS)))
+        )
+        for _ in range(args.requests)
+    ]
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+    results: List[Dict] = []
+
+    async def worker(client: httpx.AsyncClient, n: int) -> None:
+        headers = {"Authorization": f"Bearer bench-{n}"}
+        while not queue.empty():
+            endpoint, i = queue.get_nowait()
+            t0 = time.perf_counter()
+            if endpoint == "text":
+                r = await client.post(
+                    "/solve-text",
+                    json={"question": PROBLEMS[i].question, "include_timing": True},
+                    headers=headers,
+                )
+            else:
+                r = await client.post(
+                    "/solve-image",
+                    params={"include_timing": "true"},
+                    files={"file": ("problem.png", images[i][0], "image/png")},
+                    headers=headers,
+                )
+            seconds = time.perf_counter() - t0
+            body = r.json() if r.status_code == 200 else {}
+            results.append(
+                {
+                    "endpoint": endpoint,
+                    "status": r.status_code,
+                    "seconds": seconds,
+                    "timing": body.get("timing") or [],
+                }
+            )
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client, n) for n in range(args.concurrency)))
+        wall = time.perf_counter() - t0
+    _report(results, wall, args)
+
+
+def main() -> None:
+    args = _parse_args()
+    # Settings are read at import time, so configure before importing the app.
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    os.environ.setdefault("CPU_EXECUTOR", "thread")
+    os.environ.setdefault("USER_RATE_PER_MINUTE", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.cache:
+        os.environ["SOLVE_CACHE_BACKEND"] = "none"
+        os.environ["IMAGE_CACHE_ENABLED"] = "false"
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
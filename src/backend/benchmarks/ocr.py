@@ -0,0 +1,179 @@
+"""
+Per-image OCR latency and CPU time: the pytesseract CLI against pooled in-process engines.
+
+    python -m benchmarks.ocr --repeat 5 --pages 4
+
+Inputs are the benchmarks.corpus images (one line each) and synthetic
+worksheet pages (several corpus questions on a noisy, unevenly lit page),
+normalized by `prepare_image_sync` as /solve-image does. Paths:
+
+    cli     pytesseract over the whole thresholded image (the previous path)
+    fresh   a new tesserocr engine per image, whole image (the model load the
+            CLI pays on every call, without the fork)
+    pooled  one reused tesserocr engine, whole image
+    lines   one reused engine reading each detected line with OCR_LINE_PSM
+            (the current `_extract_text_sync`, line detection included)
+
+Prints per-input-kind medians of wall and CPU time (this process plus
+children, so the CLI's `tesseract` is counted) and the similarity of the text
+to the rendered questions. "cli" needs the `tesseract` binary, the others
+tesserocr with eng.traineddata (OCR_TESSDATA_PATH or TESSDATA_PREFIX).
+"""
+
+import argparse
+import difflib
+import io
+import os
+import random
+import resource
+import shutil
+import statistics
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+import numpy as np  # noqa: E402
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+from benchmarks.corpus import PROBLEMS, image_problems  # noqa: E402
+from utils import image_ocr  # noqa: E402
+from utils.image_prep import prepare_image_sync  # noqa: E402
+
+
+def _page(lines: List[str], rng: random.Random) -> bytes:
+    """`lines` on a 1400 px wide page with shading and noise."""
+    img = Image.new("L", (1400, max(1000, 160 + 110 * len(lines))), 255)
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=34)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    for i, line in enumerate(lines):
+        draw.text((60, 80 + i * 110), line, fill=20, font=font)
+    px = np.asarray(img, dtype=np.float32)
+    shade = np.linspace(0.0, 70.0, px.shape[1])[None, :]
+    noise = np.random.default_rng(rng.randrange(1 << 30)).normal(0, 12, px.shape)
+    px = np.clip(px - shade + noise, 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(px).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _inputs(pages: int, seed: int) -> List[Tuple[str, np.ndarray, str]]:
+    """(kind, prepared BGR pixels, ground-truth text)."""
+    out = [
+        ("line", prepare_image_sync(png).pixels, p.question)
+        for png, p in image_problems()
+    ]
+    rng = random.Random(seed)
+    for _ in range(pages):
+        qs = [p.question for p in rng.sample(PROBLEMS, 6)]
+        page = _page([f"{i + 1}. {q}" for i, q in enumerate(qs)], rng)
+        out.append(("page", prepare_image_sync(page).pixels, "\n".join(qs)))
+    return out
+
+
+def _whole(api, binary: np.ndarray) -> str:
+    from tesserocr import PSM
+
+    h, w = binary.shape[:2]
+    api.SetImageBytes(np.ascontiguousarray(binary).tobytes(), w, h, 1, w)
+    api.SetPageSegMode(PSM.AUTO)
+    return api.GetUTF8Text()
+
+
+def _cli(img: np.ndarray) -> str:
+    import pytesseract
+
+    return pytesseract.image_to_string(image_ocr._preprocess(img), lang="eng")
+
+
+def _fresh(img: np.ndarray) -> str:
+    api = image_ocr._EnginePool()._new()
+    try:
+        return _whole(api, image_ocr._preprocess(img))
+    finally:
+        api.End()
+
+
+def _pooled(img: np.ndarray) -> str:
+    with image_ocr._engines.engine() as api:
+        return _whole(api, image_ocr._preprocess(img))
+
+
+def _lines(img: np.ndarray) -> str:
+    binary = image_ocr._preprocess(img)
+    lines = image_ocr._read_lines_tesserocr(binary, image_ocr._text_lines(binary))
+    return "\n".join(t for t in lines if t)
+
+
+def _cpu() -> float:
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        r = resource.getrusage(who)
+        total += r.ru_utime + r.ru_stime
+    return total
+
+
+def _similarity(text: str, truth: str) -> float:
+    def norm(s: str) -> str:
+        return "".join(s.lower().split())
+
+    return difflib.SequenceMatcher(None, norm(text), norm(truth)).ratio()
+
+
+def _available() -> Dict[str, Callable[[np.ndarray], str]]:
+    paths: Dict[str, Callable[[np.ndarray], str]] = {}
+    if shutil.which("tesseract"):
+        paths["cli"] = _cli
+    else:
+        print("cli: skipped (no `tesseract` binary on PATH)")
+    try:
+        with image_ocr._engines.engine():
+            pass
+    except Exception as e:
+        print(f"fresh/pooled/lines: skipped ({type(e).__name__}: {e})")
+    else:
+        paths.update(fresh=_fresh, pooled=_pooled, lines=_lines)
+    return paths
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--pages", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    inputs = _inputs(args.pages, args.seed)
+    paths = _available()
+    wall: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    cpu: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    sim: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    for name, fn in paths.items():
+        for _ in range(args.repeat):
+            for kind, img, truth in inputs:
+                c0, t0 = _cpu(), time.perf_counter()
+                text = fn(img)
+                wall[name, kind].append((time.perf_counter() - t0) * 1000.0)
+                cpu[name, kind].append((_cpu() - c0) * 1000.0)
+                sim[name, kind].append(_similarity(text, truth))
+
+    kinds = sorted({k for k, _, _ in inputs})
+    print(
+        f"{'path':<8} {'input':<6} {'n':>4} {'wall p50':>10} {'cpu p50':>10} {'text':>6}"
+    )
+    for name in paths:
+        for kind in kinds:
+            w = wall[name, kind]
+            print(
+                f"{name:<8} {kind:<6} {len(w):4d} {statistics.median(w):8.1f}ms "
+                f"{statistics.median(cpu[name, kind]):8.1f}ms "
+                f"{statistics.fmean(sim[name, kind]):6.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Worksheet photos: one /solve-image/problems request against an upload per problem.
+
+    python -m benchmarks.segment --pages 5 --problems 8 --vision-median 0.6
+
+Builds noisy worksheet pages (benchmarks.ocr `_page`) of benchmarks.corpus
+questions numbered in one of several styles ("3.", "3)", "Problem 3:",
+"Bài 3."), some followed by a line of answer choices, and checks that
+`segment_sync` finds every problem under the right label. Then, through
+httpx's ASGITransport with every model pinned to a `FakeChat`
+(benchmarks.fakes), times solving each page as one /solve-image/problems
+request against uploading every problem's own photo to /solve-image one
+after the other, as users crop and send them today. Needs an OCR engine (see
+benchmarks.ocr); caches are off.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+os.environ.setdefault("SOLVE_CACHE_BACKEND", "none")
+os.environ.setdefault("IMAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("CPU_EXECUTOR", "thread")
+
+STYLES = ("{n}. {q}", "{n}) {q}", "Problem {n}: {q}", "Bài {n}. {q}")
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--pages", type=int, default=5)
+    ap.add_argument("--problems", type=int, default=8)
+    ap.add_argument("--choices", type=float, default=0.3, help="share with options")
+    ap.add_argument("--vision-median", type=float, default=0.6)
+    ap.add_argument("--seed", type=int, default=0)
+    return ap.parse_args()
+
+
+def _worksheet(problems, style: str, choices: float, rng: random.Random) -> List[str]:
+    from benchmarks.fakes import _wrong
+
+    lines = []
+    for n, p in enumerate(problems, 1):
+        lines.append(style.format(n=n, q=p.question))
+        if rng.random() < choices:
+            lines.append(f"    (1) {p.answer}    (2) {_wrong(p.answer)}")
+    return lines
+
+
+def _key(data: bytes) -> str:
+    """How benchmarks.fakes recognises an image in the vision prompt."""
+    return hashlib.sha256(base64.b64encode(data)).hexdigest()
+
+
+async def _run(args) -> None:
+    import httpx
+    from fastapi import Header
+
+    import main as app_module
+    from api.deps import get_current_user
+    from benchmarks.corpus import PROBLEMS, render
+    from benchmarks.fakes import fake_llm, pin_fakes
+    from benchmarks.ocr import _page
+    from utils.image_prep import prepare_image_sync
+    from utils.image_segment import segment_sync
+
+    rng = random.Random(args.seed)
+    pages: List[Tuple[bytes, list]] = []
+    for _ in range(args.pages):
+        problems = rng.sample(PROBLEMS, min(args.problems, len(PROBLEMS)))
+        lines = _worksheet(problems, rng.choice(STYLES), args.choices, rng)
+        pages.append((_page(lines, rng), problems))
+
+    # Segmentation, and the crops' keys so the fake vision model knows them.
+    images: Dict[str, str] = {}
+    found = exact = 0
+    seg_ms = []
+    for png, problems in pages:
+        page = prepare_image_sync(png)
+        t0 = time.perf_counter()
+        regions = segment_sync(page)
+        seg_ms.append((time.perf_counter() - t0) * 1000.0)
+        labels = [r.label for r in regions]
+        want = [str(n) for n in range(1, len(problems) + 1)]
+        found += len(set(labels) & set(want))
+        exact += labels == want
+        for r in regions:
+            if r.label in want:
+                images[_key(r.image.data)] = problems[int(r.label) - 1].question
+    for p in PROBLEMS:
+        images[_key(prepare_image_sync(render(p.question)).data)] = p.question
+    total = sum(len(p) for _, p in pages)
+    print(
+        f"segmentation: pages={len(pages)} problems={total} "
+        f"found={found} ({found / total:.0%}) exact pages={exact}/{len(pages)} "
+        f"p50={statistics.median(seg_ms):.0f}ms"
+    )
+
+    common = dict(seed=args.seed, sigma=0.3, accuracy=0.95)
+    pin_fakes(
+        fake_llm("fake-base", median=args.vision_median, **common),
+        fake_llm("fake-strong", median=args.vision_median * 2, **common),
+        fake_llm("fake-vision", median=args.vision_median, images=images, **common),
+        fake_llm(
+            "fake-vision-strong",
+            median=args.vision_median * 2,
+            images=images,
+            **common,
+        ),
+    )
+
+    async def bench_user(authorization: str = Header("Bearer bench")) -> str:
+        return authorization.split(" ", 1)[-1]
+
+    app = app_module.app
+    app.dependency_overrides[get_current_user] = bench_user
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": "Bearer bench"}
+    one, each, solved = [], [], 0
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers=headers, timeout=120
+        ) as client:
+            for png, problems in pages:
+                t0 = time.perf_counter()
+                r = await client.post(
+                    "/solve-image/problems",
+                    files={"file": ("page.png", png, "image/png")},
+                )
+                one.append(time.perf_counter() - t0)
+                r.raise_for_status()
+                solved += sum(
+                    1
+                    for p in r.json()["problems"]
+                    if p["status"] == 200 and p["result"]["final_answer"]
+                )
+
+                t0 = time.perf_counter()
+                for p in problems:
+                    r = await client.post(
+                        "/solve-image",
+                        files={"file": ("p.png", render(p.question), "image/png")},
+                    )
+                    r.raise_for_status()
+                each.append(time.perf_counter() - t0)
+
+    print(f"solved from pages: {solved}/{total}")
+    print(f"{'page request':<16} p50={statistics.median(one):6.2f}s")
+    print(f"{'one per problem':<16} p50={statistics.median(each):6.2f}s")
+
+
+def main() -> None:
+    asyncio.run(_run(_parse_args()))
+
+
+if __name__ == "__main__":
+    main()
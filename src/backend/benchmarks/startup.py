@@ -0,0 +1,168 @@
+"""
+Cold start of a worker: import time, time to ready and first-request latency.
+
+    python -m benchmarks.startup --runs 5 --modes off,background,blocking
+
+Every run is a fresh interpreter, so nothing is already imported or warm.
+The child imports `main`, runs the app lifespan under one STARTUP_WARMUP mode
+and talks to the app in-process through httpx's ASGITransport: it polls
+`/ready` until 200 (a load balancer's view), then times two fast-path
+questions (SymPy in the CPU pool, no model) and one question for the model.
+Every model role is pinned to a `FakeChat` (benchmarks.fakes) answering at
+once, so "llm" measures our own first-call overhead (graph compile, prompt
+setup). Building the real provider clients — the langchain import a warm-up
+takes off the request path — is timed on its own as "clients". --importtime
+lists the slowest modules under `import main` (python -X importtime).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+FAST = ("2x + 3 = 11", "3(x - 2) = 2x + 5")
+LLM_QUESTION = "Prove that the sum of two even numbers is even"
+COLUMNS = ("import", "startup", "ready", "fast1", "fast2", "llm")
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--modes", default="off,background,blocking")
+    ap.add_argument("--executor", default="process", choices=("process", "thread"))
+    ap.add_argument("--importtime", type=int, default=0, metavar="N")
+    ap.add_argument("--child", default="", help=argparse.SUPPRESS)
+    return ap.parse_args()
+
+
+async def _child_app() -> Dict[str, float]:
+    t0 = time.perf_counter()
+    import main as app_module
+
+    out = {"import": time.perf_counter() - t0}
+
+    import httpx
+    from fastapi import Header
+
+    from api.deps import get_current_user
+    from benchmarks.fakes import fake_llm, pin_fakes
+
+    pin_fakes(*(fake_llm(f"fake-{i}", median=0.001, sigma=0.0) for i in range(4)))
+
+    async def bench_user(authorization: str = Header("Bearer bench")) -> str:
+        return authorization.split(" ", 1)[-1]
+
+    app = app_module.app
+    app.dependency_overrides[get_current_user] = bench_user
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": "Bearer bench"}
+
+    async def solve(client: httpx.AsyncClient, question: str) -> float:
+        t = time.perf_counter()
+        r = await client.post("/solve-text", json={"question": question})
+        r.raise_for_status()
+        return time.perf_counter() - t
+
+    t0 = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        out["startup"] = time.perf_counter() - t0
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers=headers
+        ) as client:
+            while (await client.get("/ready")).status_code != 200:
+                if time.perf_counter() - t0 > 120:
+                    raise RuntimeError("worker never became ready")
+                await asyncio.sleep(0.01)
+            out["ready"] = time.perf_counter() - t0
+            out["fast1"] = await solve(client, FAST[0])
+            out["fast2"] = await solve(client, FAST[1])
+            out["llm"] = await solve(client, LLM_QUESTION)
+    return out
+
+
+def _child_clients() -> Dict[str, float]:
+    from providers.model_factory import models
+
+    t0 = time.perf_counter()
+    models.get("text_default")
+    return {"clients": time.perf_counter() - t0}
+
+
+def _spawn(child: str, env: Dict[str, str], *flags: str) -> subprocess.CompletedProcess:
+    cmd = [sys.executable, *flags, "-m", "benchmarks.startup", "--child", child]
+    return subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+
+
+def _env(mode: str, executor: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    env.update(
+        STARTUP_WARMUP=mode,
+        CPU_EXECUTOR=executor,
+        SOLVE_CACHE_BACKEND="none",
+        JOBS_ENABLED="false",
+        LOG_LEVEL="warning",
+    )
+    return env
+
+
+def _importtime(n: int, env: Dict[str, str]) -> None:
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    print(f"\nslowest imports under `import main` (cumulative):")
+    for us, name in sorted(rows, reverse=True)[:n]:
+        print(f"{us / 1000:9.1f}ms {name}")
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.child == "app":
+        print(json.dumps(asyncio.run(_child_app())))
+        return
+    if args.child == "clients":
+        print(json.dumps(_child_clients()))
+        return
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    print(f"executor={args.executor} runs={args.runs} (medians, ms)")
+    print(f"{'mode':<11}" + "".join(f"{c:>9}" for c in COLUMNS))
+    for mode in modes:
+        env = _env(mode, args.executor)
+        runs: List[Dict[str, float]] = [
+            json.loads(_spawn("app", env).stdout.splitlines()[-1])
+            for _ in range(args.runs)
+        ]
+        print(
+            f"{mode:<11}"
+            + "".join(
+                f"{statistics.median(r[c] for r in runs) * 1000:9.1f}" for c in COLUMNS
+            )
+        )
+
+    env = _env("off", args.executor)
+    clients = [
+        json.loads(_spawn("clients", env).stdout.splitlines()[-1])["clients"]
+        for _ in range(args.runs)
+    ]
+    print(f"\nclients    {statistics.median(clients) * 1000:9.1f}ms")
+    if args.importtime:
+        _importtime(args.importtime, env)
+
+
+if __name__ == "__main__":
+    main()
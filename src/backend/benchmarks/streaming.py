@@ -0,0 +1,139 @@
+"""
+Time-to-first-step of the streaming solve endpoint versus the blocking one.
+
+    python -m benchmarks.streaming --requests 50 --steps 10
+
+The models are fakes that stream a `--steps` solution in `--chunk-chars`
+pieces every `--chunk-ms`, after a `--first-token-ms` delay. "blocking" is
+the /solve-text path (the whole JSON before anything is returned),
+"stream" is /solve-text/stream, measured to the first "step" event and to
+the final "result".
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+os.environ.setdefault("CPU_EXECUTOR", "thread")
+
+import structlog  # noqa: E402
+from langchain_core.messages import AIMessageChunk  # noqa: E402
+
+from api.routers import solve  # noqa: E402
+from core.streaming import format_ndjson  # noqa: E402
+from providers.model_factory import LLM  # noqa: E402
+from reasoner.graph import build_workflow  # noqa: E402
+
+
+class _StreamingFake:
+    def __init__(self, args) -> None:
+        self.args = args
+
+    def _body(self) -> str:
+        steps = [
+            {
+                "title": f"Step {i + 1}",
+                "explanation": "Apply integration by parts. " * 4,
+            }
+            for i in range(self.args.steps)
+        ]
+        return json.dumps(
+            {
+                "steps": steps,
+                "final_answer": "-x cos(x) + sin(x) + C",
+                "difficulty": 3,
+                "confidence": 0.9,
+            }
+        )
+
+    async def astream(self, messages):
+        await asyncio.sleep(self.args.first_token_ms / 1000.0)
+        body = self._body()
+        n = self.args.chunk_chars
+        for i in range(0, len(body), n):
+            await asyncio.sleep(self.args.chunk_ms / 1000.0)
+            yield AIMessageChunk(content=body[i : i + n])
+        yield AIMessageChunk(
+            content="",
+            usage_metadata={
+                "input_tokens": 300,
+                "output_tokens": len(body) // 4,
+                "total_tokens": 300 + len(body) // 4,
+            },
+        )
+
+    async def ainvoke(self, messages):
+        full = None
+        async for chunk in self.astream(messages):
+            full = chunk if full is None else full + chunk
+        return full
+
+
+async def _blocking(question: str) -> float:
+    t0 = time.perf_counter()
+    await solve._solve_question_streaming(question, "auto", "en")
+    return time.perf_counter() - t0
+
+
+async def _streamed(question: str) -> tuple[float, float]:
+    t0 = time.perf_counter()
+    first = None
+    run = lambda: solve._solve_question_streaming(question, "auto", "en")  # noqa: E731
+    async for line in solve._event_stream(run, format_ndjson, "bench", "bench"):
+        event = json.loads(line)["event"]
+        if event == "step" and first is None:
+            first = time.perf_counter() - t0
+    return first, time.perf_counter() - t0
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = [s * 1000.0 for s in samples]
+    qs = statistics.quantiles(samples, n=100)
+    print(
+        f"{label:<22} mean={statistics.fmean(samples):7.0f}ms "
+        f"p50={qs[49]:7.0f}ms p95={qs[94]:7.0f}ms"
+    )
+
+
+async def _main(args) -> None:
+    fake = _StreamingFake(args)
+    wf = build_workflow(
+        LLM("gemini-2.5-flash", "fake", model=fake),
+        LLM("gemini-2.5-pro", "fake", model=fake),
+    )
+    solve.get_workflow = lambda: wf
+    solve.solution_cache = None
+
+    blocking, first, total = [], [], []
+    for i in range(args.requests):
+        question = f"integrate x^{i + 1} sin(x)"
+        blocking.append(await _blocking(question))
+        f, t = await _streamed(question)
+        first.append(f)
+        total.append(t)
+    _report("blocking (response)", blocking)
+    _report("stream (first step)", first)
+    _report("stream (result)", total)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=50)
+    ap.add_argument("--steps", type=int, default=10)
+    ap.add_argument("--chunk-chars", type=int, default=16)
+    ap.add_argument("--chunk-ms", type=float, default=5.0)
+    ap.add_argument("--first-token-ms", type=float, default=300.0)
+    args = ap.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
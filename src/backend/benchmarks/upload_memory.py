@@ -0,0 +1,182 @@
+"""
+Peak memory of the API process per concurrent image upload.
+
+    python -m benchmarks.upload_memory --concurrency 1,8,32 --megapixels 12
+    python -m benchmarks.upload_memory --tree /tmp/before  # an older checkout
+
+Every concurrency level gets a fresh server: uvicorn in a child process
+running the app from --tree (default: this checkout), with every model
+pinned to an instant `FakeChat` (benchmarks.fakes) and caches off. Once it
+is ready, that many distinct camera-sized JPEG photos are posted to
+/solve-image at once and the rise of the server's peak RSS (VmHWM) is
+reported, in total and per request; each upload is a user of its own so
+per-user admission does not turn them away. CPU pool workers are processes of their
+own and not counted: what is measured is the copies the web process makes
+of each upload (reading it, handing it to the pool, the vision data URL).
+Linux only (/proc).
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+HERE = Path(__file__).resolve().parent.parent
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--concurrency", default="1,8,32")
+    ap.add_argument("--megapixels", type=float, default=12.0)
+    ap.add_argument("--workers", type=int, default=2, help="CPU_WORKERS")
+    ap.add_argument("--tree", default=str(HERE), help="backend source to serve")
+    ap.add_argument("--child", default="", help=argparse.SUPPRESS)
+    ap.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    return ap.parse_args()
+
+
+def _serve(port: int) -> None:
+    import uvicorn
+    from fastapi import Header
+
+    import main as app_module
+    from api.deps import get_current_user
+    from benchmarks.fakes import fake_llm, pin_fakes
+
+    pin_fakes(*(fake_llm(f"fake-{i}", median=0.001, sigma=0.0) for i in range(4)))
+
+    async def bench_user(authorization: str = Header("Bearer bench")) -> str:
+        return authorization.split(" ", 1)[-1]
+
+    app = app_module.app
+    app.dependency_overrides[get_current_user] = bench_user
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _photos(n: int, megapixels: float) -> List[bytes]:
+    """`n` distinct 4:3 JPEG photos of a page of equations (edge to edge, so
+    cropping to content keeps most of it)."""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+
+    w = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    h = w * 3 // 4
+    img = Image.new("L", (w, h), 235)
+    try:
+        font = ImageFont.load_default(size=w // 20)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    draw = ImageDraw.Draw(img)
+    for row in range(6):
+        y = h // 20 + row * h // 6
+        draw.text((w // 20, y), f"{row + 1}. 3(x - {row}) = 2x + 5", 20, font=font)
+    base = np.asarray(img, dtype=np.int16)
+    out = []
+    for seed in range(n):
+        noise = np.random.default_rng(seed).integers(-10, 11, base.shape, np.int16)
+        px = np.clip(base + noise, 0, 255).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(px).convert("RGB").save(buf, format="JPEG", quality=90)
+        out.append(buf.getvalue())
+    return out
+
+
+def _peak_kib(pid: int) -> int:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1])
+    raise RuntimeError("no VmHWM in /proc status")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _level(args, photos: List[bytes]) -> None:
+    import httpx
+
+    port = _free_port()
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    env.update(
+        PYTHONPATH=args.tree,
+        CPU_EXECUTOR="process",
+        CPU_WORKERS=str(args.workers),
+        SOLVE_CACHE_BACKEND="none",
+        IMAGE_CACHE_ENABLED="false",
+        JOBS_ENABLED="false",
+        USER_RATE_PER_MINUTE="0",
+        LOG_LEVEL="warning",
+    )
+    cmd = [sys.executable, __file__, "--child", "serve", "--port", str(port)]
+    server = subprocess.Popen(cmd, cwd=args.tree, env=env)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            timeout=300,
+            limits=httpx.Limits(max_connections=len(photos)),
+        ) as client:
+            t0 = time.perf_counter()
+            while True:
+                try:
+                    if (await client.get("/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() - t0 > 120:
+                    raise RuntimeError("server never became ready")
+                await asyncio.sleep(0.1)
+            base = _peak_kib(server.pid)
+
+            async def post(i: int, photo: bytes) -> int:
+                r = await client.post(
+                    "/solve-image",
+                    files={"file": ("photo.jpg", photo, "image/jpeg")},
+                    headers={"Authorization": f"Bearer bench-{i}"},
+                )
+                return r.status_code
+
+            t0 = time.perf_counter()
+            codes = await asyncio.gather(*(post(i, p) for i, p in enumerate(photos)))
+            wall = time.perf_counter() - t0
+            rise = (_peak_kib(server.pid) - base) / 1024
+            pool = (await client.get("/health")).json()["cpu_pool"]
+    finally:
+        server.terminate()
+        server.wait(10)
+    ok = sum(c == 200 for c in codes)
+    print(
+        f"{len(photos):>11} {ok:>4} {base / 1024:9.0f}MB {rise:9.0f}MB "
+        f"{rise / len(photos):9.1f}MB {wall:7.2f}s {pool['killed']:>8}"
+        + ("" if ok == len(codes) else f"  statuses={sorted(set(codes))}")
+    )
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.child == "serve":
+        _serve(args.port)
+        return
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    photos = _photos(max(levels), args.megapixels)
+    size = sum(map(len, photos)) / len(photos) / 2**20
+    print(f"tree={args.tree} upload={size:.1f}MB workers={args.workers}")
+    print(
+        f"{'concurrency':>11} {'ok':>4} {'idle peak':>11} {'rise':>11} "
+        f"{'per req':>11} {'wall':>8} {'replaced':>8}"
+    )
+    for n in levels:
+        asyncio.run(_level(args, photos[:n]))
+
+
+if __name__ == "__main__":
+    main()
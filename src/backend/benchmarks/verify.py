@@ -0,0 +1,102 @@
+"""
+Answer verification time: numeric sampling (reasoner.numcheck) against SymPy simplify.
+
+    python -m benchmarks.verify --repeat 5
+
+For every benchmarks.corpus problem `numcheck` can read, checks the right
+answer and a wrong one (benchmarks.fakes `_wrong`) both ways: `check`, and a
+purely symbolic verifier that reduces "answer minus expected" with
+`sp.simplify` (`sp.diff`, `sp.integrate` and `sp.limit` for the expected
+value). Prints per-kind medians and how often the two verdicts agree.
+Repeats hit `expr_cache` (parsed questions and answers, lambdified
+callables) unless --cold clears it before every check.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from collections import defaultdict
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+import sympy as sp  # noqa: E402
+
+from benchmarks.corpus import PROBLEMS  # noqa: E402
+from benchmarks.fakes import _wrong  # noqa: E402
+from reasoner.numcheck import (  # noqa: E402
+    _answer_expr,
+    _answer_values,
+    check,
+    expr_cache,
+    parse_problem,
+)
+
+
+def _symbolic(question: str, answer: str) -> bool:
+    """The verifier numcheck replaced: everything through `sp.simplify`."""
+    p = parse_problem(question)
+    if p.kind in ("equation", "system"):
+        names = sorted({str(s) for e in p.exprs for s in e.free_symbols})
+        assignments = _answer_values(answer, names)
+        return bool(assignments) and all(
+            sp.simplify(e.subs(a)) == 0 for a in assignments for e in p.exprs
+        )
+    target = _answer_expr(answer)
+    if target is None:
+        return False
+    f = p.exprs[0]
+    if p.kind == "derivative":
+        expected = sp.diff(f, p.var)
+    elif p.kind == "integral" and p.bounds is None:
+        target, expected = sp.diff(target, p.var), f
+    elif p.kind == "integral":
+        expected = sp.integrate(f, (p.var, *p.bounds))
+    elif p.kind == "limit":
+        expected = sp.limit(f, p.var, p.point)
+    else:
+        expected = f
+    return sp.simplify(target - expected) == 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--cold", action="store_true", help="clear expr_cache first")
+    args = ap.parse_args()
+
+    cases = [
+        (p, answer)
+        for p in PROBLEMS
+        if parse_problem(p.question) is not None
+        for answer in (p.answer, _wrong(p.answer))
+    ]
+    times = {"numeric": defaultdict(list), "symbolic": defaultdict(list)}
+    agree = 0
+    for p, answer in cases:
+        kind = parse_problem(p.question).kind
+        verdicts = {}
+        for name, fn in (("numeric", check), ("symbolic", _symbolic)):
+            for _ in range(args.repeat):
+                if args.cold:
+                    expr_cache.clear()
+                t0 = time.perf_counter()
+                verdicts[name] = fn(p.question, answer)
+                times[name][kind].append((time.perf_counter() - t0) * 1000.0)
+        agree += verdicts["numeric"] is verdicts["symbolic"]
+
+    kinds = sorted(times["numeric"])
+    print(f"{len(cases)} checks x {args.repeat} repeats (median ms)")
+    print(f"{'kind':<12} {'numeric':>9} {'symbolic':>9} {'speedup':>8}")
+    for kind in kinds:
+        n = statistics.median(times["numeric"][kind])
+        s = statistics.median(times["symbolic"][kind])
+        print(f"{kind:<12} {n:8.2f}ms {s:8.2f}ms {s / n:7.1f}x")
+    for name in times:
+        total = sum(sum(v) for v in times[name].values()) / args.repeat
+        print(f"{name:<9} total={total:8.1f}ms")
+    print(f"verdicts agree on {agree}/{len(cases)}")
+
+
+if __name__ == "__main__":
+    main()
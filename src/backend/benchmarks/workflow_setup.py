@@ -0,0 +1,58 @@
+"""
+Per-request setup cost of the reasoning workflow, before and after the
+process-level registry.
+
+    python -m benchmarks.workflow_setup --iterations 200
+
+"before" rebuilds the LLM clients and recompiles the graph on every call
+(what each /solve-text request used to do); "after" goes through the shared
+`get_workflow()`. No provider calls are made, only client construction.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+from providers.model_factory import ModelFactory  # noqa: E402
+from reasoner.graph import build_workflow, get_workflow  # noqa: E402
+
+
+def _per_request_build():
+    return build_workflow(ModelFactory.text_default(), ModelFactory.text_stronger())
+
+
+def _timeit(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    qs = statistics.quantiles(samples, n=100)
+    print(
+        f"{label:<8} mean={statistics.fmean(samples):8.3f}ms "
+        f"p50={qs[49]:8.3f}ms p99={qs[98]:8.3f}ms"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--iterations", type=int, default=200)
+    args = ap.parse_args()
+
+    # Warm imports and the shared instance so neither side pays one-off costs.
+    _per_request_build()
+    get_workflow()
+
+    _report("before", _timeit(_per_request_build, args.iterations))
+    _report("after", _timeit(get_workflow, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
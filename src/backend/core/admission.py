@@ -0,0 +1,272 @@
+"""
+Admission control: provider/model concurrency and rate limits, per-user quotas.
+
+Every LLM call takes a slot from its model's limiter and then from its
+provider's. A limiter combines a semaphore (concurrent calls), an optional
+token bucket (calls per second) and a bounded wait queue in front of both.
+Calls that would wait beyond the queue or its timeout fail fast with
+`Overloaded`, which the API turns into `429 Retry-After`. `UserQuota` caps
+concurrent requests and request rate per Firebase uid before any work starts.
+
+Limits default from Settings; LLM_LIMITS_JSON overrides them per model name or
+provider, e.g. {"gemini-2.5-pro": {"concurrency": 4, "rate": 2, "burst": 4}}.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from core.config import settings
+from core.metrics import ADMISSION_REJECTED, LLM_QUEUE_WAIT_SECONDS
+
+
+class Overloaded(RuntimeError):
+    """Shed load: the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, detail: str, retry_after: float) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token, possibly in advance; returns seconds until it is valid."""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def cancel(self) -> None:
+        """Give back a token from `reserve()` that will not be used."""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def try_take(self) -> Optional[float]:
+        """Take a token now; None on success, else seconds until one is free."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+class Limiter:
+    def __init__(
+        self,
+        scope: str,
+        key: str,
+        concurrency: int,
+        rate: float,
+        burst: float,
+        max_waiting: int,
+        timeout: float,
+    ) -> None:
+        self.scope = scope
+        self.key = key
+        self.concurrency = max(1, concurrency)
+        self.max_waiting = max(0, max_waiting)
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.waiting = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    def _reject(self, reason: str, retry_after: float) -> Overloaded:
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(scope=self.scope, reason=reason)
+        return Overloaded(f"{self.key} is overloaded ({reason})", retry_after)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self.waiting >= self.max_waiting and (
+            self._sem.locked() or self._bucket is not None
+        ):
+            raise self._reject("queue_full", self.timeout)
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            if self._bucket is not None:
+                delay = self._bucket.reserve()
+                if delay > self.timeout:
+                    self._bucket.cancel()
+                    raise self._reject("rate", delay)
+                if delay:
+                    try:
+                        await asyncio.sleep(delay)
+                    except asyncio.CancelledError:
+                        self._bucket.cancel()  # the caller left before its turn
+                        raise
+            if self._sem.locked():
+                remaining = self.timeout - (time.perf_counter() - t0)
+                try:
+                    await asyncio.wait_for(self._sem.acquire(), max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    raise self._reject("timeout", self.timeout) from None
+            else:
+                await self._sem.acquire()  # free slot: returns without suspending
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - t0
+        self.wait_seconds += waited
+        LLM_QUEUE_WAIT_SECONDS.observe(waited, scope=self.scope, key=self.key)
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+        }
+
+
+class LLMLimits:
+    """Lazily created limiters per model name and per provider."""
+
+    def __init__(self) -> None:
+        self._overrides: Dict[str, Dict] = (
+            json.loads(settings.llm_limits_json) if settings.llm_limits_json else {}
+        )
+        self._limiters: Dict[tuple, Limiter] = {}
+
+    def _limiter(self, scope: str, key: str) -> Limiter:
+        limiter = self._limiters.get((scope, key))
+        if limiter is None:
+            o = self._overrides.get(key, {})
+            limiter = Limiter(
+                scope,
+                key,
+                concurrency=int(
+                    o.get(
+                        "concurrency",
+                        (
+                            settings.llm_max_concurrency
+                            if scope == "model"
+                            else settings.llm_provider_max_concurrency
+                        ),
+                    )
+                ),
+                rate=float(
+                    o.get(
+                        "rate", settings.llm_rate_per_second if scope == "model" else 0
+                    )
+                ),
+                burst=float(o.get("burst", settings.llm_rate_burst)),
+                max_waiting=int(o.get("max_waiting", settings.llm_max_waiting)),
+                timeout=float(o.get("timeout", settings.llm_queue_timeout_seconds)),
+            )
+            self._limiters[(scope, key)] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model: str) -> AsyncIterator[None]:
+        async with self._limiter("model", model).slot():
+            async with self._limiter("provider", provider).slot():
+                yield
+
+    def stats(self) -> Dict:
+        limiters = list(self._limiters.values())
+        return {
+            "active": sum(l.active for l in limiters if l.scope == "model"),
+            "waiting": sum(l.waiting for l in limiters),
+            "rejected": sum(l.rejected for l in limiters),
+            "limiters": {
+                f"{scope}:{key}": limiter.stats()
+                for (scope, key), limiter in sorted(self._limiters.items())
+            },
+        }
+
+
+class UserQuota:
+    """Per-uid cap on concurrent requests plus a requests-per-minute bucket."""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        rate_per_minute: float,
+        burst: float,
+        max_users: int = 100_000,
+    ) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, int] = {}
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rejected = 0
+
+    def acquire(self, uid: str) -> None:
+        with self._lock:
+            if self._inflight.get(uid, 0) >= self.max_concurrent:
+                self.rejected += 1
+                ADMISSION_REJECTED.inc(scope="user", reason="concurrency")
+                raise Overloaded("too many concurrent requests", 1)
+            if self.rate > 0:
+                bucket = self._buckets.get(uid)
+                if bucket is None:
+                    bucket = self._buckets[uid] = TokenBucket(self.rate, self.burst)
+                    while len(self._buckets) > self.max_users:
+                        self._buckets.popitem(last=False)
+                self._buckets.move_to_end(uid)
+                retry = bucket.try_take()
+                if retry is not None:
+                    self.rejected += 1
+                    ADMISSION_REJECTED.inc(scope="user", reason="rate")
+                    raise Overloaded("request rate limit exceeded", retry)
+            self._inflight[uid] = self._inflight.get(uid, 0) + 1
+
+    def release(self, uid: str) -> None:
+        with self._lock:
+            n = self._inflight.get(uid, 0) - 1
+            if n > 0:
+                self._inflight[uid] = n
+            else:
+                self._inflight.pop(uid, None)
+
+    def stats(self) -> Dict:
+        return {
+            "users_active": len(self._inflight),
+            "in_flight": sum(self._inflight.values()),
+            "rejected": self.rejected,
+        }
+
+
+llm_limits = LLMLimits()
+user_quota = UserQuota(
+    settings.user_max_concurrent,
+    settings.user_rate_per_minute,
+    settings.user_rate_burst,
+)
@@ -28,10 +28,192 @@ class Settings(BaseSettings):
     )
 
     firebase_service_account_json: str = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON", "")
+    auth_cache_max_entries: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    auth_cache_max_ttl: float = float(os.getenv("AUTH_CACHE_MAX_TTL", "600"))
+    auth_cert_refresh_seconds: float = float(
+        os.getenv("AUTH_CERT_REFRESH_SECONDS", "300")
+    )
+
+    # Solved-question cache: "memory", "sqlite" or "none"
+    solve_cache_backend: str = os.getenv("SOLVE_CACHE_BACKEND", "memory")
+    solve_cache_max_entries: int = int(os.getenv("SOLVE_CACHE_MAX_ENTRIES", "2048"))
+    solve_cache_ttl_seconds: float = float(
+        os.getenv("SOLVE_CACHE_TTL_SECONDS", "86400")
+    )
+    solve_cache_sqlite_path: str = os.getenv(
+        "SOLVE_CACHE_SQLITE_PATH", "/tmp/math-solver-cache.sqlite3"
+    )
+
+    # Cache of /solve-image responses: exact pixels, or a look-alike (pHash
+    # within IMAGE_CACHE_MAX_DISTANCE bits) whose OCR text matches
+    image_cache_enabled: bool = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    image_cache_max_entries: int = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "1024"))
+    image_cache_ttl_seconds: float = float(
+        os.getenv("IMAGE_CACHE_TTL_SECONDS", "86400")
+    )
+    image_cache_max_distance: int = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "4"))
+
+    # CPU-heavy work (OCR, SymPy): "process" pool or "thread" pool
+    cpu_executor: str = os.getenv("CPU_EXECUTOR", "process")
+    cpu_workers: int = int(os.getenv("CPU_WORKERS", "0"))  # 0 = one per core
+    cpu_max_queue: int = int(os.getenv("CPU_MAX_QUEUE", "64"))
+    ocr_timeout_seconds: float = float(os.getenv("OCR_TIMEOUT_SECONDS", "20"))
+    verify_timeout_seconds: float = float(os.getenv("VERIFY_TIMEOUT_SECONDS", "2"))
+    fast_path_timeout_seconds: float = float(
+        os.getenv("FAST_PATH_TIMEOUT_SECONDS", "2")
+    )
+    # Answer checks: random points per numeric comparison, and the wall-clock
+    # budget of the symbolic tie-breaker when the samples are inconclusive
+    verify_samples: int = int(os.getenv("VERIFY_SAMPLES", "32"))
+    verify_symbolic_budget_seconds: float = float(
+        os.getenv("VERIFY_SYMBOLIC_BUDGET_SECONDS", "0.3")
+    )
+    # Parsed questions/answers and lambdified callables kept per process
+    sympy_cache_size: int = int(os.getenv("SYMPY_CACHE_SIZE", "4096"))
+
+    # solve_llm escalation: "sequential" (base -> critique -> strong),
+    # "hedge" (start strong once base is slower than its recent percentile) or
+    # "race" (critique and strong in parallel, first verified answer wins)
+    solve_escalation_strategy: str = os.getenv(
+        "SOLVE_ESCALATION_STRATEGY", "sequential"
+    )
+    solve_hedge_percentile: float = float(os.getenv("SOLVE_HEDGE_PERCENTILE", "0.9"))
+    solve_hedge_default_seconds: float = float(
+        os.getenv("SOLVE_HEDGE_DEFAULT_SECONDS", "8")
+    )
+    solve_hedge_min_seconds: float = float(os.getenv("SOLVE_HEDGE_MIN_SECONDS", "1"))
+
+    # Start hard problems (predicted to escalate anyway) on the strong model
+    preroute_enabled: bool = os.getenv("PREROUTE_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    preroute_threshold: float = float(os.getenv("PREROUTE_THRESHOLD", "0.7"))
+    preroute_explore: float = float(os.getenv("PREROUTE_EXPLORE", "0.1"))
+
+    # /solve-batch
+    batch_max_items: int = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    batch_pack_size: int = int(os.getenv("BATCH_PACK_SIZE", "5"))  # 0 = no packing
+    batch_pack_max_chars: int = int(os.getenv("BATCH_PACK_MAX_CHARS", "160"))
+
+    # Job mode for /solve-image (?job=true): SQLite-backed in-process queue
+    jobs_enabled: bool = os.getenv("JOBS_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    jobs_sqlite_path: str = os.getenv(
+        "JOBS_SQLITE_PATH", "/tmp/math-solver-jobs.sqlite3"
+    )
+    jobs_workers: int = int(os.getenv("JOBS_WORKERS", "4"))
+    jobs_max_queued: int = int(os.getenv("JOBS_MAX_QUEUED", "200"))
+    jobs_max_per_user: int = int(os.getenv("JOBS_MAX_PER_USER", "10"))
+    jobs_timeout_seconds: float = float(os.getenv("JOBS_TIMEOUT_SECONDS", "300"))
+    jobs_retention_seconds: float = float(os.getenv("JOBS_RETENTION_SECONDS", "3600"))
+    jobs_max_wait_seconds: float = float(os.getenv("JOBS_MAX_WAIT_SECONDS", "30"))
+
+    # Admission control: per-model / per-provider LLM limits, per-user quotas
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # per model
+    llm_provider_max_concurrency: int = int(
+        os.getenv("LLM_PROVIDER_MAX_CONCURRENCY", "32")
+    )
+    llm_rate_per_second: float = float(
+        os.getenv("LLM_RATE_PER_SECOND", "0")
+    )  # per model, 0 = unlimited
+    llm_rate_burst: float = float(os.getenv("LLM_RATE_BURST", "10"))
+    llm_max_waiting: int = int(os.getenv("LLM_MAX_WAITING", "64"))
+    llm_queue_timeout_seconds: float = float(
+        os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "15")
+    )
+    llm_limits_json: str = os.getenv("LLM_LIMITS_JSON", "")
+    user_max_concurrent: int = int(os.getenv("USER_MAX_CONCURRENT", "4"))
+    user_rate_per_minute: float = float(
+        os.getenv("USER_RATE_PER_MINUTE", "60")
+    )  # 0 = unlimited
+    user_rate_burst: float = float(os.getenv("USER_RATE_BURST", "20"))
+
+    # Provider pool: comma-separated "provider:model" fallbacks per role,
+    # routed fastest-healthy first with a circuit breaker per provider/model
+    llm_text_fallbacks: str = os.getenv("LLM_TEXT_FALLBACKS", "")
+    llm_text_stronger_fallbacks: str = os.getenv("LLM_TEXT_STRONGER_FALLBACKS", "")
+    llm_vision_fallbacks: str = os.getenv("LLM_VISION_FALLBACKS", "")
+    llm_vision_stronger_fallbacks: str = os.getenv("LLM_VISION_STRONGER_FALLBACKS", "")
+    llm_health_window: int = int(os.getenv("LLM_HEALTH_WINDOW", "50"))
+    llm_breaker_failures: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    llm_breaker_cooldown_seconds: float = float(
+        os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30")
+    )
+    llm_pool_explore: float = float(os.getenv("LLM_POOL_EXPLORE", "0.05"))
+    llm_failover_timeout_seconds: float = float(
+        os.getenv("LLM_FAILOVER_TIMEOUT_SECONDS", "0")
+    )  # per call while a fallback remains, 0 = none
+
+    # Model replies as JSON: provider structured output (tool calling / JSON
+    # schema) for the solve prompts, and repair of slightly broken JSON
+    llm_structured_output: bool = os.getenv(
+        "LLM_STRUCTURED_OUTPUT", "true"
+    ).lower() in ("1", "true", "yes")
+    llm_structured_method: str = os.getenv(
+        "LLM_STRUCTURED_METHOD", ""
+    )  # "" = provider default
+    llm_json_repair: bool = os.getenv("LLM_JSON_REPAIR", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+    # /solve-image: "concurrent" (vision + OCR + speculative text race) or "sequential"
+    image_solve_mode: str = os.getenv("IMAGE_SOLVE_MODE", "concurrent")
+    image_ocr_hint_wait_seconds: float = float(
+        os.getenv("IMAGE_OCR_HINT_WAIT_SECONDS", "0.3")
+    )
+
+    # Image uploads: larger files are refused while they stream in (a batch may
+    # carry BATCH_MAX_ITEMS of them)
+    upload_max_bytes: int = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+
+    # Upload normalization before OCR / vision
+    image_max_edge: int = int(os.getenv("IMAGE_MAX_EDGE", "1600"))
+    image_encode_format: str = os.getenv("IMAGE_ENCODE_FORMAT", "jpeg")
+    image_quality: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    image_crop_to_content: bool = os.getenv(
+        "IMAGE_CROP_TO_CONTENT", "true"
+    ).lower() in ("1", "true", "yes")
+    image_prep_timeout_seconds: float = float(
+        os.getenv("IMAGE_PREP_TIMEOUT_SECONDS", "10")
+    )
+
+    # OCR hint: "auto" (in-process tesserocr engines when installed, else the
+    # pytesseract CLI), "tesserocr" or "pytesseract". Text lines are found with
+    # OpenCV and read one by one with OCR_LINE_PSM (7 = single text line).
+    ocr_engine: str = os.getenv("OCR_ENGINE", "auto")
+    ocr_tessdata_path: str = os.getenv("OCR_TESSDATA_PATH", "")  # "" = default
+    ocr_line_psm: int = int(os.getenv("OCR_LINE_PSM", "7"))
+    ocr_max_lines: int = int(os.getenv("OCR_MAX_LINES", "12"))
+    ocr_char_whitelist: str = os.getenv("OCR_CHAR_WHITELIST", "")  # "" = any
+
+    # /solve-image/problems: split a worksheet photo at its numbered problems
+    # and solve up to SEGMENT_CONCURRENCY of them at a time
+    segment_max_problems: int = int(os.getenv("SEGMENT_MAX_PROBLEMS", "20"))
+    segment_max_lines: int = int(os.getenv("SEGMENT_MAX_LINES", "80"))
+    segment_concurrency: int = int(os.getenv("SEGMENT_CONCURRENCY", "4"))
+
+    # Instrumentation: {"model": [usd_per_1m_prompt, usd_per_1m_completion], ...}
+    llm_prices_json: str = os.getenv("LLM_PRICES_JSON", "")
 
     # API / logging
     api_cors_origins: str = os.getenv("API_CORS_ORIGINS", "*")
     log_level: str = os.getenv("LOG_LEVEL", "info")
 
+    # Startup warm-up: "background" (serve at once, /ready turns 200 when warm),
+    # "blocking" (accept traffic only once warm) or "off" (warm on first use)
+    startup_warmup: str = os.getenv("STARTUP_WARMUP", "background")
+
 
 settings = Settings()
@@ -0,0 +1,375 @@
+"""
+Executor layer for CPU-heavy work (OCR, SymPy) that must not run on the event loop.
+
+`CPUExecutor` keeps a fixed set of long-lived worker processes. Each task is
+sent to an idle worker over a pipe; when a task exceeds its timeout (or the
+awaiting request is cancelled) that worker is killed and replaced, which is
+the only reliable way to stop a runaway `sympy.simplify`. Waiting callers form
+a bounded queue so a burst cannot pile up unbounded work.
+
+Functions passed to `run` must be importable top-level callables: workers are
+started with the "spawn" method, import only their `preload` modules, and never
+import the web app. Messages are pickled with protocol 5 and large buffers
+(numpy arrays, memoryviews such as an upload) go over the pipe out of band,
+straight from their memory, instead of being copied into the pickle first.
+"""
+
+import asyncio
+import importlib
+import io
+import multiprocessing as mp
+import os
+import pickle
+import signal
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from core.config import settings
+
+log = structlog.get_logger(__name__)
+
+_READY = "ready"
+_READY_TIMEOUT = 60.0
+
+
+class ExecutorBusy(RuntimeError):
+    """Raised when the wait queue in front of the workers is full."""
+
+
+def _portable(e: BaseException) -> BaseException:
+    """`e` if it survives a pickle round trip, else a RuntimeError describing it.
+
+    Some library exceptions (pytesseract's TesseractNotFoundError) pickle but do
+    not unpickle; the caller's `recv` would fail and take the worker down."""
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return RuntimeError(f"{type(e).__name__}: {e}")
+
+
+class _Pickler(pickle.Pickler):
+    """Protocol 5 pickler that also takes memoryviews, sent out of band."""
+
+    def reducer_override(self, obj: Any) -> Any:
+        if type(obj) is memoryview:
+            return memoryview, (pickle.PickleBuffer(obj),)
+        return NotImplemented
+
+
+def _send(conn, obj: Any) -> None:
+    """Pickle `obj` onto `conn`: one message with the buffer sizes and the
+    pickle proper, then one message per out-of-band buffer."""
+    buffers: List[pickle.PickleBuffer] = []
+    out = io.BytesIO()
+    _Pickler(out, protocol=5, buffer_callback=buffers.append).dump(obj)
+    views = [b.raw() for b in buffers]
+    sizes = struct.pack(f"!I{len(views)}Q", len(views), *(v.nbytes for v in views))
+    conn.send_bytes(sizes + out.getbuffer())
+    for v in views:
+        conn.send_bytes(v)
+
+
+def _load(conn) -> Any:
+    head = conn.recv_bytes()
+    (n,) = struct.unpack_from("!I", head)
+    buffers = []
+    for size in struct.unpack_from(f"!{n}Q", head, 4):
+        # Received into writable memory, so arrays come back writable.
+        buf = bytearray(size)
+        if size:
+            conn.recv_bytes_into(buf)
+        else:
+            conn.recv_bytes()
+        buffers.append(buf)
+    return pickle.loads(memoryview(head)[4 + 8 * n :], buffers=buffers)
+
+
+def _worker_main(conn, preload: Tuple[str, ...]) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for module in preload:
+        importlib.import_module(module)
+    _send(conn, _READY)
+    while True:
+        try:
+            msg = _load(conn)
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        fn, args, kwargs = msg
+        try:
+            result = (True, fn(*args, **kwargs))
+        except BaseException as e:  # noqa: BLE001 - shipped back to the caller
+            result = (False, _portable(e))
+        try:
+            _send(conn, result)
+        except Exception as e:
+            _send(conn, (False, RuntimeError(f"unpicklable result: {e!r}")))
+
+
+def _recv(conn, timeout: Optional[float]):
+    if not conn.poll(timeout):
+        raise TimeoutError
+    return _load(conn)
+
+
+class _Worker:
+    def __init__(self, ctx, preload: Tuple[str, ...]) -> None:
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, preload), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+        # `warm` and the first task may wait at once; only one may read the pipe.
+        self._ready_lock = threading.Lock()
+
+    def wait_ready(self) -> None:
+        """Block until the worker has imported its preload modules."""
+        with self._ready_lock:
+            if not self.ready:
+                if _recv(self.conn, _READY_TIMEOUT) != _READY:
+                    raise RuntimeError("executor worker failed to start")
+                self.ready = True
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.join(1.0)
+        finally:
+            self.conn.close()
+
+
+class CPUExecutor:
+    def __init__(
+        self,
+        name: str,
+        kind: str = "process",
+        max_workers: int = 2,
+        max_queue: int = 64,
+        default_timeout: Optional[float] = None,
+        preload: Tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.default_timeout = default_timeout
+        self.preload = preload
+
+        self._ctx = mp.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[_Worker] = []
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._recycling: set = set()
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._closed = False
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.killed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    # ----- lifecycle -----
+    def _start(self) -> None:
+        if self._sem is not None:
+            return
+        self._sem = asyncio.Semaphore(self.max_workers)
+        if self.kind == "process":
+            self._idle = asyncio.Queue()
+            for _ in range(self.max_workers):
+                w = _Worker(self._ctx, self.preload)
+                self._workers.append(w)
+                self._idle.put_nowait(w)
+        else:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix=self.name
+            )
+        log.info(
+            "executor.start", name=self.name, kind=self.kind, workers=self.max_workers
+        )
+
+    async def warm(self) -> None:
+        """Start the workers now and wait until each has imported its preload
+        modules, instead of on the first tasks."""
+        self._start()
+        for w in list(self._workers):
+            if not w.ready:
+                await asyncio.to_thread(w.wait_ready)
+
+    async def _recycle(self, w: _Worker, recv: Optional[asyncio.Future]) -> None:
+        """Kill `w` and put a fresh worker in its place, off the event loop.
+
+        The pipe is only closed once the thread reading it (`recv`) has
+        returned: the kill makes its poll see end-of-file."""
+        try:
+            w.process.kill()
+            if recv is not None:
+                await asyncio.gather(recv, return_exceptions=True)
+            await asyncio.to_thread(w.kill)
+            self.killed += 1
+            if self._closed:
+                return
+            fresh = await asyncio.to_thread(_Worker, self._ctx, self.preload)
+            self._workers[self._workers.index(w)] = fresh
+            self._idle.put_nowait(fresh)
+        except Exception as e:
+            log.error("executor.recycle_failed", name=self.name, error=str(e))
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop accepting work, let workers exit cleanly, kill stragglers."""
+        self._closed = True
+        if self._threads is not None:
+            await asyncio.to_thread(self._threads.shutdown, True, cancel_futures=True)
+        if self._recycling:
+            await asyncio.gather(*self._recycling, return_exceptions=True)
+        deadline = time.monotonic() + timeout
+        for w in self._workers:
+            try:
+                _send(w.conn, None)
+            except Exception:
+                pass
+        for w in self._workers:
+            await asyncio.to_thread(
+                w.process.join, max(0.0, deadline - time.monotonic())
+            )
+            if w.process.is_alive():
+                await asyncio.to_thread(w.kill)
+        self._workers.clear()
+        log.info("executor.shutdown", name=self.name)
+
+    # ----- execution -----
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run `fn(*args, **kwargs)` off the event loop; raises TimeoutError on timeout."""
+        if self._closed:
+            raise ExecutorBusy(f"{self.name} executor is shut down")
+        self._start()
+        if self.waiting >= self.max_queue and self._sem.locked():
+            self.rejected += 1
+            raise ExecutorBusy(f"{self.name} executor queue is full")
+        timeout = self.default_timeout if timeout is None else timeout
+
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.wait_seconds += time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        self.running += 1
+        try:
+            if self.kind == "process":
+                return await self._run_process(fn, args, kwargs, timeout)
+            return await self._run_thread(fn, args, kwargs, timeout)
+        finally:
+            self.running -= 1
+            self.run_seconds += time.perf_counter() - t1
+            self._sem.release()
+
+    async def _run_process(self, fn, args, kwargs, timeout):
+        w = await self._idle.get()
+        healthy = True
+        recv: Optional[asyncio.Future] = None
+        try:
+            # Import time of a fresh worker does not count against the task timeout.
+            # Reads are shielded, so a cancelled caller leaves them for `_recycle`.
+            if not w.ready:
+                recv = asyncio.ensure_future(asyncio.to_thread(w.wait_ready))
+                await asyncio.shield(recv)
+            _send(w.conn, (fn, args, kwargs))
+            recv = asyncio.ensure_future(asyncio.to_thread(_recv, w.conn, timeout))
+            ok, value = await asyncio.shield(recv)
+        except TimeoutError:
+            healthy = False
+            self.timeouts += 1
+            log.warning(
+                "executor.timeout", name=self.name, fn=fn.__name__, timeout=timeout
+            )
+            raise
+        except BaseException:
+            # Cancelled or broken pipe: the worker may still be busy, so recycle it.
+            healthy = False
+            self.failed += 1
+            raise
+        finally:
+            if healthy:
+                self._idle.put_nowait(w)
+            else:
+                task = asyncio.create_task(self._recycle(w, recv))
+                self._recycling.add(task)
+                task.add_done_callback(self._recycling.discard)
+        if not ok:
+            self.failed += 1
+            raise value
+        self.completed += 1
+        return value
+
+    async def _run_thread(self, fn, args, kwargs, timeout):
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self._threads, lambda: fn(*args, **kwargs))
+        try:
+            value = await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            # Threads cannot be killed; the work finishes in the background.
+            self.timeouts += 1
+            log.warning(
+                "executor.timeout", name=self.name, fn=fn.__name__, timeout=timeout
+            )
+            raise TimeoutError from None
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return value
+
+    def stats(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "queue_depth": self.waiting,
+            "queue_limit": self.max_queue,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "killed": self.killed,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "run_seconds_total": round(self.run_seconds, 6),
+        }
+
+
+cpu_pool = CPUExecutor(
+    "cpu",
+    kind=settings.cpu_executor,
+    max_workers=settings.cpu_workers or (os.cpu_count() or 2),
+    max_queue=settings.cpu_max_queue,
+    preload=(
+        "reasoner.fastpath",
+        "reasoner.verify",
+        "utils.image_ocr",
+        "utils.image_prep",
+        "cv2",
+        "pytesseract",
+    ),
+)
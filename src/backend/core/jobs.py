@@ -0,0 +1,455 @@
+"""
+In-process job queue for long solves, persisted in SQLite.
+
+`submit()` stores the payload and returns a job id immediately; a fixed set of
+asyncio workers runs the registered handler for each job. Pending jobs are
+kept per user and served round-robin, so one user's worksheet cannot starve
+everyone else. Both the total backlog and each user's share are capped;
+callers over the cap get `JobRejected` with a retry hint.
+
+Jobs survive a restart, and several processes (uvicorn --workers) may share
+one JOBS_SQLITE_PATH. Each process runs the jobs submitted to it (the caps
+are per process); a running job holds a lease its process keeps renewing,
+and only jobs whose lease ran out, because their process died, are queued
+again: on `start()`, with anything still queued, and then periodically. A
+long poll re-reads the row, so it also sees jobs another process finished.
+"""
+
+import asyncio
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import structlog
+
+from core.config import settings
+
+log = structlog.get_logger(__name__)
+
+Handler = Callable[[bytes], Awaitable[Dict]]
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# A running job's lease, renewed every third of it while its process lives.
+_LEASE_SECONDS = 30.0
+# How often a long poll re-reads a job another process may be running.
+_POLL_SECONDS = 1.0
+
+
+class JobRejected(RuntimeError):
+    """The queue (or this user's share of it) is full."""
+
+    def __init__(self, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail a job with a client-facing status and detail."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class JobStore:
+    """SQLite rows for jobs; every method blocks, so call it from a thread.
+    The file is opened (and the table created) on first use."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._has_schema = False
+
+    def _create_schema(self, c: sqlite3.Connection) -> None:
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " uid TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload BLOB,"
+            " result TEXT,"
+            " error TEXT,"
+            " status_code INTEGER,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " owner TEXT,"
+            " lease_until REAL)"
+        )
+        columns = {row[1] for row in c.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:  # a file from before leases
+                c.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        c.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._has_schema:
+                    self._create_schema(conn)
+                    self._has_schema = True
+        return conn
+
+    def create(self, job_id: str, uid: str, kind: str, payload: bytes) -> None:
+        self._conn().execute(
+            "INSERT INTO jobs (id, uid, kind, status, payload, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, uid, kind, QUEUED, payload, time.time()),
+        )
+
+    def claim(self, job_id: str, owner: str) -> Optional[Tuple[str, bytes]]:
+        """Mark a queued job running under `owner`'s lease; returns (kind,
+        payload), or None if it is gone or another process claimed it."""
+        c = self._conn()
+        now = time.time()
+        cur = c.execute(
+            "UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_until = ?"
+            " WHERE id = ? AND status = ?",
+            (RUNNING, now, owner, now + _LEASE_SECONDS, job_id, QUEUED),
+        )
+        if cur.rowcount != 1:
+            return None
+        row = c.execute(
+            "SELECT kind, payload FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict],
+        error: Optional[str],
+        status_code: int,
+    ) -> None:
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?,"
+            " finished_at = ?, payload = NULL WHERE id = ?",
+            (
+                status,
+                json.dumps(result) if result is not None else None,
+                error,
+                status_code,
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT id, uid, kind, status, result, error, status_code,"
+                " created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        keys = (
+            "job_id",
+            "uid",
+            "kind",
+            "status",
+            "result",
+            "error",
+            "status_code",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+        job = dict(zip(keys, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def renew(self, owner: str) -> None:
+        """Extend the leases of `owner`'s running jobs."""
+        self._conn().execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+            (time.time() + _LEASE_SECONDS, owner, RUNNING),
+        )
+
+    def expire(self) -> List[Tuple[str, str]]:
+        """Requeue running jobs whose lease ran out; returns their (id, uid)."""
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            rows = c.execute(
+                "SELECT id, uid FROM jobs WHERE status = ?"
+                " AND (lease_until IS NULL OR lease_until < ?) ORDER BY created_at",
+                (RUNNING, time.time()),
+            ).fetchall()
+            c.executemany(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL,"
+                " lease_until = NULL WHERE id = ?",
+                [(QUEUED, job_id) for job_id, _ in rows],
+            )
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
+        return rows
+
+    def recover(self) -> List[Tuple[str, str]]:
+        """Requeue jobs whose process died; return all queued (id, uid)."""
+        self.expire()
+        return (
+            self._conn()
+            .execute(
+                "SELECT id, uid FROM jobs WHERE status = ? ORDER BY created_at",
+                (QUEUED,),
+            )
+            .fetchall()
+        )
+
+    def purge(self, finished_before: float) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (DONE, FAILED, finished_before),
+        )
+        return max(cur.rowcount, 0)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int,
+        max_queued: int,
+        max_per_user: int,
+        timeout: float,
+        retention_seconds: float,
+    ) -> None:
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.max_per_user = max(1, max_per_user)
+        self.timeout = timeout
+        self.retention_seconds = retention_seconds
+        self._handlers: Dict[str, Handler] = {}
+        # uid -> queued job ids; rotation order is the dict order.
+        self._users: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._avg_run = 10.0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    # ----- lifecycle -----
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._cond = asyncio.Condition()
+        for job_id, uid in await asyncio.to_thread(self.store.recover):
+            self._users.setdefault(uid, deque()).append(job_id)
+            self.recovered += 1
+        if self.recovered:
+            log.info("jobs.recovered", jobs=self.recovered)
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._purge_forever()))
+        self._tasks.append(asyncio.create_task(self._lease_forever()))
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ----- submission / lookup -----
+    def queued(self) -> int:
+        return sum(len(q) for q in self._users.values())
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.queued() / self.workers * self._avg_run))
+
+    async def submit(self, uid: str, kind: str, payload: bytes) -> str:
+        if kind not in self._handlers:
+            raise KeyError(kind)
+        if self._cond is None:
+            await self.start()
+        if self.queued() >= self.max_queued:
+            self.rejected += 1
+            raise JobRejected("job queue is full", self._retry_after())
+        pending = len(self._users.get(uid, ())) + self._running.get(uid, 0)
+        if pending >= self.max_per_user:
+            self.rejected += 1
+            raise JobRejected(
+                f"at most {self.max_per_user} pending jobs per user",
+                self._retry_after(),
+            )
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.create, job_id, uid, kind, payload)
+        async with self._cond:
+            self._users.setdefault(uid, deque()).append(job_id)
+            self._cond.notify()
+        self.submitted += 1
+        return job_id
+
+    async def get(
+        self, job_id: str, wait: float = 0.0, uid: Optional[str] = None
+    ) -> Optional[Dict]:
+        """The job row; with `wait`, block up to that long for it to finish.
+        With `uid`, another user's job is None at once, without waiting."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is not None and uid is not None and job["uid"] != uid:
+            return None
+        if job is None or job["status"] in (DONE, FAILED) or wait <= 0:
+            return job
+        # The event fires for jobs this process runs; re-reading the row
+        # catches the rest (and a job that finished before the event existed).
+        event = self._done.setdefault(job_id, asyncio.Event())
+        deadline = time.monotonic() + wait
+        while True:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in (DONE, FAILED):
+                if self._done.get(job_id) is event and not event.is_set():
+                    del self._done[job_id]  # finished by another process
+                return job
+            if remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, _POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    # ----- workers -----
+    def _pop(self) -> Tuple[str, str]:
+        uid, jobs = next(iter(self._users.items()))
+        job_id = jobs.popleft()
+        del self._users[uid]
+        if jobs:
+            self._users[uid] = jobs  # back of the rotation
+        return job_id, uid
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            async with self._cond:
+                while not self._users:
+                    await self._cond.wait()
+                job_id, uid = self._pop()
+                self._running[uid] = self._running.get(uid, 0) + 1
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                log.exception("jobs.worker_error", job_id=job_id, error=str(e))
+            finally:
+                self._running[uid] -= 1
+                if not self._running[uid]:
+                    del self._running[uid]
+                event = self._done.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job_id: str) -> None:
+        claimed = await asyncio.to_thread(self.store.claim, job_id, self.owner)
+        if claimed is None:
+            return
+        kind, payload = claimed
+        t0 = time.perf_counter()
+        result, error, code, status = None, None, 200, DONE
+        try:
+            result = await asyncio.wait_for(self._handlers[kind](payload), self.timeout)
+        except JobFailed as e:
+            error, code, status = e.detail, e.status_code, FAILED
+        except asyncio.TimeoutError:
+            error, code, status = "job timed out", 504, FAILED
+        except Exception as e:
+            log.exception("jobs.failed", job_id=job_id, kind=kind, error=str(e))
+            error, code, status = "internal error", 500, FAILED
+        elapsed = time.perf_counter() - t0
+        self._avg_run = 0.9 * self._avg_run + 0.1 * elapsed
+        await asyncio.to_thread(self.store.finish, job_id, status, result, error, code)
+        if status == DONE:
+            self.completed += 1
+        else:
+            self.failed += 1
+        log.info(
+            "jobs.finished", job_id=job_id, kind=kind, status=status, seconds=elapsed
+        )
+
+    async def _purge_forever(self) -> None:
+        while True:
+            await asyncio.sleep(60)
+            try:
+                cutoff = time.time() - self.retention_seconds
+                await asyncio.to_thread(self.store.purge, cutoff)
+            except Exception as e:
+                log.warning("jobs.purge_failed", error=str(e))
+
+    async def _lease_forever(self) -> None:
+        """Renew this process's leases and requeue jobs whose process died."""
+        while True:
+            await asyncio.sleep(_LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, self.owner)
+                expired = await asyncio.to_thread(self.store.expire)
+            except Exception as e:
+                log.warning("jobs.lease_failed", error=str(e))
+                continue
+            if expired:
+                log.info("jobs.recovered", jobs=len(expired))
+                self.recovered += len(expired)
+                async with self._cond:
+                    for job_id, uid in expired:
+                        self._users.setdefault(uid, deque()).append(job_id)
+                    self._cond.notify(len(expired))
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queued(),
+            "queue_limit": self.max_queued,
+            "running": sum(self._running.values()),
+            "users_waiting": len(self._users),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "avg_run_seconds": round(self._avg_run, 3),
+        }
+
+
+job_queue = (
+    JobQueue(
+        JobStore(settings.jobs_sqlite_path),
+        workers=settings.jobs_workers,
+        max_queued=settings.jobs_max_queued,
+        max_per_user=settings.jobs_max_per_user,
+        timeout=settings.jobs_timeout_seconds,
+        retention_seconds=settings.jobs_retention_seconds,
+    )
+    if settings.jobs_enabled
+    else None
+)
@@ -0,0 +1,319 @@
+"""
+Minimal in-process metrics with Prometheus text exposition, plus per-request spans.
+
+Metrics are process-wide (one registry per uvicorn worker). Spans are collected
+for the current request only, through a context variable set by `trace()`, so
+the router can attach a timing breakdown to the response.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [
+            f"{name}{_fmt_labels(labels)} {_fmt_value(v)}"
+            for name, labels, v in self.samples()
+        ]
+        return lines
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [
+                (self.name, self._labels(k), v) for k, v in sorted(self._values.items())
+            ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, n = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0, 0)
+            )
+            counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, (counts, total, n) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cumulative += c
+                le = "+Inf" if math.isinf(bound) else _fmt_value(bound)
+                out.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            out.append((f"{self.name}_sum", labels, total))
+            out.append((f"{self.name}_count", labels, n))
+        return out
+
+
+class GaugeCallback(_Metric):
+    """A gauge whose samples are read from `fn` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], List[Sample]]) -> None:
+        super().__init__(name, help)
+        self.fn = fn
+
+    def samples(self):
+        try:
+            return [(self.name, labels, float(v)) for labels, v in self.fn()]
+        except Exception:
+            return []
+
+
+class RollingQuantile:
+    """Quantiles over the last `window` observations (e.g. recent call latencies)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._values: deque = deque(maxlen=max(1, window))
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._values.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The `q` quantile, or None until `min_samples` observations are in."""
+        with self._lock:
+            if len(self._values) < self.min_samples:
+                return None
+            ordered = sorted(self._values)
+        i = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[i]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge_callback(
+        self, name: str, help: str, fn: Callable[[], List[Sample]]
+    ) -> GaugeCallback:
+        return self._register(GaugeCallback(name, help, fn))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def register_stats(prefix: str, stats_fn: Callable[[], Dict]) -> None:
+    """Export the numeric fields of a component's `stats()` dict as gauges."""
+    for field, value in stats_fn().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            registry.gauge_callback(
+                f"{prefix}_{field}",
+                f"{prefix} {field} (as in /health).",
+                lambda field=field: [({}, stats_fn()[field])],
+            )
+
+
+NODE_SECONDS = registry.histogram(
+    "solver_node_seconds", "Wall time per reasoning-graph node.", ["node"]
+)
+LLM_SECONDS = registry.histogram(
+    "llm_call_seconds",
+    "Wall time per LLM call.",
+    ["provider", "model", "purpose", "outcome"],
+)
+LLM_TOKENS = registry.histogram(
+    "llm_call_tokens",
+    "Tokens per LLM call.",
+    ["provider", "model", "purpose", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_COST = registry.counter(
+    "llm_cost_usd_total", "Estimated LLM spend in USD.", ["provider", "model"]
+)
+LLM_FAILOVERS = registry.counter(
+    "llm_failovers_total",
+    "LLM calls handed to the next candidate, by the candidate that failed.",
+    ["provider", "model", "reason"],
+)
+ESCALATIONS = registry.counter(
+    "solver_escalations_total",
+    "solve_llm retries and strong-model escalations by reason.",
+    ["stage", "reason"],
+)
+ESCALATION_WINNERS = registry.counter(
+    "solver_escalation_winner_total",
+    "Which call's answer solve_llm returned, per escalation strategy.",
+    ["strategy", "winner"],
+)
+PREROUTE_DECISIONS = registry.counter(
+    "solver_preroute_total",
+    "Starting model chosen by the pre-router, per task.",
+    ["task", "start"],
+)
+STREAM_FIRST_STEP_SECONDS = registry.histogram(
+    "solve_stream_first_step_seconds",
+    "Time from request to the first streamed step.",
+    ["endpoint"],
+)
+VERIFY_SECONDS = registry.histogram(
+    "sympy_verify_seconds", "Wall time of SymPy answer verification.", ["outcome"]
+)
+LLM_QUEUE_WAIT_SECONDS = registry.histogram(
+    "llm_queue_wait_seconds",
+    "Time an LLM call waited for a concurrency/rate slot.",
+    ["scope", "key"],
+)
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total",
+    "Requests and LLM calls shed with 429 by admission control.",
+    ["scope", "reason"],
+)
+
+
+# ---------- Per-request spans ----------
+_spans: ContextVar[Optional[List[Dict]]] = ContextVar("spans", default=None)
+
+
+@contextmanager
+def trace() -> Iterator[List[Dict]]:
+    """Collect spans recorded by this request (and tasks it spawns) into a list."""
+    spans: List[Dict] = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def record_span(name: str, seconds: float, **fields) -> None:
+    spans = _spans.get()
+    if spans is not None:
+        spans.append(
+            {"name": name, "seconds": round(seconds, 6)}
+            | {k: v for k, v in fields.items() if v is not None}
+        )
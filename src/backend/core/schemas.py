@@ -6,6 +6,9 @@ class TextSolveRequest(BaseModel):
     question: str = Field(..., description="Math question in plain text.")
     level: Optional[str] = "auto"
     locale: Optional[str] = "en"
+    include_timing: bool = Field(
+        False, description="Attach a per-node / per-LLM-call timing breakdown."
+    )
 
     @field_validator("question")
     @classmethod
@@ -15,16 +18,50 @@ class TextSolveRequest(BaseModel):
         return str(v).strip()
 
 
+class BatchSolveRequest(BaseModel):
+    items: List[TextSolveRequest] = Field(..., min_length=1)
+    pack: bool = Field(True, description="Allow several short questions per LLM call.")
+
+
 class Step(BaseModel):
     title: str
     explanation: str
 
 
+class LLMSolution(BaseModel):
+    """The JSON the solve prompts ask for; the schema for structured output."""
+
+    steps: List[Step]
+    final_answer: str
+    difficulty: int = Field(3, description="1 (easy) to 5 (hard).")
+    confidence: float = Field(..., description="0.0 to 1.0.")
+    topic: Optional[str] = None
+
+
+class PackedSolution(LLMSolution):
+    id: int = Field(..., description="The problem's number in the prompt.")
+
+
+class PackedSolutions(BaseModel):
+    solutions: List[PackedSolution]
+
+
 class ModelInfo(BaseModel):
     provider: str
     name: str
 
 
+class TimingSpan(BaseModel):
+    name: str  # e.g. "node.solve_llm", "llm.base", "verify"
+    seconds: float
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    outcome: Optional[str] = None
+    error: Optional[bool] = None
+
+
 class SolveResponse(BaseModel):
     final_answer: str
     steps: List[Step]
@@ -34,6 +71,7 @@ class SolveResponse(BaseModel):
     confidence: Optional[float] = None
     difficulty: Optional[int] = None
     model: Optional[ModelInfo] = None
+    timing: Optional[List[TimingSpan]] = None
 
     @classmethod
     def from_state(cls, state: Dict):
@@ -66,3 +104,67 @@ class SolveResponse(BaseModel):
 class ImageSolveResponse(BaseModel):
     ocr_text: str
     result: Dict
+    timing: Optional[List[TimingSpan]] = None
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: int = 200
+    result: Optional[SolveResponse] = None
+    error: Optional[str] = None
+
+
+class BatchSolveResponse(BaseModel):
+    results: List[BatchItemResult]
+
+
+class BatchImageItemResult(BaseModel):
+    index: int
+    status: int = 200
+    result: Optional[ImageSolveResponse] = None
+    error: Optional[str] = None
+
+
+class BatchImageSolveResponse(BaseModel):
+    results: List[BatchImageItemResult]
+
+
+class BoundingBox(BaseModel):
+    """Pixels of the uploaded picture (after EXIF rotation), origin top left."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class ImageProblemResult(BaseModel):
+    index: int
+    label: Optional[str] = None  # the problem's printed number, e.g. "3"
+    bbox: BoundingBox
+    status: int = 200
+    ocr_text: str = ""
+    result: Optional[SolveResponse] = None
+    error: Optional[str] = None
+
+
+class ImageProblemsResponse(BaseModel):
+    problems: List[ImageProblemResult]
+    timing: Optional[List[TimingSpan]] = None
+
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    poll_url: str
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    status_code: Optional[int] = None
+    result: Optional[ImageSolveResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+
+import structlog
+
+log = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[T]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The computation runs in its own task, so a caller being cancelled (e.g. the
+    client of the request that started it disconnects) does not abort the work
+    for the other callers. The task is only cancelled once every caller waiting
+    on it has gone away.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[str, _Call[T]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key: str, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _t, c=call: self._forget(key, c))
+            self._calls[key] = call
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            log.debug("singleflight.coalesced", flight=self.name, key=key[:12])
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
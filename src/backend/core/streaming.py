@@ -0,0 +1,130 @@
+"""
+Progress events for the streaming solve endpoints.
+
+A streaming request installs an `EventSink` with `event_sink()`; code anywhere
+below it (graph nodes, `LLM.ask`, the image race) reports progress through
+`emit()`, which is a no-op when nothing is listening. `StepStreamParser` pulls
+each finished object out of the model's `"steps": [...]` array while the
+JSON is still being generated.
+"""
+
+import asyncio
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class EventSink:
+    def __init__(self) -> None:
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue()
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        self.queue.put_nowait((event, data))
+
+    def close(self) -> None:
+        self.queue.put_nowait(None)
+
+    def drain(self) -> List[Event]:
+        """The events emitted so far and not yet read."""
+        events = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None:
+                events.append(item)
+        return events
+
+
+_sink: ContextVar[Optional[EventSink]] = ContextVar("event_sink", default=None)
+
+
+@contextmanager
+def event_sink(sink: EventSink) -> Iterator[EventSink]:
+    """Route `emit()` calls made in this context (and tasks it spawns) to `sink`."""
+    token = _sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _sink.reset(token)
+
+
+def current_sink() -> Optional[EventSink]:
+    return _sink.get()
+
+
+def emit(event: str, **data: Any) -> None:
+    sink = _sink.get()
+    if sink is not None:
+        sink.emit(event, data)
+
+
+class StepStreamParser:
+    """
+    Incremental scanner for `{"steps": [{...}, {...}], ...}` arriving in chunks.
+
+    `feed()` returns the step objects completed by the new text. Only string,
+    escape and nesting state is tracked, so prose or a ```json fence around
+    the object does not confuse it.
+    """
+
+    def __init__(self, key: str = "steps") -> None:
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = -1
+        self._last_key: Optional[str] = None
+        self._in_array = False
+        self._obj_start = -1
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.text += chunk
+        t = self.text
+        out: List[Dict[str, Any]] = []
+        for i in range(self._pos, len(t)):
+            c = t[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        self._last_key = t[self._str_start + 1 : i]
+                continue
+            if c == '"':
+                self._in_str = True
+                self._str_start = i
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_key == self.key:
+                    self._in_array = True
+                elif c == "{" and self._in_array and self._depth == 3:
+                    self._obj_start = i
+            elif c in "}]":
+                if c == "}" and self._in_array and self._depth == 3:
+                    try:
+                        obj = json.loads(t[self._obj_start : i + 1])
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        out.append(obj)
+                self._depth = max(0, self._depth - 1)
+                if self._depth == 1 and self._in_array:
+                    self._in_array = False
+                    self._last_key = None
+        self._pos = len(t)
+        return out
+
+
+def format_ndjson(event: str, data: Dict[str, Any]) -> str:
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -1,9 +1,24 @@
 import logging
+from contextlib import asynccontextmanager
+
 import structlog
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from core.config import settings
 from api.routers import solve
+from api.deps import stop_auth, token_cache
+from api.startup import warmup
+from api.uploads import UploadLimit
+from core.admission import Overloaded, llm_limits, user_quota
+from core.executor import cpu_pool
+from core.jobs import job_queue
+from core.metrics import register_stats, registry
+from providers.pool import provider_health
+from reasoner.cache import image_cache, solution_cache
+from reasoner.fastpath import fast_path_stats
+from reasoner.numcheck import expr_cache
+from reasoner.prerouter import prerouter
 
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper(), logging.INFO),
@@ -22,7 +37,21 @@ structlog.configure(
     ],
 )
 
-app = FastAPI(title="Math Solver API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warmup.start()
+    if job_queue is not None:
+        await job_queue.start()
+    yield
+    await warmup.stop()
+    if job_queue is not None:
+        await job_queue.stop()
+    await stop_auth()
+    await cpu_pool.shutdown()
+
+
+app = FastAPI(title="Math Solver API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,15 +61,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    UploadLimit,
+    max_bytes=settings.upload_max_bytes,
+    max_files={"/solve-batch-images": settings.batch_max_items},
+)
+
 app.include_router(solve.router)
 
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """An LLM slot could not be had in time: shed the request."""
+    return JSONResponse(
+        {"detail": exc.detail},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+register_stats("cpu_pool", cpu_pool.stats)
+register_stats("auth_cache", token_cache.stats)
+register_stats("admission_llm", llm_limits.stats)
+register_stats("admission_user", user_quota.stats)
+register_stats("llm_pool", provider_health.stats)
+register_stats("fast_path", fast_path_stats.snapshot)
+register_stats("sympy_cache", expr_cache.stats)
+register_stats("singleflight_text", solve.text_flight.stats)
+register_stats("singleflight_image", solve.image_flight.stats)
+if solution_cache is not None:
+    register_stats("solve_cache", solution_cache.stats)
+if image_cache is not None:
+    register_stats("image_cache", image_cache.stats)
+if prerouter is not None:
+    register_stats("preroute", prerouter.snapshot)
+if job_queue is not None:
+    register_stats("jobs", job_queue.stats)
+
+
+@app.get("/ready")
+async def ready():
+    """200 once this worker is warm (see api.startup), 503 until then."""
+    snapshot = warmup.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
 @app.get("/health")
 async def health():
     return {
         "ok": True,
+        "ready": warmup.ready,
         "text_model": settings.llm_text_model,
         "text_provider": settings.llm_text_provider,
         "vision_model": settings.llm_vision_model,
         "vision_provider": settings.llm_vision_provider,
+        "solve_cache": solution_cache.stats() if solution_cache else None,
+        "image_cache": image_cache.stats() if image_cache else None,
+        "fast_path": fast_path_stats.snapshot(),
+        "sympy_cache": expr_cache.stats(),
+        "preroute": prerouter.snapshot() if prerouter else None,
+        "cpu_pool": cpu_pool.stats(),
+        "jobs": job_queue.stats() if job_queue else None,
+        "llm_pool": provider_health.stats(),
+        "admission": {"llm": llm_limits.stats(), "user": user_quota.stats()},
+        "auth_cache": token_cache.stats(),
+        "singleflight": {
+            "text": solve.text_flight.stats(),
+            "image": solve.image_flight.stats(),
+        },
     }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,4 +1,4 @@
-from .model_factory import LLM, ModelFactory
+from .model_factory import LLM, ModelFactory, ModelRegistry, models
 from .vision import solve_image_json
 
-__all__ = ["LLM", "ModelFactory", "solve_image_json"]
+__all__ = ["LLM", "ModelFactory", "ModelRegistry", "models", "solve_image_json"]
@@ -0,0 +1,103 @@
+"""
+Tolerant parsing of the JSON object a model was asked to reply with.
+
+`repair_json` first tries the text as-is and the first ```json fence, then,
+if LLM_JSON_REPAIR is on, fixes the slips models make most often: prose
+around the object, trailing commas, smart quotes, Python literals, LaTeX
+backslashes that are not JSON escapes, and replies cut off before the
+closing brackets.
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+from core.config import settings
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERAL_RE = re.compile(r"(?<=[:\[,\s])(True|False|None)(?=\s*[,}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+# LaTeX commands starting with n, which a bare \n followed by text is not
+_LATEX_N = "abla|eq|e|eg|ot|otin|u|i|mid|leq|geq|exists|ewline|parallel"
+# An escaped backslash, matched first so the character after it is never read
+# as escaped; else a backslash that does not start a JSON escape: \b \f \r \t
+# directly followed by a letter (\frac, \beta, \right, \theta), \n starting a
+# LaTeX command (\neq, \nabla) or \u without four hex digits (\underline).
+_BAD_ESCAPE_RE = re.compile(
+    r'\\\\|\\(?!["/]|u[0-9A-Fa-f]{4}|[bfrt](?![A-Za-z])'
+    rf"|n(?!(?:{_LATEX_N})(?![A-Za-z])))"
+)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+
+def _fix_escapes(s: str) -> str:
+    """Double the stray backslashes; escaped pairs are kept as they are."""
+    return _BAD_ESCAPE_RE.sub(lambda m: m.group() if len(m.group()) == 2 else r"\\", s)
+
+
+def _loads(s: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(s)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _close_truncated(s: str) -> str:
+    """Close an unterminated string and any open brackets, in order."""
+    stack, in_str, esc = [], False, False
+    for c in s:
+        if in_str:
+            if esc:
+                esc = False
+            elif c == "\\":
+                esc = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]" and stack:
+            stack.pop()
+    if esc:
+        s = s[:-1]
+    if in_str:
+        s += '"'
+    s = s.rstrip()
+    # A dangling `"key":` or trailing comma cannot be closed meaningfully.
+    s = re.sub(r',?\s*"[^"]*"\s*:\s*$', "", s)
+    s = s.rstrip().rstrip(",")
+    return s + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    """The JSON object in a model reply, or None if none can be recovered."""
+    s = (text or "").strip()
+    m = _FENCE_RE.search(s)
+    if m:
+        data = _loads(m.group(1))
+        if data is not None:
+            return data
+    data = _loads(s)
+    if data is not None or not settings.llm_json_repair:
+        return data
+
+    start = s.find("{")
+    if start < 0:
+        return None
+    end = s.rfind("}")
+    candidate = s[start : end + 1] if end > start else s[start:]
+    candidate = candidate.translate(_SMART_QUOTES)
+    candidate = _fix_escapes(candidate)
+    candidate = _PY_LITERAL_RE.sub(lambda m: _PY_LITERALS[m.group(1)], candidate)
+    candidate = _TRAILING_COMMA_RE.sub(r"\1", candidate)
+    data = _loads(candidate)
+    if data is not None:
+        return data
+    # Cut off mid-reply: retry from the first brace to the very end, closed up.
+    tail = _TRAILING_COMMA_RE.sub(
+        r"\1", _fix_escapes(s[start:].translate(_SMART_QUOTES))
+    )
+    return _loads(_close_truncated(tail))
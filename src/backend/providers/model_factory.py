@@ -1,25 +1,81 @@
-from typing import Optional, List, Dict, Any, Union
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, SystemMessage
+import asyncio
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple, Callable, Type
+from pydantic import BaseModel
+import structlog
+from core.admission import Overloaded, llm_limits
 from core.config import settings
+from core.metrics import LLM_COST, LLM_FAILOVERS, LLM_SECONDS, LLM_TOKENS, record_span
+from core.streaming import EventSink, StepStreamParser, current_sink, emit
+from providers.json_repair import repair_json
+from providers.pool import parse_fallbacks, provider_health
+
+# langchain (and the provider package init_chat_model pulls in) costs a second
+# or more to import; it is loaded when the first client is built.
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage
+
+log = structlog.get_logger(__name__)
+
+# (name, provider, temperature) — everything that identifies a chat model client.
+ModelSpec = Tuple[str, Optional[str], float]
+# A role's primary ModelSpec plus its raw "provider:model,..." fallback list.
+RoleSpec = Tuple[ModelSpec, str]
+
+# USD per million (prompt, completion) tokens; LLM_PRICES_JSON overrides/extends.
+_DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+
+def _load_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(_DEFAULT_PRICES)
+    if settings.llm_prices_json:
+        for name, pair in json.loads(settings.llm_prices_json).items():
+            prices[name] = (float(pair[0]), float(pair[1]))
+    return prices
+
+
+_PRICES = _load_prices()
 
 
 class LLM:
     def __init__(
-        self, name: str, provider: Optional[str] = None, temperature: float = 0.2
+        self,
+        name: str,
+        provider: Optional[str] = None,
+        temperature: float = 0.2,
+        model: Any = None,
+        fallbacks: Optional[List["LLM"]] = None,
     ):
+        """
+        `model` injects a ready chat model (anything with `ainvoke`), e.g. a fake.
+        `fallbacks` are equivalent LLMs `ask` may route to or fail over to.
+        """
         self.name = name
         self.provider = provider
         self.temperature = temperature
+        self.fallbacks = list(fallbacks or [])
+        self._structured: Dict[type, Any] = {}
 
-        self._model = init_chat_model(
-            name,
-            model_provider=provider,
-            temperature=temperature,
-        )
+        if model is None:
+            from langchain.chat_models import init_chat_model
+
+            model = init_chat_model(
+                name,
+                model_provider=provider,
+                temperature=temperature,
+            )
+        self._model = model
 
     @staticmethod
     def _to_lc_messages(messages: List[Dict[str, Any]]):
+        from langchain_core.messages import HumanMessage, SystemMessage
+
         lc_msgs = []
         for m in messages:
             role = m.get("role", "user")
@@ -33,46 +89,336 @@ class LLM:
                     lc_msgs.append(HumanMessage(content=str(content)))
         return lc_msgs
 
-    async def ask(self, messages: List[Dict[str, Any]]) -> str:
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """Estimated USD cost of a call; 0.0 for models without a known price."""
+        p_in, p_out = _PRICES.get(self.name, (0.0, 0.0))
+        return (prompt_tokens * p_in + completion_tokens * p_out) / 1e6
+
+    async def ask(self, messages: List[Dict[str, Any]], purpose: str = "ask") -> str:
         """
         messages: list of {role: 'system'|'user', content: str|multimodal content}
+        purpose: label for metrics/timing (e.g. 'base', 'critique', 'strong')
         returns: string content from the model
+
+        Under a streaming request (see core.streaming) the call opens with an
+        "attempt" event naming the model, the reply is streamed and each
+        completed solution step is emitted as a "step" event on the way.
+
+        With fallbacks the call goes to the fastest healthy candidate (see
+        providers.pool) and moves down the list when a candidate fails; each
+        such failover emits a new "attempt" event for the next candidate.
+        """
+        text, _ = await self._route(messages, purpose, None)
+        return text
+
+    async def ask_json(
+        self,
+        messages: List[Dict[str, Any]],
+        schema: Type[BaseModel],
+        purpose: str = "ask",
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
         """
-        out = await self._model.ainvoke(self._to_lc_messages(messages))
-        return getattr(out, "content", str(out)).strip()
+        Like `ask`, for a reply shaped like `schema`: returns (object or None, raw text).
+
+        With LLM_STRUCTURED_OUTPUT the provider is held to the schema through
+        LangChain's `with_structured_output` (tool calling / JSON schema); the
+        plain-text reply of a streaming request, a model without that mode, or
+        a structured reply that still fails validation go through
+        `repair_json` instead.
+        """
+        text, parsed = await self._route(messages, purpose, schema)
+        if parsed is not None:
+            return parsed, text
+        return repair_json(text), text
+
+    async def _route(
+        self,
+        messages: List[Dict[str, Any]],
+        purpose: str,
+        schema: Optional[Type[BaseModel]],
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        candidates = provider_health.route([self, *self.fallbacks])
+        emit("attempt", purpose=purpose, model=candidates[0].name)
+        for i, llm in enumerate(candidates):
+            last = i == len(candidates) - 1
+            health = provider_health.get(llm.provider, llm.name)
+            health.begin()
+            t0 = time.perf_counter()
+            try:
+                call = llm._ask_once(messages, purpose, schema)
+                if not last and settings.llm_failover_timeout_seconds > 0:
+                    call = asyncio.wait_for(call, settings.llm_failover_timeout_seconds)
+                out = await call
+            except Overloaded as e:
+                # Our own limiter, not the provider's fault.
+                health.release()
+                reason, error = "overloaded", e
+            except asyncio.TimeoutError as e:
+                health.failure()
+                reason, error = "timeout", e
+            except Exception as e:
+                health.failure()
+                reason, error = "error", e
+            except BaseException:
+                health.release()
+                raise
+            else:
+                health.success(time.perf_counter() - t0)
+                return out
+            if last:
+                raise error
+            provider_health.failovers += 1
+            LLM_FAILOVERS.inc(provider=str(llm.provider), model=llm.name, reason=reason)
+            log.warning(
+                "llm.failover",
+                failed=f"{llm.provider}:{llm.name}",
+                to=f"{candidates[i + 1].provider}:{candidates[i + 1].name}",
+                reason=reason,
+                error=str(error),
+            )
+            # Steps streamed so far came from the failed candidate.
+            emit(
+                "attempt",
+                purpose=purpose,
+                model=candidates[i + 1].name,
+                failover_from=llm.name,
+                reason=reason,
+            )
+        raise RuntimeError("no LLM candidates")  # unreachable: route() keeps all
+
+    def _structured_model(self, schema: Type[BaseModel]) -> Any:
+        """`with_structured_output` runnable for `schema`, None if unsupported."""
+        if schema not in self._structured:
+            runnable = None
+            if hasattr(self._model, "with_structured_output"):
+                kwargs: Dict[str, Any] = {"include_raw": True}
+                if settings.llm_structured_method:
+                    kwargs["method"] = settings.llm_structured_method
+                try:
+                    runnable = self._model.with_structured_output(schema, **kwargs)
+                except (NotImplementedError, ValueError) as e:
+                    log.info(
+                        "llm.structured_unsupported", model=self.name, error=str(e)
+                    )
+            self._structured[schema] = runnable
+        return self._structured[schema]
+
+    async def _ask_once(
+        self,
+        messages: List[Dict[str, Any]],
+        purpose: str,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        labels = {
+            "provider": str(self.provider),
+            "model": self.name,
+            "purpose": purpose,
+        }
+        sink = current_sink()
+        structured = None
+        if schema is not None and sink is None and settings.llm_structured_output:
+            structured = self._structured_model(schema)
+        parsed = None
+        # Raises core.admission.Overloaded when this model/provider is saturated.
+        async with llm_limits.slot(labels["provider"], self.name):
+            t0 = time.perf_counter()
+            try:
+                if sink is not None and hasattr(self._model, "astream"):
+                    out = await self._stream(messages, purpose, sink)
+                elif structured is not None:
+                    res = await structured.ainvoke(self._to_lc_messages(messages))
+                    out, parsed = res["raw"], res.get("parsed")
+                else:
+                    out = await self._model.ainvoke(self._to_lc_messages(messages))
+            except BaseException:
+                elapsed = time.perf_counter() - t0
+                LLM_SECONDS.observe(elapsed, outcome="error", **labels)
+                record_span(f"llm.{purpose}", elapsed, model=self.name, error=True)
+                raise
+            elapsed = time.perf_counter() - t0
+
+        usage = getattr(out, "usage_metadata", None) or {}
+        prompt_tokens = int(usage.get("input_tokens", 0) or 0)
+        completion_tokens = int(usage.get("output_tokens", 0) or 0)
+        cost = self.cost(prompt_tokens, completion_tokens)
+        LLM_SECONDS.observe(elapsed, outcome="ok", **labels)
+        LLM_TOKENS.observe(prompt_tokens, kind="prompt", **labels)
+        LLM_TOKENS.observe(completion_tokens, kind="completion", **labels)
+        LLM_COST.inc(cost, provider=labels["provider"], model=self.name)
+        record_span(
+            f"llm.{purpose}",
+            elapsed,
+            model=self.name,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=round(cost, 8),
+        )
+        text = self._chunk_text(getattr(out, "content", str(out))).strip()
+        if structured is None:
+            return text, None
+        if isinstance(parsed, BaseModel):
+            return text, parsed.model_dump()
+        if not text and getattr(out, "tool_calls", None):
+            # Tool-call reply that failed validation: repair its arguments.
+            text = json.dumps(out.tool_calls[0].get("args") or {})
+        return text, parsed if isinstance(parsed, dict) else None
+
+    @staticmethod
+    def _chunk_text(content: Any) -> str:
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                p if isinstance(p, str) else str(p.get("text", ""))
+                for p in content
+                if isinstance(p, (str, dict))
+            )
+        return ""
+
+    async def _stream(
+        self, messages: List[Dict[str, Any]], purpose: str, sink: EventSink
+    ) -> "AIMessage":
+        """Stream the reply, emitting steps as they complete; returns the whole message."""
+        from langchain_core.messages import AIMessage
+
+        parser = StepStreamParser()
+        index = 0
+        full = None
+        async for chunk in self._model.astream(self._to_lc_messages(messages)):
+            full = chunk if full is None else full + chunk
+            for step in parser.feed(self._chunk_text(chunk.content)):
+                sink.emit(
+                    "step",
+                    {
+                        "attempt": purpose,
+                        "index": index,
+                        "title": str(step.get("title", "Step")),
+                        "explanation": str(step.get("explanation", "")),
+                    },
+                )
+                index += 1
+        return full if full is not None else AIMessage(content="")
+
+
+def _text_spec(stronger: bool) -> ModelSpec:
+    name = settings.llm_text_stronger_model if stronger else settings.llm_text_model
+    return (name, settings.llm_text_provider or None, 0.2)
+
+
+def _vision_spec(stronger: bool) -> ModelSpec:
+    name = settings.llm_vision_stronger_model if stronger else settings.llm_vision_model
+    provider = settings.llm_vision_provider or settings.llm_text_provider or None
+    return (name, provider, 0.2)
 
 
 class ModelFactory:
     """Factory / Strategy for selecting base and stronger models, both text and vision."""
 
     @staticmethod
-    def text_default() -> LLM:
+    def _build(spec: ModelSpec, fallbacks: str) -> LLM:
+        name, provider, temperature = spec
         return LLM(
-            name=settings.llm_text_model,
-            provider=settings.llm_text_provider or None,
-            temperature=0.2,
+            name=name,
+            provider=provider,
+            temperature=temperature,
+            fallbacks=[
+                LLM(name=m, provider=p, temperature=temperature)
+                for p, m in parse_fallbacks(fallbacks)
+            ],
         )
 
+    @staticmethod
+    def text_default() -> LLM:
+        return ModelFactory._build(_text_spec(False), settings.llm_text_fallbacks)
+
     @staticmethod
     def text_stronger() -> LLM:
-        return LLM(
-            name=settings.llm_text_stronger_model,
-            provider=settings.llm_text_provider or None,
-            temperature=0.2,
+        return ModelFactory._build(
+            _text_spec(True), settings.llm_text_stronger_fallbacks
         )
 
     @staticmethod
     def vision_default() -> LLM:
-        return LLM(
-            name=settings.llm_vision_model,
-            provider=settings.llm_vision_provider or settings.llm_text_provider or None,
-            temperature=0.2,
-        )
+        return ModelFactory._build(_vision_spec(False), settings.llm_vision_fallbacks)
 
     @staticmethod
     def vision_stronger() -> LLM:
-        return LLM(
-            name=settings.llm_vision_stronger_model,
-            provider=settings.llm_vision_provider or settings.llm_text_provider or None,
-            temperature=0.2,
+        return ModelFactory._build(
+            _vision_spec(True), settings.llm_vision_stronger_fallbacks
         )
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of LLM clients, one per role.
+
+    Each entry remembers the RoleSpec it was built from; when the matching
+    settings change the client is rebuilt on next access, otherwise the same
+    instance (and its provider HTTP connection pool) is shared by every request.
+    """
+
+    _ROLES: Dict[str, Tuple[Callable[[], RoleSpec], Callable[[], LLM]]] = {
+        "text_default": (
+            lambda: (_text_spec(False), settings.llm_text_fallbacks),
+            ModelFactory.text_default,
+        ),
+        "text_stronger": (
+            lambda: (_text_spec(True), settings.llm_text_stronger_fallbacks),
+            ModelFactory.text_stronger,
+        ),
+        "vision_default": (
+            lambda: (_vision_spec(False), settings.llm_vision_fallbacks),
+            ModelFactory.vision_default,
+        ),
+        "vision_stronger": (
+            lambda: (_vision_spec(True), settings.llm_vision_stronger_fallbacks),
+            ModelFactory.vision_stronger,
+        ),
+    }
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: Dict[str, Tuple[RoleSpec, LLM]] = {}
+        self._pinned: Dict[str, LLM] = {}
+
+    def pin(self, role: str, llm: LLM) -> None:
+        """Serve `llm` for `role` regardless of settings (benchmarks, fakes)."""
+        if role not in self._ROLES:
+            raise KeyError(role)
+        self._pinned[role] = llm
+
+    def get(self, role: str) -> LLM:
+        pinned = self._pinned.get(role)
+        if pinned is not None:
+            return pinned
+        spec_fn, build = self._ROLES[role]
+        spec = spec_fn()
+        cached = self._models.get(role)
+        if cached is not None and cached[0] == spec:
+            return cached[1]
+        with self._lock:
+            cached = self._models.get(role)
+            if cached is None or cached[0] != spec:
+                cached = (spec, build())
+                self._models[role] = cached
+            return cached[1]
+
+    def text_default(self) -> LLM:
+        return self.get("text_default")
+
+    def text_stronger(self) -> LLM:
+        return self.get("text_stronger")
+
+    def vision_default(self) -> LLM:
+        return self.get("vision_default")
+
+    def vision_stronger(self) -> LLM:
+        return self.get("vision_stronger")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._pinned.clear()
+
+
+models = ModelRegistry()
@@ -0,0 +1,206 @@
+"""
+Health tracking and routing across interchangeable LLMs.
+
+Every call made through `LLM.ask` feeds a per-(provider, model)
+`ProviderHealth`: a rolling window of latencies and outcomes plus a circuit
+breaker. After LLM_BREAKER_FAILURES consecutive failures the breaker opens
+and the model is skipped for LLM_BREAKER_COOLDOWN_SECONDS; then a single probe
+call is let through, which closes it again on success.
+
+A role with fallbacks configured (LLM_TEXT_FALLBACKS etc.) holds several
+candidates; `route()` orders them fastest-healthy first and `LLM.ask` fails
+over down that list.
+"""
+
+import math
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from core.config import settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def parse_fallbacks(raw: str) -> List[Tuple[str, str]]:
+    """'openai:gpt-4o-mini, ollama:qwen2.5:7b' -> [(provider, model), ...]."""
+    out = []
+    for item in (raw or "").split(","):
+        provider, sep, model = item.strip().partition(":")
+        if sep and provider and model:
+            out.append((provider, model))
+    return out
+
+
+class ProviderHealth:
+    def __init__(
+        self, key: str, window: int, failures_to_open: int, cooldown: float
+    ) -> None:
+        self.key = key
+        self.failures_to_open = max(1, failures_to_open)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._probing = False
+        self.calls = 0
+        self.failures = 0
+        self.trips = 0
+
+    def _cooled(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    def available(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            return self._cooled() and not self._probing
+
+    def begin(self) -> None:
+        """About to call: an expired open breaker lets this one call probe."""
+        with self._lock:
+            if self.state != CLOSED and self._cooled() and not self._probing:
+                self.state = HALF_OPEN
+                self._probing = True
+
+    def release(self) -> None:
+        """The call ended without saying anything about the provider."""
+        with self._lock:
+            self._probing = False
+
+    def success(self, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(seconds)
+            self._outcomes.append(True)
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._outcomes.append(False)
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED
+                and self.consecutive_failures >= self.failures_to_open
+            ):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self._probing = False
+
+    def latency(self) -> Optional[float]:
+        """Median of recent successful calls, None before the first one."""
+        with self._lock:
+            return statistics.median(self._latencies) if self._latencies else None
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def score(self) -> Optional[float]:
+        """Expected seconds per successful call; lower is better."""
+        latency = self.latency()
+        if latency is None:
+            return None
+        return latency / max(0.05, 1.0 - self.error_rate())
+
+    def stats(self) -> Dict:
+        latency = self.latency()
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "trips": self.trips,
+            "error_rate": round(self.error_rate(), 3),
+            "latency_p50_seconds": round(latency, 3) if latency is not None else None,
+        }
+
+
+class HealthRegistry:
+    def __init__(
+        self,
+        window: int,
+        failures_to_open: int,
+        cooldown: float,
+        explore: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.window = window
+        self.failures_to_open = failures_to_open
+        self.cooldown = cooldown
+        self.explore = explore
+        self._rng = random.Random(seed)
+        self.explored = 0
+        self._lock = threading.Lock()
+        self._health: Dict[str, ProviderHealth] = {}
+        self.failovers = 0
+
+    def get(self, provider: Optional[str], model: str) -> ProviderHealth:
+        key = f"{provider}:{model}"
+        health = self._health.get(key)
+        if health is None:
+            with self._lock:
+                health = self._health.get(key)
+                if health is None:
+                    health = self._health[key] = ProviderHealth(
+                        key, self.window, self.failures_to_open, self.cooldown
+                    )
+        return health
+
+    def route(self, candidates: Sequence) -> List:
+        """
+        Candidates (anything with .provider/.name) in the order to try them.
+
+        Available ones come first: never-called ones in configured order (so
+        each gets measured once), then by score, then those that have only
+        failed. An LLM_POOL_EXPLORE fraction of calls moves a random other
+        available candidate to the front to keep its latency current. Tripped
+        candidates go last, longest-tripped first, as a last resort.
+        """
+        ranked, tripped = [], []
+        for c in candidates:
+            health = self.get(c.provider, c.name)
+            if not health.available():
+                tripped.append((health.opened_at, c))
+                continue
+            score = health.score()
+            if score is None:
+                score = math.inf if health.calls else 0.0
+            ranked.append((score, c))
+        ranked.sort(key=lambda sc: sc[0])
+        tripped.sort(key=lambda oc: oc[0])
+        order = [c for _, c in ranked]
+        if len(order) > 1 and self._rng.random() < self.explore:
+            order.insert(0, order.pop(self._rng.randrange(1, len(order))))
+            self.explored += 1
+        return order + [c for _, c in tripped]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            health = dict(self._health)
+        return {
+            "open_breakers": sum(h.state != CLOSED for h in health.values()),
+            "failovers": self.failovers,
+            "explored": self.explored,
+            "providers": {key: h.stats() for key, h in sorted(health.items())},
+        }
+
+
+provider_health = HealthRegistry(
+    settings.llm_health_window,
+    settings.llm_breaker_failures,
+    settings.llm_breaker_cooldown_seconds,
+    settings.llm_pool_explore,
+)
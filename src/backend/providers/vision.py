@@ -1,33 +1,31 @@
-import base64, json, re
-from typing import Dict, Any, Optional
-from .model_factory import ModelFactory
+import asyncio
+from typing import Tuple
 
-_JSON_BLOCK = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
+from core.schemas import LLMSolution
+from utils.image_prep import data_url
+from .model_factory import models
 
 
-def _parse_json_only(s: str) -> Optional[dict]:
-    s = (s or "").strip()
-    m = _JSON_BLOCK.search(s)
-    if m:
-        try:
-            return json.loads(m.group(1))
-        except Exception:
-            pass
-    try:
-        return json.loads(s)
-    except Exception:
-        return None
+def _followup_hint(task: "asyncio.Future[Tuple[str, str]] | None") -> str:
+    if task is None or not task.done() or task.cancelled() or task.exception():
+        return ""
+    return (task.result()[0] or "").strip()
 
 
 async def solve_image_json(
-    image_bytes: bytes,
+    image_bytes: bytes | memoryview,
     ocr_hint: str | None = None,
     use_stronger_if_low_conf: bool = True,
     threshold: float = 0.6,
+    ocr_followup: "asyncio.Future[Tuple[str, str]] | None" = None,
+    mime_type: str = "image/png",
 ) -> dict:
     """
     Vision-first solver: send the image (and optional OCR hint) directly to a vision-capable LLM.
     Returns a dict with keys: steps, final_answer, difficulty, confidence, topic.
+
+    `ocr_followup` is a still-running OCR task; if it has finished by the time the
+    stronger model is called, its text is attached to that call as the hint.
     """
 
     def make_prompt(hint: str | None) -> list:
@@ -42,10 +40,9 @@ async def solve_image_json(
         content = [{"type": "text", "text": rules}]
         return content
 
-    b64 = base64.b64encode(image_bytes).decode("utf-8")
     user_content = make_prompt(ocr_hint)
     user_content.append(
-        {"type": "image_url", "image_url": f"data:image/png;base64,{b64}"}
+        {"type": "image_url", "image_url": data_url(image_bytes, mime_type)}
     )
     if ocr_hint and ocr_hint.strip():
         user_content.append(
@@ -53,9 +50,11 @@ async def solve_image_json(
         )
 
     # 1) Try default vision model
-    vision = ModelFactory.vision_default()
-    out = await vision.ask([{"role": "user", "content": user_content}])
-    data = _parse_json_only(out) or {}
+    vision = models.vision_default()
+    data, _ = await vision.ask_json(
+        [{"role": "user", "content": user_content}], LLMSolution, purpose="vision"
+    )
+    data = data or {}
 
     # 2) If confidence is low and allowed, try stronger vision model
     try:
@@ -64,9 +63,18 @@ async def solve_image_json(
         conf = 0.0
 
     if use_stronger_if_low_conf and conf < threshold:
-        strong_vision = ModelFactory.vision_stronger()
-        out2 = await strong_vision.ask([{"role": "user", "content": user_content}])
-        data2 = _parse_json_only(out2)
+        strong_content = list(user_content)
+        late_hint = _followup_hint(ocr_followup) if not ocr_hint else ""
+        if late_hint:
+            strong_content.append(
+                {"type": "text", "text": f"OCR hint (weak):\n{late_hint}"}
+            )
+        strong_vision = models.vision_stronger()
+        data2, _ = await strong_vision.ask_json(
+            [{"role": "user", "content": strong_content}],
+            LLMSolution,
+            purpose="vision_strong",
+        )
         if data2:
             data = data2
 
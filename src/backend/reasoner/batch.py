@@ -0,0 +1,129 @@
+"""
+Packed solving for /solve-batch: several short questions in one LLM prompt.
+
+Each packed answer is held to the same bar `solve_llm` applies before
+escalating: it must verify with SymPy when the question allows it, or carry
+at least CONFIDENCE_THRESHOLD otherwise. Anything that falls short is
+returned as None and goes through the regular workflow on its own.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import structlog
+
+from core.config import settings
+from core.schemas import PackedSolutions
+from providers.model_factory import LLM
+from reasoner.fastpath import FAST_PATH_TASKS
+from reasoner.graph import (
+    CONFIDENCE_THRESHOLD,
+    _guess_task,
+    _looks_like_only_choices,
+    _strip_cmd,
+)
+from reasoner.prerouter import expression_size, prerouter
+from reasoner.verify import parse_question, verify_answer
+
+log = structlog.get_logger(__name__)
+
+PACKED_SYSTEM_PROMPT = (
+    "You are an expert math teacher. Solve EACH numbered problem independently, step-by-step with small, clear steps.\n"
+    "Always output ONLY a compact JSON object:\n"
+    "{\n"
+    '  "solutions": [\n'
+    '    {"id": int, "steps": [ {"title": str, "explanation": str}, ... ],\n'
+    '     "final_answer": str, "difficulty": int, "confidence": float}, ...\n'
+    "  ]\n"
+    "}\n"
+    "Rules:\n"
+    "- One entry per problem, with the problem's number as id.\n"
+    "- Keep steps concise and didactic.\n"
+    "- Put the actual result in final_answer (e.g., 'x = 3', '33/7', or '(3)').\n"
+    "- Do NOT include any extra commentary outside the JSON.\n"
+)
+
+
+def packable(question: str) -> bool:
+    """Short, LLM-bound questions that are not expected to need the strong model."""
+    q = question.strip()
+    if len(q) > settings.batch_pack_max_chars or _looks_like_only_choices(q):
+        return False
+    task, _ = _guess_task(q)
+    if task in FAST_PATH_TASKS:
+        return False
+    if prerouter is not None:
+        p = prerouter.predict(task, expression_size(q))
+        if p >= prerouter.threshold:
+            return False
+    return True
+
+
+async def solve_packed(llm: LLM, questions: List[str]) -> List[Optional[Dict]]:
+    """
+    Ask `llm` for all `questions` at once. Returns, per question, a graph-state
+    style dict (work/answer/verified/confidence/difficulty/model) or None.
+    """
+    body = "\n\n".join(f"Problem {i + 1}:\n{q}" for i, q in enumerate(questions))
+    data, _ = await llm.ask_json(
+        [
+            {"role": "system", "content": PACKED_SYSTEM_PROMPT},
+            {"role": "user", "content": body},
+        ],
+        PackedSolutions,
+        purpose="packed",
+    )
+    data = data or {}
+    by_id: Dict[int, Dict] = {}
+    for sol in data.get("solutions") or []:
+        try:
+            by_id[int(sol.get("id"))] = sol
+        except (TypeError, ValueError, AttributeError):
+            continue
+
+    results: List[Optional[Dict]] = []
+    for i, q in enumerate(questions):
+        sol = by_id.get(i + 1)
+        results.append(await _accept(llm, _strip_cmd(q), sol) if sol else None)
+    log.info(
+        "batch.packed",
+        questions=len(questions),
+        accepted=sum(r is not None for r in results),
+    )
+    return results
+
+
+async def _accept(llm: LLM, question: str, sol: Dict) -> Optional[Dict]:
+    steps = [
+        s
+        for s in sol.get("steps") or []
+        if isinstance(s, dict) and "title" in s and "explanation" in s
+    ]
+    fa = str(sol.get("final_answer", "")).strip()
+    try:
+        conf = float(sol.get("confidence", 0.0))
+        diff = int(sol.get("difficulty", 3))
+    except (TypeError, ValueError):
+        return None
+    if not steps or not fa:
+        return None
+    verdict = None
+    problem = await parse_question(question)
+    if problem is not None:
+        verdict = await verify_answer(problem, fa)
+        if verdict is False:
+            return None
+    if verdict is None and conf < CONFIDENCE_THRESHOLD:
+        return None
+    verified = bool(verdict)
+    return {
+        "work": steps,
+        "answer": fa,
+        "verified": verified,
+        "confidence": conf,
+        "difficulty": diff,
+        "model": {
+            "provider": getattr(llm, "provider", "unknown"),
+            "name": getattr(llm, "name", "unknown"),
+        },
+    }
@@ -0,0 +1,414 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import sympy as sp
+import structlog
+from sympy.parsing.sympy_parser import (
+    parse_expr,
+    standard_transformations,
+    convert_xor,
+)
+
+from core.config import settings
+from reasoner.parsing import PARSE_GLOBALS
+from reasoner.graph import _strip_cmd
+from utils.image_hash import hamming
+
+log = structlog.get_logger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+# Only plain algebra gets a canonical form. The parser eval()s its input; it is
+# kept harmless by PARSE_GLOBALS (no builtins), not by this regex.
+_SYMPY_SAFE_RE = re.compile(r"[0-9A-Za-z\s\.\+\-\*/\^\(\)=]+")
+_SYMPY_MAX_LEN = 200
+_TRANSFORMS = standard_transformations + (convert_xor,)
+
+
+# ---------- Key normalization ----------
+def normalize_question(text: str) -> str:
+    """Collapse whitespace and drop a leading `solve`/`giải` command."""
+    return _WS_RE.sub(" ", _strip_cmd(text or "")).strip()
+
+
+def _parse(text: str) -> sp.Basic:
+    return parse_expr(
+        text,
+        local_dict={},
+        global_dict=PARSE_GLOBALS,
+        transformations=_TRANSFORMS,
+        evaluate=False,
+    )
+
+
+def _canonical_sympy(text: str) -> Optional[str]:
+    """Unevaluated SymPy form of `text`, so `x+1 = 3` and `1 + x=3` share a key."""
+    if len(text) > _SYMPY_MAX_LEN or not _SYMPY_SAFE_RE.fullmatch(text):
+        return None
+    try:
+        if text.count("=") == 1:
+            lhs, rhs = text.split("=", 1)
+            expr = sp.Eq(_parse(lhs), _parse(rhs), evaluate=False)
+        elif "=" in text:
+            return None
+        else:
+            expr = _parse(text)
+        return sp.srepr(expr)
+    except Exception:
+        return None
+
+
+def solution_cache_key(question: str, level: str = "auto", locale: str = "en") -> str:
+    q = normalize_question(question)
+    canon = _canonical_sympy(q)
+    body = f"sympy:{canon}" if canon is not None else f"text:{q}"
+    raw = "\x1f".join([(level or "auto").lower(), (locale or "en").lower(), body])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ---------- Backends ----------
+class MemoryCacheBackend:
+    """In-process LRU with per-entry expiry. Not shared between workers."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> int:
+        """Store `value`; returns how many entries were evicted to make room."""
+        evicted = 0
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU shared by every worker that points at the same file."""
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._local = threading.local()
+        with self._conn() as c:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS solve_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS solve_cache_lru ON solve_cache(last_access)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        c = self._conn()
+        row = c.execute(
+            "SELECT value, expires_at FROM solve_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            c.execute("DELETE FROM solve_cache WHERE key = ?", (key,))
+            return None
+        c.execute("UPDATE solve_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float) -> int:
+        now = time.time()
+        c = self._conn()
+        c.execute(
+            "INSERT OR REPLACE INTO solve_cache (key, value, expires_at, last_access)"
+            " VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now),
+        )
+        c.execute("DELETE FROM solve_cache WHERE expires_at <= ?", (now,))
+        cur = c.execute(
+            "DELETE FROM solve_cache WHERE key IN ("
+            " SELECT key FROM solve_cache ORDER BY last_access DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        return max(cur.rowcount, 0)
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM solve_cache")
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM solve_cache").fetchone()[0]
+
+
+# ---------- Front ----------
+class SolutionCache:
+    """Solved-question cache in front of the reasoner graph, with hit/miss counters."""
+
+    def __init__(self, backend, ttl_seconds: float) -> None:
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def _run(self, fn, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        try:
+            raw = await self._run(self.backend.get, key)
+        except Exception as e:
+            log.warning("solve_cache.get_failed", error=str(e))
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Dict) -> None:
+        try:
+            evicted = await self._run(
+                self.backend.set, key, json.dumps(value), self.ttl_seconds
+            )
+        except Exception as e:
+            log.warning("solve_cache.set_failed", error=str(e))
+            return
+        self.evictions += evicted
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+def _build_solution_cache() -> Optional[SolutionCache]:
+    kind = (settings.solve_cache_backend or "").lower()
+    if kind in ("", "none", "off"):
+        return None
+    if kind == "sqlite":
+        backend = SQLiteCacheBackend(
+            settings.solve_cache_sqlite_path, settings.solve_cache_max_entries
+        )
+    elif kind == "memory":
+        backend = MemoryCacheBackend(settings.solve_cache_max_entries)
+    else:
+        raise RuntimeError(f"Unknown SOLVE_CACHE_BACKEND: {kind!r}")
+    return SolutionCache(backend, ttl_seconds=settings.solve_cache_ttl_seconds)
+
+
+solution_cache = _build_solution_cache()
+
+
+# ---------- Image cache ----------
+def _ocr_key(text: Optional[str]) -> str:
+    """OCR text compared case- and whitespace-blind; "" when there is none."""
+    return _WS_RE.sub("", text or "").lower()
+
+
+class ImageSolutionCache:
+    """
+    In-process cache of /solve-image responses for normalized images.
+
+    An entry is keyed by the SHA-256 of the normalized pixels, so the same
+    upload always hits. A perceptual-hash neighbour (pHash within
+    `max_distance` bits, dHash within the same bound) is only a hit when the
+    OCR text read from both images is the same and not empty: problems that
+    differ in one digit hash alike ("15 * 4 - 8" and "16 * 4 - 8" are 0 bits
+    apart), and the cache is shared by every user. Near-neighbour search uses
+    multi-index hashing: the 64-bit pHash is cut into `max_distance + 1`
+    bands and, by pigeonhole, any match shares at least one band exactly
+    with the query.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_distance: int):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max(0, min(max_distance, 31))
+        self._bands = self._make_bands(self.max_distance + 1)
+        self._lock = threading.Lock()
+        # digest -> (expires_at, phash, dhash, ocr key, value)
+        self._data: "OrderedDict[str, Tuple[float, int, int, str, Dict]]" = (
+            OrderedDict()
+        )
+        self._index: List[Dict[int, Set[str]]] = [{} for _ in self._bands]
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.distance_sum = 0
+
+    @staticmethod
+    def _make_bands(n: int) -> List[Tuple[int, int]]:
+        """(shift, mask) pairs splitting 64 bits into `n` near-equal bands."""
+        bands = []
+        start = 0
+        for i in range(n):
+            width = 64 // n + (1 if i < 64 % n else 0)
+            bands.append((start, (1 << width) - 1))
+            start += width
+        return bands
+
+    def _keys(self, h: int) -> List[int]:
+        return [(h >> shift) & mask for shift, mask in self._bands]
+
+    def _drop(self, digest: str) -> None:
+        _, ph, _, _, _ = self._data.pop(digest)
+        for band, key in zip(self._index, self._keys(ph)):
+            bucket = band.get(key)
+            if bucket is not None:
+                bucket.discard(digest)
+                if not bucket:
+                    del band[key]
+
+    def _near(self, ph: int, dh: int, now: float) -> List[Tuple[int, str]]:
+        """(pHash distance, digest) of the live entries that look alike."""
+        candidates: Set[str] = set()
+        for band, key in zip(self._index, self._keys(ph)):
+            candidates |= band.get(key, set())
+        out = []
+        for c in candidates:
+            expires_at, c_ph, c_dh, _, _ = self._data[c]
+            if expires_at <= now:
+                continue
+            d = hamming(ph, c_ph)
+            if d <= self.max_distance and hamming(dh, c_dh) <= self.max_distance:
+                out.append((d, c))
+        return sorted(out)
+
+    def has_near(self, ph: int, dh: int) -> bool:
+        """Whether a lookup with OCR text could hit (the caller reads the
+        text only then)."""
+        with self._lock:
+            return bool(self._near(ph, dh, time.time()))
+
+    def get(
+        self, ph: int, dh: int, digest: str, ocr_text: Optional[str] = None
+    ) -> Optional[Dict]:
+        """The response for these exact pixels, else for a look-alike image
+        whose OCR text matches `ocr_text` (when given)."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(digest)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                self._data.move_to_end(digest)
+                return entry[4]
+            text = _ocr_key(ocr_text)
+            if ocr_text is not None:
+                for d, c in self._near(ph, dh, now):
+                    if text and self._data[c][3] == text:
+                        self.hits += 1
+                        self.near_hits += 1
+                        self.distance_sum += d
+                        self._data.move_to_end(c)
+                        return self._data[c][4]
+                    self.rejected += 1
+            self.misses += 1
+            return None
+
+    def set(
+        self, ph: int, dh: int, digest: str, ocr_text: Optional[str], value: Dict
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            if digest in self._data:
+                self._drop(digest)
+            self._data[digest] = (
+                now + self.ttl_seconds,
+                ph,
+                dh,
+                _ocr_key(ocr_text),
+                value,
+            )
+            for band, key in zip(self._index, self._keys(ph)):
+                band.setdefault(key, set()).add(digest)
+            while len(self._data) > self.max_entries:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            for band in self._index:
+                band.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "rejected_near": self.rejected,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "mean_hit_distance": (
+                (self.distance_sum / self.near_hits) if self.near_hits else 0.0
+            ),
+        }
+
+
+image_cache = (
+    ImageSolutionCache(
+        settings.image_cache_max_entries,
+        settings.image_cache_ttl_seconds,
+        settings.image_cache_max_distance,
+    )
+    if settings.image_cache_enabled
+    else None
+)
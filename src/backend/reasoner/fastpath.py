@@ -0,0 +1,434 @@
+"""
+Deterministic solvers for questions SymPy can answer exactly.
+
+Each solver returns a State update (steps in the `Step` shape, `verified=True`)
+or None when the question is outside what it handles; the graph then falls
+back to `solve_llm`.
+"""
+
+import ast
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import sympy as sp
+import structlog
+from sympy.parsing.sympy_parser import (
+    parse_expr,
+    standard_transformations,
+    convert_xor,
+)
+
+from reasoner.parsing import (
+    FUNCTIONS,
+    PARSE_GLOBALS,
+    SAFE_EXPR_RE,
+    TRANSFORMS,
+    WORD_RE,
+)
+
+log = structlog.get_logger(__name__)
+
+FAST_PATH_TASKS = ("evaluate", "solve_equation", "matrix_op")
+FAST_PATH_MODEL = {"provider": "sympy", "name": "fast_path"}
+
+_MATRIX_LITERAL_RE = re.compile(r"\[\s*\[.*?\]\s*\]", re.S)
+_MAX_EXPR_LEN = 200
+_MAX_DEGREE = 4
+_MAX_MATRIX_DIM = 6
+
+
+# ---------- Stats ----------
+class FastPathStats:
+    """How much routed traffic the deterministic path answers on its own."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.attempted: Dict[str, int] = {}
+        self.served: Dict[str, int] = {}
+
+    def record_route(self) -> None:
+        with self._lock:
+            self.routed += 1
+
+    def record(self, task: str, served: bool) -> None:
+        with self._lock:
+            self.attempted[task] = self.attempted.get(task, 0) + 1
+            if served:
+                self.served[task] = self.served.get(task, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            served = sum(self.served.values())
+            attempted = sum(self.attempted.values())
+            return {
+                "routed": self.routed,
+                "attempted": dict(self.attempted),
+                "served": dict(self.served),
+                "served_fraction": (served / self.routed) if self.routed else 0.0,
+                "fallback_fraction": (
+                    (attempted - served) / attempted if attempted else 0.0
+                ),
+            }
+
+
+fast_path_stats = FastPathStats()
+
+
+# ---------- Parsing ----------
+def _fmt(e) -> str:
+    return sp.sstr(e).replace("**", "^")
+
+
+def _parse(text: str) -> Optional[sp.Expr]:
+    """Parse plain algebra; anything with words other than single-letter
+    variables or known functions is rejected (and left to the LLM)."""
+    s = text.strip()
+    if not s or len(s) > _MAX_EXPR_LEN or not SAFE_EXPR_RE.fullmatch(s):
+        return None
+    local: Dict[str, object] = {}
+    for w in WORD_RE.findall(s):
+        if w in FUNCTIONS:
+            local[w] = FUNCTIONS[w]
+        elif len(w) == 1:
+            local[w] = sp.Symbol(w)
+        else:
+            return None
+    try:
+        expr = parse_expr(
+            s,
+            local_dict=local,
+            global_dict=PARSE_GLOBALS,
+            transformations=TRANSFORMS,
+        )
+    except Exception:
+        return None
+    if not isinstance(expr, sp.Expr):
+        return None
+    return sp.nsimplify(expr, rational=True)
+
+
+def _result(steps: List[Dict[str, str]], answer: str, difficulty: int) -> Dict:
+    return {
+        "work": steps,
+        "answer": answer,
+        "verified": True,
+        "confidence": 1.0,
+        "difficulty": difficulty,
+        "model": dict(FAST_PATH_MODEL),
+        "fast_path": True,
+    }
+
+
+# ---------- evaluate ----------
+def solve_evaluate(text: str) -> Optional[Dict]:
+    expr_text = text.strip()
+    expr = _parse(expr_text)
+    if expr is None or expr.free_symbols or not expr.is_number:
+        return None
+    unevaluated = None
+    try:
+        unevaluated = parse_expr(
+            expr_text,
+            global_dict=PARSE_GLOBALS,
+            transformations=(*standard_transformations, convert_xor),
+            evaluate=False,
+        )
+    except Exception:
+        pass
+    value = sp.simplify(expr)
+    if value.has(sp.zoo, sp.nan, sp.oo, -sp.oo) or not value.is_finite:
+        return None
+
+    steps = [
+        {
+            "title": "Write the expression",
+            "explanation": _fmt(unevaluated if unevaluated is not None else expr),
+        },
+        {
+            "title": "Compute",
+            "explanation": "Apply the order of operations (brackets, powers, "
+            f"multiplication/division, addition/subtraction): = {_fmt(value)}",
+        },
+    ]
+    if value.is_Rational and not value.is_Integer:
+        steps.append(
+            {
+                "title": "Decimal value",
+                "explanation": f"{_fmt(value)} ≈ {_fmt(sp.N(value, 10))}",
+            }
+        )
+    return _result(steps, _fmt(value), difficulty=1)
+
+
+# ---------- solve_equation ----------
+def _split_equation(text: str) -> Optional[Tuple[sp.Expr, sp.Expr]]:
+    if text.count("=") != 1:
+        return None
+    lhs_s, rhs_s = text.split("=", 1)
+    lhs, rhs = _parse(lhs_s), _parse(rhs_s)
+    if lhs is None or rhs is None:
+        return None
+    return lhs, rhs
+
+
+def _roots_answer(var: sp.Symbol, roots: List[sp.Expr]) -> str:
+    return ", ".join(f"{var} = {_fmt(r)}" for r in roots)
+
+
+def solve_equation(text: str) -> Optional[Dict]:
+    sides = _split_equation(text)
+    if sides is None:
+        return None
+    lhs, rhs = sides
+    expr = sp.expand(lhs - rhs)
+    symbols = expr.free_symbols | lhs.free_symbols | rhs.free_symbols
+    if len(symbols) != 1:
+        return None
+    (var,) = symbols
+    try:
+        poly = sp.Poly(expr, var)
+    except sp.PolynomialError:
+        return None
+    if not poly.domain.is_QQ and not poly.domain.is_ZZ:
+        return None
+    degree = poly.degree()
+    if degree > _MAX_DEGREE:
+        return None
+
+    if rhs == 0:
+        moved = f"{_fmt(expr)} = 0"
+    else:
+        moved = f"{_fmt(lhs)} - ({_fmt(rhs)}) = 0  ⇒  {_fmt(expr)} = 0"
+    steps = [{"title": "Move all terms to one side", "explanation": moved}]
+
+    if degree <= 0:
+        if expr == 0:
+            steps.append(
+                {
+                    "title": "Conclusion",
+                    "explanation": f"The equation holds for every value of {var}.",
+                }
+            )
+            return _result(steps, f"All real {var}", difficulty=1)
+        steps.append(
+            {
+                "title": "Conclusion",
+                "explanation": f"{_fmt(expr)} = 0 is never true, so there is no solution.",
+            }
+        )
+        return _result(steps, "No solution", difficulty=1)
+
+    if degree == 1:
+        a, b = poly.all_coeffs()
+        root = sp.Rational(-b, a) if a.is_Rational and b.is_Rational else -b / a
+        steps += [
+            {
+                "title": f"Isolate {var}",
+                "explanation": f"{_fmt(a * var)} = {_fmt(-b)}",
+            },
+            {
+                "title": f"Divide both sides by {_fmt(a)}",
+                "explanation": f"{var} = {_fmt(root)}",
+            },
+        ]
+        roots = [root]
+        difficulty = 1
+    elif degree == 2:
+        a, b, c = poly.all_coeffs()
+        disc = b**2 - 4 * a * c
+        steps += [
+            {
+                "title": "Identify coefficients",
+                "explanation": f"a = {_fmt(a)}, b = {_fmt(b)}, c = {_fmt(c)}",
+            },
+            {
+                "title": "Compute the discriminant",
+                "explanation": f"Δ = b^2 - 4ac = {_fmt(disc)}",
+            },
+        ]
+        if disc < 0:
+            steps.append(
+                {
+                    "title": "Conclusion",
+                    "explanation": "Δ < 0, so the equation has no real solution.",
+                }
+            )
+            return _result(steps, "No real solution", difficulty=2)
+        roots = sorted(
+            {sp.simplify((-b + sign * sp.sqrt(disc)) / (2 * a)) for sign in (-1, 1)},
+            key=float,
+        )
+        steps.append(
+            {
+                "title": "Apply the quadratic formula",
+                "explanation": f"{var} = (-b ± √Δ) / (2a)  ⇒  "
+                + _roots_answer(var, roots),
+            }
+        )
+        difficulty = 2
+    else:
+        factored = sp.factor(expr)
+        real_roots = sorted({r for r in sp.roots(poly, filter="R").keys()}, key=float)
+        try:
+            expected = poly.sqf_part().count_roots()
+        except Exception:  # coefficients count_roots cannot isolate over
+            return None
+        if len(real_roots) != expected:
+            # Some real roots have no closed form SymPy can tell is real
+            # (casus irreducibilis): an incomplete list must not be served.
+            return None
+        steps.append(
+            {
+                "title": "Factor",
+                "explanation": f"{_fmt(factored)} = 0",
+            }
+        )
+        if not real_roots:
+            steps.append(
+                {
+                    "title": "Conclusion",
+                    "explanation": "No factor has a real zero, so there is no real solution.",
+                }
+            )
+            return _result(steps, "No real solution", difficulty=3)
+        steps.append(
+            {
+                "title": "Set each factor to zero",
+                "explanation": _roots_answer(var, real_roots),
+            }
+        )
+        roots = real_roots
+        difficulty = 3
+
+    for r in roots:
+        if sp.simplify(expr.subs(var, r)) != 0:
+            return None
+    steps.append(
+        {
+            "title": "Check",
+            "explanation": "Substituting back: "
+            + "; ".join(
+                f"{var} = {_fmt(r)} gives {_fmt(sp.simplify(lhs.subs(var, r)))} = "
+                f"{_fmt(sp.simplify(rhs.subs(var, r)))}"
+                for r in roots
+            ),
+        }
+    )
+    return _result(steps, _roots_answer(var, roots), difficulty=difficulty)
+
+
+# ---------- matrix_op ----------
+def _parse_matrix(text: str) -> Optional[sp.Matrix]:
+    m = _MATRIX_LITERAL_RE.search(text)
+    if not m:
+        return None
+    try:
+        rows = ast.literal_eval(m.group(0))
+    except (ValueError, SyntaxError):
+        return None
+    if (
+        not isinstance(rows, list)
+        or not rows
+        or not all(isinstance(r, list) and r and len(r) == len(rows[0]) for r in rows)
+    ):
+        return None
+    if len(rows) > _MAX_MATRIX_DIM or len(rows[0]) > _MAX_MATRIX_DIM:
+        return None
+    if not all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for r in rows for v in r
+    ):
+        return None
+    return sp.Matrix(rows).applyfunc(lambda v: sp.nsimplify(v, rational=True))
+
+
+def _fmt_matrix(M: sp.Matrix) -> str:
+    return (
+        "["
+        + ", ".join(
+            "[" + ", ".join(_fmt(v) for v in M.row(i)) + "]" for i in range(M.rows)
+        )
+        + "]"
+    )
+
+
+def solve_matrix(text: str, op: str) -> Optional[Dict]:
+    M = _parse_matrix(text)
+    if M is None or op not in ("det", "inv", "rank", "rref"):
+        return None
+    steps = [{"title": "Matrix", "explanation": f"A = {_fmt_matrix(M)}"}]
+
+    if op in ("det", "inv") and not M.is_square:
+        return None
+
+    if op == "det":
+        det = M.det()
+        if M.shape == (2, 2):
+            a, b, c, d = M
+            how = f"det(A) = ad - bc = ({_fmt(a)})({_fmt(d)}) - ({_fmt(b)})({_fmt(c)})"
+        else:
+            how = "Expand along the first row (cofactor expansion)"
+        steps.append(
+            {"title": "Compute the determinant", "explanation": f"{how} = {_fmt(det)}"}
+        )
+        return _result(steps, _fmt(det), difficulty=1 if M.rows <= 2 else 2)
+
+    if op == "inv":
+        det = M.det()
+        steps.append(
+            {"title": "Compute the determinant", "explanation": f"det(A) = {_fmt(det)}"}
+        )
+        if det == 0:
+            steps.append(
+                {
+                    "title": "Conclusion",
+                    "explanation": "det(A) = 0, so A is singular and has no inverse.",
+                }
+            )
+            return _result(steps, "A is not invertible", difficulty=2)
+        inv = M.inv()
+        if M.shape == (2, 2):
+            how = "For a 2×2 matrix, A⁻¹ = (1/det(A)) · [[d, -b], [-c, a]]"
+        else:
+            how = "Row-reduce [A | I] to [I | A⁻¹] (Gauss-Jordan elimination)"
+        steps.append(
+            {"title": "Invert", "explanation": f"{how}  ⇒  A⁻¹ = {_fmt_matrix(inv)}"}
+        )
+        if M * inv != sp.eye(M.rows):
+            return None
+        steps.append({"title": "Check", "explanation": "A · A⁻¹ = I"})
+        return _result(steps, _fmt_matrix(inv), difficulty=2)
+
+    R, pivots = M.rref()
+    steps.append(
+        {
+            "title": "Row-reduce to reduced row echelon form",
+            "explanation": f"rref(A) = {_fmt_matrix(R)}",
+        }
+    )
+    if op == "rref":
+        return _result(steps, _fmt_matrix(R), difficulty=2)
+    steps.append(
+        {
+            "title": "Count pivots",
+            "explanation": f"Pivot columns: {', '.join(str(p + 1) for p in pivots) or 'none'}"
+            f"  ⇒  rank(A) = {len(pivots)}",
+        }
+    )
+    return _result(steps, str(len(pivots)), difficulty=2)
+
+
+# ---------- Dispatcher ----------
+def solve_fast(task: str, text: str, meta: Dict[str, str]) -> Optional[Dict]:
+    """Try the deterministic solver for `task`; None means fall back to the LLM."""
+    try:
+        if task == "evaluate":
+            return solve_evaluate(text)
+        if task == "solve_equation":
+            return solve_equation(text)
+        if task == "matrix_op":
+            return solve_matrix(text, meta.get("matrix_op", "auto"))
+    except Exception as e:
+        log.info("fast_path.error", task=task, error=str(e))
+    return None
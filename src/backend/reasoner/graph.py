@@ -1,12 +1,28 @@
 from __future__ import annotations
-from typing import TypedDict, Literal, List, Dict
+from typing import TypedDict, Literal, List, Dict, Optional
 from pydantic import BaseModel
-from langgraph.graph import StateGraph, START, END
-import sympy as sp
+import asyncio
 import re
-import json
+import threading
+import time
 import structlog
-from providers.model_factory import LLM, ModelFactory
+from core.config import settings
+from core.executor import ExecutorBusy, cpu_pool
+from core.metrics import (
+    ESCALATION_WINNERS,
+    ESCALATIONS,
+    NODE_SECONDS,
+    PREROUTE_DECISIONS,
+    RollingQuantile,
+    record_span,
+)
+from core.schemas import LLMSolution
+from core.streaming import emit
+from providers.model_factory import LLM, models
+from reasoner.fastpath import FAST_PATH_TASKS, _fmt, fast_path_stats, solve_fast
+from reasoner.prerouter import prerouter
+from reasoner.numcheck import Problem
+from reasoner.verify import parse_question, verify_answer
 
 log = structlog.get_logger(__name__)
 
@@ -46,6 +62,8 @@ class State(TypedDict, total=False):
     confidence: float
     difficulty: int
     original_question: str
+    fast_path: bool
+    problem: Optional[Problem]
 
 
 # ---------- Helpers ----------
@@ -74,13 +92,6 @@ def _has_keywords(s: str, kws: List[str]) -> bool:
     return any(k in s for k in kws)
 
 
-def _first_var(expr: str) -> str:
-    for ch in "xyzabtuvw":
-        if ch in expr:
-            return ch
-    return "x"
-
-
 def _guess_task(text: str) -> (str, Dict[str, str]):
     t = text.strip()
     meta: Dict[str, str] = {}
@@ -114,7 +125,6 @@ def _guess_task(text: str) -> (str, Dict[str, str]):
 
 
 _OPTION_RE = re.compile(r"^\(\s*(\d+)\s*\)\s*(.+)$")
-_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
 
 
 def _extract_options(text: str) -> Dict[str, str]:
@@ -129,20 +139,6 @@ def _extract_options(text: str) -> Dict[str, str]:
     return opts
 
 
-def _safe_json_load(s: str) -> dict | None:
-    s = (s or "").strip()
-    m = _JSON_BLOCK_RE.search(s)
-    if m:
-        try:
-            return json.loads(m.group(1))
-        except Exception:
-            pass
-    try:
-        return json.loads(s)
-    except Exception:
-        return None
-
-
 def _looks_like_only_choices(text: str) -> bool:
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
     if not lines:
@@ -157,53 +153,6 @@ def _looks_like_only_choices(text: str) -> bool:
     return choice_lines >= 2 and other_lines == 0
 
 
-def _looks_like_equation(text: str) -> bool:
-    t = text.strip()
-    return "=" in t and not t.lower().strip().endswith("?")
-
-
-def _can_sympy_verify(question: str, final_answer: str) -> bool:
-    q = question.strip()
-    if _looks_like_equation(q):
-        return True
-    if re.fullmatch(r"[\d\.\s\+\-\*/\^\(\)]+", q.replace(" ", "")):
-        return True
-    return False
-
-
-def _sympy_verify(question: str, final_answer: str) -> bool:
-    try:
-        q = question.strip()
-        ans = final_answer.strip()
-        if "=" in ans:
-            ans = ans.split("=", 1)[-1].strip()
-        if _looks_like_equation(q):
-            lhs_str, rhs_str = q.split("=", 1)
-            var = _first_var(q)
-            x = sp.symbols(var)
-            lhs = sp.sympify(lhs_str)
-            rhs = sp.sympify(rhs_str)
-            try:
-                ans_sym = sp.nsimplify(ans)
-            except Exception:
-                m = re.search(rf"{var}\s*=\s*([^\s]+)", ans)
-                if not m:
-                    return False
-                ans_sym = sp.nsimplify(m.group(1))
-            return bool(sp.simplify(lhs.subs(x, ans_sym) - rhs.subs(x, ans_sym)) == 0)
-        if re.fullmatch(r"[\d\.\s\+\-\*/\^\(\)]+", q.replace(" ", "")):
-            expr = sp.sympify(q)
-            res = sp.simplify(expr)
-            try:
-                ans_sym = sp.nsimplify(ans)
-            except Exception:
-                return False
-            return bool(sp.simplify(res - ans_sym) == 0)
-    except Exception:
-        return False
-    return False
-
-
 LLM_SOLVE_SYSTEM_PROMPT = (
     "You are an expert math teacher. Solve the user's problem step-by-step with small, clear steps.\n"
     "Always output ONLY a compact JSON object with keys:\n"
@@ -249,21 +198,53 @@ async def parse_node(state: State) -> State:
     ir = state["ir"]
     text = ir.get("text", "")
     task, meta = _guess_task(text)
+    # Parsed once here; every later answer check reuses it.
+    problem = await parse_question(text) if text.strip() else None
     parsed = ProblemIR(
         text=text,
         latex=ir.get("latex", []),
         task=task,
-        expressions=[],
-        variables=[],
+        expressions=[_fmt(e) for e in problem.exprs] if problem else [],
+        variables=[str(s) for s in problem.symbols] if problem else [],
         meta=meta,
     ).model_dump()
-    log.info("parse", task=task, meta=meta)
-    return {"parsed": parsed}
+    log.info("parse", task=task, meta=meta, checkable=problem is not None)
+    return {"parsed": parsed, "problem": problem}
 
 
 async def route(state: State) -> str:
-    log.info("route", to="solve_llm", task=state["parsed"]["task"])
-    return "solve_llm"
+    task = state["parsed"]["task"]
+    to = "fast_path" if task in FAST_PATH_TASKS else "solve_llm"
+    fast_path_stats.record_route()
+    log.info("route", to=to, task=task)
+    return to
+
+
+async def fast_path_node(state: State) -> State:
+    """Solve exactly with SymPy; leaves state untouched when it gives up."""
+    p = state.get("parsed") or {}
+    task = p.get("task", "unknown")
+    try:
+        res = await cpu_pool.run(
+            solve_fast,
+            task,
+            _strip_cmd(p.get("text", "")),
+            p.get("meta") or {},
+            timeout=settings.fast_path_timeout_seconds,
+        )
+    except (TimeoutError, ExecutorBusy) as e:
+        log.warning("fast_path.skipped", task=task, reason=type(e).__name__)
+        res = None
+    fast_path_stats.record(task, served=res is not None)
+    if res is None:
+        log.info("fast_path.fallback", task=task)
+        return {"fast_path": False}
+    log.info("fast_path.served", task=task)
+    return res
+
+
+async def after_fast_path(state: State) -> str:
+    return "finalize" if state.get("fast_path") else "solve_llm"
 
 
 async def solve_llm(state: State, base_llm: LLM, strong_llm: LLM) -> State:
@@ -295,102 +276,256 @@ async def solve_llm(state: State, base_llm: LLM, strong_llm: LLM) -> State:
             "model": {"provider": "unknown", "name": "unknown"},
         }
 
-    options = _extract_options(text)
-    threshold = 0.6
+    task = p.get("task", "unknown")
+    problem = state.get("problem")
+    start, size = "base", None
+    if prerouter is not None:
+        start, p_escalate, size = prerouter.decide(task, text)
+        PREROUTE_DECISIONS.inc(task=task, start=start)
+        log.info("preroute", start=start, p_escalate=round(p_escalate, 3), size=size)
+        emit("route", start=start, task=task)
+
+    if start == "strong":
+        strategy = "strong_first"
+        res = await _attempt(strong_llm, text, problem, None, "strong")
+    else:
+        strategy = (settings.solve_escalation_strategy or "sequential").lower()
+        escalate = _STRATEGIES.get(strategy, _escalate_sequential)
+        res = await escalate(text, problem, base_llm, strong_llm)
+        if prerouter is not None:
+            prerouter.record(task, size, escalated=res["purpose"] == "strong")
+    ESCALATION_WINNERS.inc(strategy=strategy, winner=res["purpose"])
+    llm = res["llm"]
+    return {
+        "work": res["steps"],
+        "answer": res["final_answer"],
+        "verified": bool(res["verified"]),
+        "confidence": float(res["confidence"]),
+        "difficulty": int(res["difficulty"]),
+        "model": {
+            "provider": getattr(llm, "provider", "unknown"),
+            "name": getattr(llm, "name", "unknown"),
+        },
+    }
+
 
-    async def _call(llm: LLM, user_text: str, critique: str | None = None) -> dict:
-        sys = LLM_SOLVE_SYSTEM_PROMPT
-        user = (
-            user_text
-            if not critique
-            else f"{user_text}\n\n---\nSelf-correction hint: {critique}\nPlease output JSON."
-        )
-        out = await llm.ask(
-            [{"role": "system", "content": sys}, {"role": "user", "content": user}]
-        )
-        data = _safe_json_load(out)
-        if not data:
-            # fallback: try to split/plain parse
-            steps = [{"title": "Explanation", "explanation": out}]
-            return {
-                "steps": steps,
-                "final_answer": "",
-                "difficulty": 3,
-                "confidence": 0.4,
-            }
-
-        steps = data.get("steps") or [
-            {"title": "Explanation", "explanation": "(empty)"}
-        ]
-        fa = str(data.get("final_answer", "")).strip()
-        diff = int(data.get("difficulty", 3))
-        conf = float(data.get("confidence", 0.4))
+# ---------- Escalation strategies ----------
+CONFIDENCE_THRESHOLD = 0.6
+_CRITIQUE_HINT = "Your final answer does not check out symbolically. Fix arithmetic/logic and re-output JSON."
+_STRONG_HINT = "Produce a more rigorous, carefully verified solution."
+
+# Recent base-call latency per model name; the hedge fires past its percentile.
+_base_latency: Dict[str, RollingQuantile] = {}
+
+
+async def _ask_json(
+    llm: LLM, user_text: str, critique: str | None = None, purpose: str = "base"
+) -> dict:
+    sys = LLM_SOLVE_SYSTEM_PROMPT
+    user = (
+        user_text
+        if not critique
+        else f"{user_text}\n\n---\nSelf-correction hint: {critique}\nPlease output JSON."
+    )
+    data, out = await llm.ask_json(
+        [{"role": "system", "content": sys}, {"role": "user", "content": user}],
+        LLMSolution,
+        purpose=purpose,
+    )
+    if not data or "final_answer" not in data:
+        # fallback: try to split/plain parse
+        steps = [{"title": "Explanation", "explanation": out}]
         return {
             "steps": steps,
-            "final_answer": fa,
-            "difficulty": diff,
-            "confidence": conf,
+            "final_answer": "",
+            "difficulty": 3,
+            "confidence": 0.4,
+            "malformed": True,
         }
 
-    # 1) First pass with base model
-    res = await _call(base_llm, text)
-    steps, fa, diff, conf = (
-        res["steps"],
-        res["final_answer"],
-        res["difficulty"],
-        res["confidence"],
-    )
-    verified = False
-    used_model = getattr(base_llm, "name", "unknown")
-    used_provider = getattr(base_llm, "provider", "unknown")
-
-    # 2) Verify if possible (equations/expressions)
-    if _can_sympy_verify(text, fa):
-        verified = _sympy_verify(text, fa)
-        if not verified:
-            res2 = await _call(
-                base_llm,
-                text,
-                critique="Your final answer does not check out symbolically. Fix arithmetic/logic and re-output JSON.",
-            )
-            steps, fa, diff, conf = (
-                res2["steps"],
-                res2["final_answer"],
-                res2["difficulty"],
-                res2["confidence"],
-            )
-            if _can_sympy_verify(text, fa):
-                verified = _sympy_verify(text, fa)
-
-    # 3) Escalate to stronger model if needed
-    if (not verified and _can_sympy_verify(text, fa)) or conf < threshold:
-        res3 = await _call(
-            strong_llm,
-            text,
-            critique="Produce a more rigorous, carefully verified solution.",
+    steps = data.get("steps") or [{"title": "Explanation", "explanation": "(empty)"}]
+    fa = str(data.get("final_answer", "")).strip()
+    diff = int(data.get("difficulty", 3))
+    conf = float(data.get("confidence", 0.4))
+    return {
+        "steps": steps,
+        "final_answer": fa,
+        "difficulty": diff,
+        "confidence": conf,
+    }
+
+
+async def _attempt(
+    llm: LLM,
+    text: str,
+    problem: Optional[Problem],
+    critique: str | None = None,
+    purpose: str = "base",
+) -> dict:
+    """One LLM call, checked against `problem` when the question has one."""
+    t0 = time.perf_counter()
+    res = await _ask_json(llm, text, critique, purpose)
+    if purpose == "base":
+        name = getattr(llm, "name", "unknown")
+        _base_latency.setdefault(name, RollingQuantile()).observe(
+            time.perf_counter() - t0
         )
-        steps, fa, diff, conf = (
-            res3["steps"],
-            res3["final_answer"],
-            res3["difficulty"],
-            res3["confidence"],
+    res["verifiable"] = res["verified"] = False
+    if problem is not None:
+        verdict = await verify_answer(problem, res["final_answer"])
+        res["verifiable"], res["verified"] = verdict is not None, bool(verdict)
+    if res["verifiable"]:
+        emit("verify", attempt=purpose, verified=res["verified"])
+    res["llm"] = llm
+    res["purpose"] = purpose
+    return res
+
+
+def _needs_strong(res: dict) -> bool:
+    return (res["verifiable"] and not res["verified"]) or res[
+        "confidence"
+    ] < CONFIDENCE_THRESHOLD
+
+
+def _escalation_reason(res: dict) -> str:
+    if res.get("malformed"):
+        return "malformed_json"
+    if res["verifiable"] and not res["verified"]:
+        return "unverified"
+    return "low_confidence"
+
+
+def _escalated(stage: str, reason: str, confidence: float | None = None) -> None:
+    ESCALATIONS.inc(stage=stage, reason=reason)
+    log.info("solve_llm.escalate", stage=stage, reason=reason, confidence=confidence)
+    emit("escalate", stage=stage, reason=reason)
+
+
+def _hedge_delay(llm: LLM) -> float:
+    window = _base_latency.get(getattr(llm, "name", "unknown"))
+    q = window.quantile(settings.solve_hedge_percentile) if window else None
+    if q is None:
+        return settings.solve_hedge_default_seconds
+    return max(settings.solve_hedge_min_seconds, q)
+
+
+async def _first_accepted(tasks: List[asyncio.Task], accept) -> dict:
+    """
+    Return the first result `accept` approves, cancelling the rest; if none is
+    approved, the strong model's answer (or whichever call succeeded).
+    """
+    pending = set(tasks)
+    results: List[dict] = []
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for t in done:
+                try:
+                    res = t.result()
+                except Exception as e:
+                    log.warning("solve_llm.attempt_failed", error=str(e))
+                    error = error or e
+                    continue
+                if accept(res):
+                    return res
+                results.append(res)
+    finally:
+        for t in pending:
+            t.cancel()
+    if not results:
+        raise error
+    return next((r for r in results if r["purpose"] == "strong"), results[-1])
+
+
+async def _escalate_sequential(
+    text: str,
+    problem: Optional[Problem],
+    base_llm: LLM,
+    strong_llm: LLM,
+    res: dict | None = None,
+) -> dict:
+    """Base, then a critique retry if it fails to verify, then the strong model."""
+    if res is None:
+        res = await _attempt(base_llm, text, problem)
+    if res["verifiable"] and not res["verified"]:
+        _escalated("critique", "verify_failed")
+        res = await _attempt(base_llm, text, problem, _CRITIQUE_HINT, "critique")
+    if _needs_strong(res):
+        _escalated("strong", _escalation_reason(res), res["confidence"])
+        res = await _attempt(strong_llm, text, problem, _STRONG_HINT, "strong")
+    return res
+
+
+async def _escalate_hedge(
+    text: str, problem: Optional[Problem], base_llm: LLM, strong_llm: LLM
+) -> dict:
+    """
+    Start the strong model alongside the base call once the base call is slower
+    than its recent SOLVE_HEDGE_PERCENTILE latency; a fast base call continues
+    as in sequential mode.
+    """
+    base_task = asyncio.create_task(_attempt(base_llm, text, problem))
+    try:
+        await asyncio.wait({base_task}, timeout=_hedge_delay(base_llm))
+    except BaseException:
+        base_task.cancel()
+        raise
+    if base_task.done():
+        return await _escalate_sequential(
+            text, problem, base_llm, strong_llm, res=base_task.result()
         )
-        used_model = getattr(strong_llm, "name", used_model)
-        used_provider = getattr(strong_llm, "provider", used_provider)
-        if _can_sympy_verify(text, fa):
-            verified = _sympy_verify(text, fa)
 
-    return {
-        "work": steps,
-        "answer": fa,
-        "verified": bool(verified),
-        "confidence": float(conf),
-        "difficulty": int(diff),
-        "model": {"provider": used_provider, "name": used_model},
-    }
+    _escalated("strong", "hedge")
+    strong_task = asyncio.create_task(
+        _attempt(strong_llm, text, problem, _STRONG_HINT, "strong")
+    )
+    return await _first_accepted(
+        [base_task, strong_task],
+        lambda r: r["purpose"] == "strong" or not _needs_strong(r),
+    )
+
+
+async def _escalate_race(
+    text: str, problem: Optional[Problem], base_llm: LLM, strong_llm: LLM
+) -> dict:
+    """
+    After a base answer that fails to verify, run the critique retry and the
+    strong model concurrently; the first verified answer wins.
+    """
+    res = await _attempt(base_llm, text, problem)
+    if not _needs_strong(res):
+        return res
+    if not (res["verifiable"] and not res["verified"]):
+        # Nothing to check a critique against: straight to the strong model.
+        return await _escalate_sequential(text, problem, base_llm, strong_llm, res=res)
+
+    _escalated("critique", "verify_failed")
+    _escalated("strong", _escalation_reason(res), res["confidence"])
+    tasks = [
+        asyncio.create_task(
+            _attempt(base_llm, text, problem, _CRITIQUE_HINT, "critique")
+        ),
+        asyncio.create_task(
+            _attempt(strong_llm, text, problem, _STRONG_HINT, "strong")
+        ),
+    ]
+    return await _first_accepted(tasks, lambda r: r["verified"])
+
+
+_STRATEGIES = {
+    "sequential": _escalate_sequential,
+    "hedge": _escalate_hedge,
+    "race": _escalate_race,
+}
 
 
 async def finalize(state: State, base_llm: LLM) -> State:
+    # solve_llm names the model that actually answered (strong, or a failover).
+    if state.get("fast_path") or state.get("model"):
+        return {}
     return {
         "model": {
             "provider": getattr(base_llm, "provider", "unknown"),
@@ -399,10 +534,25 @@ async def finalize(state: State, base_llm: LLM) -> State:
     }
 
 
-def get_workflow(base_llm: LLM | None = None, strong_llm: LLM | None = None):
-    """Build the LangGraph with injected models (DI-friendly)."""
-    base = base_llm or ModelFactory.text_default()
-    stronger = strong_llm or ModelFactory.text_stronger()
+def _timed(name: str, fn):
+    """Wrap a node so its wall time lands in metrics and the request's spans."""
+
+    async def node(s: State) -> State:
+        t0 = time.perf_counter()
+        try:
+            return await fn(s)
+        finally:
+            elapsed = time.perf_counter() - t0
+            NODE_SECONDS.observe(elapsed, node=name)
+            record_span(f"node.{name}", elapsed)
+
+    return node
+
+
+def build_workflow(base: LLM, stronger: LLM):
+    """Build and compile the LangGraph around the given models."""
+    # Imported here: langgraph is only needed once per process, at first build.
+    from langgraph.graph import END, START, StateGraph
 
     g = StateGraph(State)
 
@@ -412,14 +562,55 @@ def get_workflow(base_llm: LLM | None = None, strong_llm: LLM | None = None):
     async def finalize_node(s: State) -> State:
         return await finalize(s, base)
 
-    g.add_node("ingest", ingest)
-    g.add_node("parse", parse_node)
-    g.add_node("solve_llm", solve_node)
-    g.add_node("finalize", finalize_node)
+    g.add_node("ingest", _timed("ingest", ingest))
+    g.add_node("parse", _timed("parse", parse_node))
+    g.add_node("fast_path", _timed("fast_path", fast_path_node))
+    g.add_node("solve_llm", _timed("solve_llm", solve_node))
+    g.add_node("finalize", _timed("finalize", finalize_node))
 
     g.add_edge(START, "ingest")
     g.add_edge("ingest", "parse")
-    g.add_conditional_edges("parse", route, {"solve_llm": "solve_llm"})
+    g.add_conditional_edges(
+        "parse", route, {"fast_path": "fast_path", "solve_llm": "solve_llm"}
+    )
+    g.add_conditional_edges(
+        "fast_path",
+        after_fast_path,
+        {"finalize": "finalize", "solve_llm": "solve_llm"},
+    )
     g.add_edge("solve_llm", "finalize")
     g.add_edge("finalize", END)
     return g.compile()
+
+
+# (base, stronger, compiled graph) for the shared registry models.
+_shared_workflow: tuple | None = None
+_shared_workflow_lock = threading.Lock()
+
+
+def get_workflow(base_llm: LLM | None = None, strong_llm: LLM | None = None):
+    """
+    Return the compiled LangGraph with injected models (DI-friendly).
+
+    Without arguments the graph is built once per process around the shared
+    registry models and reused by every request; it is rebuilt only when the
+    registry hands out different model instances (i.e. model settings changed).
+    Explicitly injected models always get a freshly compiled graph.
+    """
+    global _shared_workflow
+    if base_llm is not None or strong_llm is not None:
+        return build_workflow(
+            base_llm or models.text_default(), strong_llm or models.text_stronger()
+        )
+
+    base = models.text_default()
+    stronger = models.text_stronger()
+    cached = _shared_workflow
+    if cached is not None and cached[0] is base and cached[1] is stronger:
+        return cached[2]
+    with _shared_workflow_lock:
+        cached = _shared_workflow
+        if cached is None or cached[0] is not base or cached[1] is not stronger:
+            cached = (base, stronger, build_workflow(base, stronger))
+            _shared_workflow = cached
+        return cached[2]
@@ -0,0 +1,638 @@
+"""
+Numeric answer checking: evaluate what the question asks for and what the
+model answered at random points with lambdified NumPy, and compare.
+
+`check(question, answer)` reads equations (one, or a system), arithmetic,
+simplify/factor/expand, derivatives (against `sp.diff`), integrals (the
+answer is differentiated; definite ones are integrated numerically) and
+limits (evaluated ever closer to the point in high precision). It returns
+True when the answer agrees, False when it clearly does not and None when
+the question or answer cannot be read or the samples are inconclusive, or
+when a simplify/factor/expand answer is not simpler, a product or expanded.
+Symbolic simplification only breaks ties, within
+VERIFY_SYMBOLIC_BUDGET_SECONDS.
+
+`parse_problem` builds a `Problem` once per question (parse_node keeps it in
+the graph state). Parsed questions, parsed answers and lambdified callables
+live in `expr_cache`, a process-wide LRU of SYMPY_CACHE_SIZE entries, so a
+repeated question or answer is not parsed or compiled again.
+"""
+
+import re
+import signal
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import mpmath
+import numpy as np
+import sympy as sp
+from sympy.parsing.sympy_parser import parse_expr
+
+from core.config import settings
+from reasoner.parsing import (
+    FUNCTIONS,
+    PARSE_GLOBALS,
+    SAFE_EXPR_RE,
+    TRANSFORMS,
+    WORD_RE,
+)
+
+_FUNCTIONS = {
+    **FUNCTIONS,
+    "e": sp.E,
+    "E": sp.E,
+    "abs": sp.Abs,
+    "sec": sp.sec,
+    "csc": sp.csc,
+    "cot": sp.cot,
+    "asin": sp.asin,
+    "acos": sp.acos,
+    "atan": sp.atan,
+    "arcsin": sp.asin,
+    "arccos": sp.acos,
+    "arctan": sp.atan,
+    "sinh": sp.sinh,
+    "cosh": sp.cosh,
+    "tanh": sp.tanh,
+    "oo": sp.oo,
+    "inf": sp.oo,
+    "infinity": sp.oo,
+}
+_UNICODE = str.maketrans(
+    {
+        "−": "-",
+        "×": "*",
+        "·": "*",
+        "÷": "/",
+        "∞": "oo",
+        "π": "pi",
+        "√": "sqrt",
+        "²": "^2",
+        "³": "^3",
+        "→": "->",
+    }
+)
+_MAX_EXPR_LEN = 300
+# SymPy evaluates while parsing: a power tower or a huge exponent ("9^9^9",
+# "2^(9^9)", "7^123456") would hold the interpreter for minutes.
+_HUGE_POWER_RE = re.compile(
+    r"(?:\^|\*\*)\s*(?:\d{5,}|[\d.]+\s*(?:\^|\*\*)"
+    r"|\([\d\s.+\-*/]*(?:\^|\*\*)[\d\s.+\-*/^]*\))"
+)
+
+_SIMPLIFY_RE = re.compile(r"^(simplify|factor|expand|reduce)\b[:\s]*(.+)$", re.I)
+_DERIVATIVE_RE = re.compile(
+    r"^(?:differentiate|(?:find\s+)?(?:the\s+)?derivative\s+of|d/d([a-z]))"
+    r"[:\s]*(.+?)(?:\s+(?:with\s+respect\s+to|w\.r\.t\.?)\s+([a-z]))?$",
+    re.I,
+)
+_INTEGRAL_RE = re.compile(
+    r"^(?:integrate|(?:(?:find|evaluate|compute)\s+)?(?:the\s+)?"
+    r"(?:definite\s+|indefinite\s+)?integral\s+of)[:\s]*(.+)$",
+    re.I,
+)
+_BOUNDS_RE = re.compile(r"\s+from\s+(\S+)\s+to\s+(\S+)$", re.I)
+_DIFFERENTIAL_RE = re.compile(r"\s*\bd([a-z])$")
+_LIMIT_RE = re.compile(
+    r"^(?:(?:find|evaluate|compute)\s+)?(?:the\s+)?(?:limit\s+of|lim)[:\s]*(.+?)"
+    r"\s+as\s+([a-z])\s*(?:->|approaches|tends\s+to|goes\s+to)\s*(\S+)$",
+    re.I,
+)
+_SOLVE_PREFIX_RE = re.compile(
+    r"^solve(?:\s+the\s+system)?(?:\s+for\s+[a-z](?:\s*(?:,|and)\s*[a-z])*)?[:\s]*",
+    re.I,
+)
+_SYSTEM_SPLIT_RE = re.compile(r"\s*(?:[;,\n]|\band\b)\s*", re.I)
+_ARITHMETIC_RE = re.compile(r"[\d\.\s\+\-\*/\^\(\)]+")
+_ASSIGNMENT_RE = re.compile(
+    r"\b([a-z])\s*=\s*([^,;=]+?)(?=\s*(?:,|;|\bor\b|\band\b|$))"
+)
+_CONSTANT_RE = re.compile(r"\s*\+\s*C\s*$")
+
+# Sampling: half the points on each side of zero, away from it.
+_SAMPLE_LOW, _SAMPLE_HIGH = 0.1, 3.0
+_MIN_VALID = 8
+_RTOL, _ATOL = 1e-6, 1e-9
+_REFUTE_FRACTION = 0.2
+# Limits: distances to the point (or magnitudes, towards infinity), mpmath digits.
+_LIMIT_STEPS = (4, 8, 12, 16)
+_LIMIT_DPS = 50
+
+
+# ---------- Cache ----------
+class ExprCache:
+    """LRU of parse and lambdify results (None included) shared by every
+    thread of the process; each process-pool worker has its own."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: object = None) -> object:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: object) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], object]) -> object:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+_MISSING = object()
+expr_cache = ExprCache(settings.sympy_cache_size)
+
+
+def compiled(
+    exprs: Union[sp.Expr, Tuple[sp.Expr, ...]],
+    symbols: Tuple[sp.Symbol, ...],
+    module: str = "numpy",
+) -> Callable:
+    """`sp.lambdify(symbols, exprs, module)`, memoised in `expr_cache`."""
+    return expr_cache.get_or_build(
+        ("fn", exprs, symbols, module),
+        lambda: sp.lambdify(symbols, exprs, modules=module),
+    )
+
+
+@dataclass(frozen=True)
+class Problem:
+    """What a question asks for, in a form `check` can compare answers with.
+
+    Only SymPy objects are stored, so a Problem pickles to process-pool
+    workers; `numeric` fetches the lambdified callables from the worker's
+    own cache."""
+
+    kind: str  # equation | system | value | expression | derivative | integral | limit
+    exprs: Tuple[sp.Expr, ...]
+    symbols: Tuple[sp.Symbol, ...] = ()
+    # Equations: (lhs, rhs) per equation; `exprs` holds lhs - rhs.
+    sides: Tuple[Tuple[sp.Expr, sp.Expr], ...] = ()
+    # value/expression/derivative/indefinite integral: the function the
+    # answer (differentiated, for integrals) must equal.
+    expected: Optional[sp.Expr] = None
+    var: Optional[sp.Symbol] = None
+    point: Optional[sp.Expr] = None
+    bounds: Optional[Tuple[sp.Expr, sp.Expr]] = None
+    # expression: what the question asks to do (simplify | factor | expand |
+    # reduce) and, to simplify, the operation count of the expression as written.
+    form: Optional[str] = None
+    ops: int = 0
+
+    def numeric(self, module: str = "numpy") -> Callable:
+        """`expected` (or the equation residuals) as a function of `symbols`."""
+        target = self.expected if self.expected is not None else self.exprs
+        return compiled(target, self.symbols, module)
+
+
+def _symbols(*exprs: sp.Expr) -> Tuple[sp.Symbol, ...]:
+    return tuple(sorted(set().union(*(e.free_symbols for e in exprs)), key=str))
+
+
+# ---------- Parsing ----------
+def _parse(text: str) -> Optional[sp.Expr]:
+    """`_parse_text`, memoised: model answers repeat across attempts and users."""
+    return expr_cache.get_or_build(("expr", text), lambda: _parse_text(text))
+
+
+def _parse_text(text: str, evaluate: bool = True) -> Optional[sp.Expr]:
+    """Like fastpath's parser, plus e/oo/inverse and hyperbolic functions;
+    `evaluate=False` keeps the expression as written (2x + 3x stays a sum)."""
+    s = text.translate(_UNICODE).strip().rstrip(".?").strip()
+    if not s or len(s) > _MAX_EXPR_LEN or not SAFE_EXPR_RE.fullmatch(s) or "=" in s:
+        return None
+    if _HUGE_POWER_RE.search(s):
+        return None
+    local: Dict[str, object] = {}
+    for w in WORD_RE.findall(s):
+        if w in _FUNCTIONS:
+            local[w] = _FUNCTIONS[w]
+        elif len(w) == 1:
+            local[w] = sp.Symbol(w)
+        else:
+            return None
+    try:
+        expr = parse_expr(
+            s,
+            local_dict=local,
+            global_dict=PARSE_GLOBALS,
+            transformations=TRANSFORMS,
+            evaluate=evaluate,
+        )
+    except Exception:
+        return None
+    if not isinstance(expr, sp.Expr):
+        return None
+    if evaluate and expr.has(sp.Float):
+        expr = sp.nsimplify(expr, rational=True)
+    return expr
+
+
+def _variable(expr: sp.Expr, named: Optional[str]) -> Optional[sp.Symbol]:
+    if named:
+        return sp.Symbol(named)
+    symbols = sorted(expr.free_symbols, key=str)
+    if len(symbols) == 1:
+        return symbols[0]
+    x = sp.Symbol("x")
+    return x if x in expr.free_symbols else None
+
+
+def _equation(text: str) -> Optional[Tuple[sp.Expr, sp.Expr]]:
+    if text.count("=") != 1:
+        return None
+    lhs, rhs = (_parse(side) for side in text.split("=", 1))
+    if lhs is None or rhs is None:
+        return None
+    return lhs, rhs
+
+
+def problem_key(question: str) -> Tuple[str, str]:
+    """`expr_cache` key of a question: whitespace and trailing punctuation do not count."""
+    return ("problem", " ".join(question.translate(_UNICODE).split()).rstrip(".?"))
+
+
+def parse_problem(question: str) -> Optional[Problem]:
+    """The checkable form of `question`, or None if there is none."""
+    key = problem_key(question)
+    return expr_cache.get_or_build(key, lambda: _build_problem(key[1]))
+
+
+def _build_problem(q: str) -> Optional[Problem]:
+    if not q:
+        return None
+
+    if "=" in q:
+        body = _SOLVE_PREFIX_RE.sub("", q)
+        parts = [p for p in _SYSTEM_SPLIT_RE.split(body) if p]
+        equations = [_equation(p) for p in parts]
+        if not equations or any(e is None for e in equations):
+            return None
+        exprs = tuple(lhs - rhs for lhs, rhs in equations)
+        common = dict(exprs=exprs, symbols=_symbols(*exprs), sides=tuple(equations))
+        if len(exprs) == 1:
+            var = _variable(exprs[0], None)
+            return Problem("equation", var=var, **common) if var is not None else None
+        return Problem("system", **common)
+
+    if _ARITHMETIC_RE.fullmatch(q):
+        expr = _parse(q)
+        if expr is None:
+            return None
+        return Problem("value", (expr,), expected=expr)
+
+    m = _SIMPLIFY_RE.match(q)
+    if m:
+        expr = _parse(m.group(2))
+        if expr is None:
+            return None
+        written = _parse_text(m.group(2), evaluate=False)
+        return Problem(
+            "expression",
+            (expr,),
+            _symbols(expr),
+            expected=expr,
+            form=m.group(1).lower(),
+            ops=sp.count_ops(written if written is not None else expr),
+        )
+
+    m = _DERIVATIVE_RE.match(q)
+    if m:
+        expr = _parse(m.group(2))
+        if expr is None:
+            return None
+        var = _variable(expr, m.group(1) or m.group(3))
+        if var is None:
+            return None
+        derivative = sp.diff(expr, var)
+        return Problem(
+            "derivative",
+            (expr,),
+            _symbols(expr, var),
+            expected=derivative,
+            var=var,
+        )
+
+    m = _INTEGRAL_RE.match(q)
+    if m:
+        body, bounds = m.group(1), None
+        b = _BOUNDS_RE.search(body)
+        if b:
+            lo, hi = _parse(b.group(1)), _parse(b.group(2))
+            if lo is None or hi is None:
+                return None
+            body, bounds = body[: b.start()], (lo, hi)
+        d = _DIFFERENTIAL_RE.search(body)
+        named = d.group(1) if d else None
+        expr = _parse(body[: d.start()] if d else body)
+        if expr is None:
+            return None
+        var = _variable(expr, named)
+        if var is None:
+            return None
+        return Problem(
+            "integral",
+            (expr,),
+            _symbols(expr, var),
+            expected=expr if bounds is None else None,
+            var=var,
+            bounds=bounds,
+        )
+
+    m = _LIMIT_RE.match(q)
+    if m:
+        expr, point = _parse(m.group(1)), _parse(m.group(3))
+        if expr is None or point is None or point.free_symbols:
+            return None
+        var = sp.Symbol(m.group(2))
+        return Problem("limit", (expr,), (var,), var=var, point=point)
+    return None
+
+
+def _answer_expr(answer: str) -> Optional[sp.Expr]:
+    """The value of an answer like "f'(x) = 2x + C": the part after the last '='."""
+    s = answer.translate(_UNICODE).strip().rstrip(".")
+    s = s.rsplit("=", 1)[-1]
+    return _parse(_CONSTANT_RE.sub("", s))
+
+
+def _answer_values(answer: str, names: Sequence[str]) -> List[Dict[str, sp.Expr]]:
+    """Assignments in "x = 1, y = 2" / "x = 2 or x = 3" / "2, 3" / "(1, 2)" answers."""
+    s = answer.translate(_UNICODE).strip().rstrip(".")
+    pairs = _ASSIGNMENT_RE.findall(s)
+    if pairs:
+        if len(names) == 1:
+            values = [_parse(v) for n, v in pairs if n == names[0]]
+            return [{names[0]: v} for v in values] if None not in values else []
+        assignment = {n: _parse(v) for n, v in pairs}
+        if None in assignment.values() or set(assignment) != set(names):
+            return []
+        return [assignment]
+    values = [_parse(v) for v in s.strip("(){}[] ").split(",")]
+    if None in values:
+        return []
+    if len(names) == 1:
+        return [{names[0]: v} for v in values]
+    return [dict(zip(names, values))] if len(values) == len(names) else []
+
+
+# ---------- Symbolic tie-breaker ----------
+class _OutOfTime(Exception):
+    pass
+
+
+@contextmanager
+def _alarm(seconds: float):
+    """Interrupt after `seconds` where SIGALRM is usable: the main thread, which
+    is where process-pool workers run. Elsewhere the caller's deadline checks
+    between steps are the only limit."""
+    usable = (
+        seconds > 0
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if not usable:
+        yield
+        return
+
+    def _raise(signum, frame):
+        raise _OutOfTime()
+
+    previous = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _symbolic_zero(expr: sp.Expr) -> Optional[bool]:
+    """True if cheap-to-expensive rewrites reduce `expr` to 0 within the budget."""
+    budget = settings.verify_symbolic_budget_seconds
+    if budget <= 0:
+        return None
+    deadline = time.monotonic() + budget
+    try:
+        with _alarm(budget):
+            for step in (sp.expand, sp.cancel, sp.trigsimp, sp.simplify):
+                if time.monotonic() > deadline:
+                    return None
+                if step(expr) == 0:
+                    return True
+    except _OutOfTime:
+        pass
+    return None
+
+
+# ---------- Numeric comparison ----------
+def _samples(n: int, dims: int) -> np.ndarray:
+    rng = np.random.default_rng(n * 31 + dims)
+    points = rng.uniform(_SAMPLE_LOW, _SAMPLE_HIGH, size=(n, dims))
+    points[1::2] *= -1
+    return points
+
+
+def _close(a, b, rtol: float = _RTOL) -> bool:
+    return abs(a - b) <= _ATOL + rtol * abs(b)
+
+
+def _equivalent(f: sp.Expr, g: sp.Expr) -> Optional[bool]:
+    """Whether `f` and `g` are the same function, judged on random points."""
+    if f.has(sp.oo, -sp.oo, sp.zoo, sp.nan) or g.has(sp.oo, -sp.oo, sp.zoo, sp.nan):
+        return None
+    symbols = _symbols(f, g)
+    if not symbols:
+        a, b = complex(sp.N(f, 30)), complex(sp.N(g, 30))
+        return _close(a, b)
+    n = settings.verify_samples
+    try:
+        points = _samples(n, len(symbols)).T
+        with np.errstate(all="ignore"):
+            fv = compiled(f, symbols)(*points)
+            gv = compiled(g, symbols)(*points)
+        fv = np.broadcast_to(np.asarray(fv, dtype=complex), (n,))
+        gv = np.broadcast_to(np.asarray(gv, dtype=complex), (n,))
+    except Exception:
+        return _symbolic_zero(f - g)
+    valid = np.isfinite(fv) & np.isfinite(gv)
+    valid &= (np.abs(fv.imag) < _ATOL) & (np.abs(gv.imag) < _ATOL)
+    if valid.sum() >= _MIN_VALID:
+        agree = np.isclose(fv[valid], gv[valid], rtol=_RTOL, atol=_ATOL)
+        if agree.all():
+            return True
+        if 1 - agree.mean() > _REFUTE_FRACTION:
+            return False
+    # Too few usable points, or a few outliers (poles, cancellation): ask SymPy.
+    return _symbolic_zero(f - g)
+
+
+def _mp(value: sp.Expr):
+    if value in (sp.oo, -sp.oo):
+        return mpmath.inf if value == sp.oo else -mpmath.inf
+    return mpmath.mpf(str(sp.N(value, mpmath.mp.dps)))
+
+
+def _satisfies(p: Problem, values: Dict[str, sp.Expr]) -> Optional[bool]:
+    """Whether `values` make every residual of `p` vanish, in 30-digit arithmetic."""
+    if set(values) != {str(s) for s in p.symbols}:
+        return None
+    with mpmath.workdps(30):
+        try:
+            args = [_mp(values[str(s)]) for s in p.symbols]
+            residuals = p.numeric("mpmath")(*args)
+        except (TypeError, ValueError, ZeroDivisionError):
+            return None
+        scale = max(1.0, *(abs(a) for a in args))
+        out = []
+        for r in residuals:
+            if not mpmath.isfinite(r):
+                return None
+            out.append(abs(r) <= 1e-10 * scale)
+    return all(out)
+
+
+def _limit(p: Problem, target: sp.Expr) -> Optional[bool]:
+    with mpmath.workdps(_LIMIT_DPS):
+        fn = compiled(p.exprs[0], p.symbols, "mpmath")
+        if p.point in (sp.oo, -sp.oo):
+            sign = 1 if p.point == sp.oo else -1
+            sides = [[sign * mpmath.mpf(10) ** k for k in _LIMIT_STEPS]]
+        else:
+            a = _mp(p.point)
+            hs = [mpmath.mpf(10) ** -k for k in _LIMIT_STEPS]
+            sides = [[a + h for h in hs], [a - h for h in hs]]
+        try:
+            runs = [[complex(fn(x)) for x in side] for side in sides]
+        except (ValueError, ZeroDivisionError, OverflowError, TypeError):
+            return None
+    # A side where the function is not real (sqrt(x) as x -> 0) says nothing.
+    runs = [r for r in runs if all(abs(v.imag) <= _ATOL for v in r)]
+    if not runs:
+        return None
+    if target in (sp.oo, -sp.oo):
+        sign = 1 if target == sp.oo else -1
+        if all(sign * values[-1].real >= 1e6 for values in runs):
+            return True
+        return None
+    t = complex(sp.N(target, 30))
+    verdicts = []
+    for values in runs:
+        errors = [abs(v - t) for v in values]
+        if errors[-1] <= 1e-6 * (1 + abs(t)) and errors[-1] <= errors[0]:
+            verdicts.append(True)
+        elif abs(values[-1] - values[-2]) <= 1e-6 * (1 + abs(values[-1])):
+            # Converged, to something else.
+            verdicts.append(errors[-1] <= 1e-3 * (1 + abs(t)))
+        else:
+            verdicts.append(None)
+    if all(v is True for v in verdicts):
+        return True
+    if any(v is False for v in verdicts):
+        return False
+    return None
+
+
+def _integral(p: Problem, answer: sp.Expr) -> Optional[bool]:
+    if p.bounds is None:
+        return _equivalent(sp.diff(answer, p.var), p.expected)
+    if answer.free_symbols:
+        return False
+    with mpmath.workdps(30):
+        try:
+            lo, hi = (_mp(b) for b in p.bounds)
+            fn = compiled(p.exprs[0], (p.var,), "mpmath")
+            value = complex(mpmath.quad(fn, [lo, hi]))
+        except (ValueError, ZeroDivisionError, TypeError):
+            return None
+    if not np.isfinite(value):
+        return None
+    return _close(complex(sp.N(answer, 30)), value, rtol=1e-8)
+
+
+def _in_form(p: Problem, answer: sp.Expr) -> bool:
+    """Whether `answer` is in the form the question asks for. Restating the
+    question is equivalent to it, but no answer to "factor" or "expand"."""
+    if p.form == "factor":
+        return answer.is_Mul or (
+            answer.is_Pow
+            and answer.exp.is_Integer
+            and answer.exp > 1
+            and not answer.base.is_number
+        )
+    if p.form == "expand":
+        expanded = sp.expand(answer, power_exp=False, power_base=False, log=False)
+        return expanded == answer
+    if p.form in ("simplify", "reduce"):
+        return sp.count_ops(answer) < p.ops
+    return True
+
+
+def check(question: Union[str, Problem], answer: str) -> Optional[bool]:
+    """True/False if `answer` is right/wrong for `question` (text, or its
+    parsed `Problem`); None if undecided."""
+    p = parse_problem(question) if isinstance(question, str) else question
+    if p is None:
+        return None
+    try:
+        if p.kind in ("equation", "system"):
+            names = [str(s) for s in p.symbols]
+            assignments = _answer_values(answer, names)
+            if not assignments:
+                return None
+            verdicts = [_satisfies(p, a) for a in assignments]
+            if any(v is None for v in verdicts):
+                return None
+            return all(verdicts)
+
+        target = _answer_expr(answer)
+        if target is None:
+            return None
+        if p.kind == "expression" and not _in_form(p, target):
+            return None
+        if p.kind in ("value", "expression", "derivative"):
+            return _equivalent(target, p.expected)
+        if p.kind == "integral":
+            return _integral(p, target)
+        if p.kind == "limit":
+            return _limit(p, target)
+    except Exception:
+        return None
+    return None
@@ -0,0 +1,49 @@
+"""
+The SymPy parsing setup shared by the fast path, the numeric checker and the
+solution cache.
+
+`parse_expr` eval()s its input. Callers first hold the text to
+`SAFE_EXPR_RE` and map each word (`WORD_RE`) to one of `FUNCTIONS` or a
+single-letter Symbol, then parse with `PARSE_GLOBALS` in place of SymPy's
+default namespace and builtins.
+"""
+
+import re
+from typing import Dict
+
+import sympy as sp
+from sympy.parsing.sympy_parser import (
+    standard_transformations,
+    implicit_multiplication,
+    implicit_application,
+    convert_xor,
+)
+
+SAFE_EXPR_RE = re.compile(r"[0-9A-Za-z\s\.\+\-\*/\^\(\)=]+")
+WORD_RE = re.compile(r"[A-Za-z]+")
+FUNCTIONS = {
+    "sqrt": sp.sqrt,
+    "sin": sp.sin,
+    "cos": sp.cos,
+    "tan": sp.tan,
+    "log": sp.log,
+    "ln": sp.log,
+    "exp": sp.exp,
+    "pi": sp.pi,
+}
+# The node types parse_expr's transformations build, plus FUNCTIONS. Any
+# other name becomes a Symbol or an undefined Function.
+PARSE_GLOBALS: Dict[str, object] = {
+    "__builtins__": {},
+    **{
+        name: getattr(sp, name)
+        for name in ("Symbol", "Function", "Integer", "Float", "Rational")
+        + ("Add", "Mul", "Pow")
+    },
+    **FUNCTIONS,
+}
+TRANSFORMS = standard_transformations + (
+    implicit_multiplication,
+    implicit_application,
+    convert_xor,
+)
@@ -0,0 +1,130 @@
+"""
+Pick the model `solve_llm` starts with, before any provider call.
+
+The predictor estimates how likely a base-model answer is to end up escalated
+to the strong model anyway, from the task type (`_guess_task`), a coarse
+expression-size bucket and the escalations observed so far for that pair.
+Each (task, size) pair starts from a prior and moves toward its observed rate
+as samples come in. When the estimate reaches PREROUTE_THRESHOLD the base call
+is skipped and the strong model answers directly. A PREROUTE_EXPLORE fraction
+of those requests still starts on the base model, so the history keeps
+tracking how the base model does.
+"""
+
+import random
+import re
+import threading
+from typing import Dict, Tuple
+
+from core.config import settings
+
+# Prior probability that the base model's answer gets escalated, per task.
+_TASK_PRIORS: Dict[str, float] = {
+    "solve_equation": 0.3,
+    "simplify": 0.3,
+    "evaluate": 0.2,
+    "differentiate": 0.4,
+    "integrate": 0.7,
+    "limit": 0.6,
+    "matrix_op": 0.4,
+    "lin_alg": 0.5,
+    "number_theory": 0.5,
+    "coord_geometry": 0.5,
+    "word_problem": 0.75,
+    "unknown": 0.5,
+}
+_SIZE_BUMP = {"small": 0.0, "medium": 0.05, "large": 0.15}
+_PRIOR_WEIGHT = 10.0  # pseudo-observations behind each prior
+
+_OPERATOR_RE = re.compile(
+    r"[\+\-\*/\^=]|\\?\b(?:sin|cos|tan|log|ln|exp|sqrt|int|lim|sum|frac)\b"
+)
+
+
+def expression_size(text: str) -> str:
+    """'small', 'medium' or 'large' by operator/function count and length."""
+    ops = len(_OPERATOR_RE.findall(text or "")) + len(text or "") // 80
+    if ops <= 4:
+        return "small"
+    if ops <= 12:
+        return "medium"
+    return "large"
+
+
+class PreRouter:
+    """Escalation predictor and per-(task, size) decision counters."""
+
+    def __init__(self, threshold: float, explore: float, seed: int | None = None):
+        self.threshold = threshold
+        self.explore = explore
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # (task, size) -> [base-first samples, escalated, base decisions, strong decisions]
+        self._table: Dict[Tuple[str, str], list] = {}
+        self.explored = 0
+
+    def _row(self, key: Tuple[str, str]) -> list:
+        row = self._table.get(key)
+        if row is None:
+            row = self._table[key] = [0, 0, 0, 0]
+        return row
+
+    def _prior(self, task: str, size: str) -> float:
+        return min(0.95, _TASK_PRIORS.get(task, 0.5) + _SIZE_BUMP[size])
+
+    def predict(self, task: str, size: str) -> float:
+        """Estimated probability that a base-first solve escalates."""
+        samples, escalated = self._table.get((task, size), (0, 0))[:2]
+        prior = self._prior(task, size)
+        return (escalated + prior * _PRIOR_WEIGHT) / (samples + _PRIOR_WEIGHT)
+
+    def decide(self, task: str, text: str) -> Tuple[str, float, str]:
+        """Return ("base" | "strong", predicted escalation probability, size)."""
+        size = expression_size(text)
+        with self._lock:
+            p = self.predict(task, size)
+            start = "strong" if p >= self.threshold else "base"
+            if start == "strong" and self._rng.random() < self.explore:
+                start = "base"
+                self.explored += 1
+            self._row((task, size))[2 if start == "base" else 3] += 1
+        return start, p, size
+
+    def record(self, task: str, size: str, escalated: bool) -> None:
+        """Feed back the outcome of a base-first solve."""
+        with self._lock:
+            row = self._row((task, size))
+            row[0] += 1
+            row[1] += int(escalated)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            table = {
+                f"{task}/{size}": {
+                    "samples": row[0],
+                    "escalated": row[1],
+                    "p_escalate": round(self.predict(task, size), 3),
+                    "base_first": row[2],
+                    "strong_first": row[3],
+                }
+                for (task, size), row in sorted(self._table.items())
+            }
+            base_first = sum(row[2] for row in self._table.values())
+            strong_first = sum(row[3] for row in self._table.values())
+        decisions = base_first + strong_first
+        return {
+            "threshold": self.threshold,
+            "decisions": decisions,
+            "base_first": base_first,
+            "strong_first": strong_first,
+            "explored": self.explored,
+            "strong_first_fraction": (strong_first / decisions) if decisions else 0.0,
+            "by_task": table,
+        }
+
+
+prerouter = (
+    PreRouter(settings.preroute_threshold, settings.preroute_explore)
+    if settings.preroute_enabled
+    else None
+)
@@ -0,0 +1,55 @@
+import time
+from typing import Optional
+
+import structlog
+
+from core.config import settings
+from core.executor import ExecutorBusy, cpu_pool
+from core.metrics import VERIFY_SECONDS, record_span
+from reasoner.numcheck import Problem, check, expr_cache, parse_problem, problem_key
+
+log = structlog.get_logger(__name__)
+
+_UNPARSED = object()
+
+
+async def parse_question(question: str) -> Optional[Problem]:
+    """The question's `Problem` (None if answers to it cannot be checked).
+
+    Parsing runs on the CPU pool, since SymPy evaluates while it parses and
+    "9^9^9^9" would stall the event loop; the result is kept in this
+    process's `expr_cache`, so a repeated question is not parsed again."""
+    key = problem_key(question)
+    problem = expr_cache.get(key, _UNPARSED)
+    if problem is _UNPARSED:
+        try:
+            problem = await cpu_pool.run(
+                parse_problem, question, timeout=settings.verify_timeout_seconds
+            )
+        except (TimeoutError, ExecutorBusy) as e:
+            log.warning("verify.parse_skipped", reason=type(e).__name__)
+            return None
+        expr_cache.put(key, problem)
+    return problem
+
+
+async def verify_answer(problem: Problem, final_answer: str) -> Optional[bool]:
+    """`numcheck.check` on the CPU pool: True verified, False refuted, None
+    undecided. A check the pool timed out or turned away is undecided too:
+    an answer nobody checked is not refuted."""
+    t0 = time.perf_counter()
+    try:
+        ok = await cpu_pool.run(
+            check,
+            problem,
+            final_answer,
+            timeout=settings.verify_timeout_seconds,
+        )
+        outcome = {True: "verified", False: "rejected", None: "inconclusive"}[ok]
+    except (TimeoutError, ExecutorBusy) as e:
+        log.warning("verify.skipped", reason=type(e).__name__)
+        ok, outcome = None, "timeout" if isinstance(e, TimeoutError) else "busy"
+    elapsed = time.perf_counter() - t0
+    VERIFY_SECONDS.observe(elapsed, outcome=outcome)
+    record_span("verify", elapsed, outcome=outcome)
+    return ok
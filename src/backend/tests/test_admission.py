@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from core import admission
+from core.admission import LLMLimits, Limiter, Overloaded, TokenBucket, UserQuota
+
+
+def _limiter(concurrency=1, rate=0.0, burst=1.0, max_waiting=4, timeout=1.0):
+    return Limiter("model", "m", concurrency, rate, burst, max_waiting, timeout)
+
+
+def _reason(e: pytest.ExceptionInfo) -> str:
+    return e.value.detail.rsplit("(", 1)[-1].rstrip(")")
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert bucket.try_take() is None
+    assert bucket.reserve() == 0.0
+    assert bucket.try_take() == pytest.approx(1.0, abs=0.01)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+    bucket.cancel()
+    assert bucket.tokens == pytest.approx(0.0, abs=0.01)
+
+
+def test_queue_full():
+    async def main():
+        limiter = _limiter(max_waiting=0)
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as e:
+                async with limiter.slot():
+                    pass
+        assert _reason(e) == "queue_full"
+        assert limiter.stats()["rejected"] == 1
+
+    asyncio.run(main())
+
+
+def test_rate_rejection_returns_the_token():
+    async def main():
+        limiter = _limiter(rate=1.0, burst=1, timeout=0.5)
+        async with limiter.slot():
+            pass
+        with pytest.raises(Overloaded) as e:
+            async with limiter.slot():
+                pass
+        assert _reason(e) == "rate"
+        assert e.value.retry_after == 1
+        assert limiter._bucket.tokens == pytest.approx(0.0, abs=0.01)
+
+    asyncio.run(main())
+
+
+def test_timeout_waiting_for_a_slot():
+    async def main():
+        limiter = _limiter(timeout=0.05)
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as e:
+                async with limiter.slot():
+                    pass
+        assert _reason(e) == "timeout"
+        assert limiter.stats()["waiting"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancel_while_paced_returns_the_token():
+    async def main():
+        limiter = _limiter(rate=10.0, burst=1, timeout=5)
+        async with limiter.slot():
+            pass
+
+        async def paced():
+            async with limiter.slot():
+                pass
+
+        task = asyncio.create_task(paced())
+        await asyncio.sleep(0.01)  # inside the 0.1 s pacing sleep
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter._bucket.tokens > -0.5
+        assert limiter.stats()["waiting"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancel_releases_the_slot():
+    async def main():
+        limiter = _limiter()
+        entered = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot():
+                entered.set()
+                await asyncio.sleep(10)
+
+        async def waiter():
+            async with limiter.slot():
+                pass
+
+        held = asyncio.create_task(holder())
+        await entered.wait()
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 1
+        waiting.cancel()
+        held.cancel()
+        await asyncio.gather(held, waiting, return_exceptions=True)
+        assert (limiter.active, limiter.waiting) == (0, 0)
+        async with limiter.slot():  # the semaphore was given back
+            assert limiter.active == 1
+
+    asyncio.run(main())
+
+
+def test_llm_limits_take_model_then_provider(monkeypatch):
+    monkeypatch.setattr(
+        admission.settings,
+        "llm_limits_json",
+        '{"m": {"concurrency": 1, "max_waiting": 0, "rate": 0}}',
+    )
+
+    async def main():
+        limits = LLMLimits()
+        async with limits.slot("p", "m"):
+            assert limits.stats()["active"] == 1
+            with pytest.raises(Overloaded):
+                async with limits.slot("p", "m"):
+                    pass
+            async with limits.slot("p", "other"):
+                assert limits.stats()["active"] == 2
+        assert limits.stats()["active"] == 0
+        assert limits.stats()["rejected"] == 1
+
+    asyncio.run(main())
+
+
+def test_user_quota():
+    quota = UserQuota(max_concurrent=2, rate_per_minute=60, burst=3)
+    quota.acquire("u")
+    quota.acquire("u")
+    with pytest.raises(Overloaded, match="concurrent"):
+        quota.acquire("u")
+    quota.acquire("other")  # quotas are per user
+    quota.release("u")
+    quota.acquire("u")  # third token of the burst
+    quota.release("u")
+    with pytest.raises(Overloaded, match="rate"):
+        quota.acquire("u")
+    quota.release("u")
+    quota.release("other")
+    assert quota.stats() == {"users_active": 0, "in_flight": 0, "rejected": 2}
@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from api.routers import solve
+from benchmarks.corpus import ANSWERS
+from benchmarks.fakes import fake_llm
+from core.schemas import BatchSolveRequest, SolveResponse, Step
+from reasoner import batch
+
+FACTOR, EXPAND = "Factor x^2 + 5x + 6", "Expand (x + 2)^3"
+DIFF = "Differentiate x^3 sin(x)"  # answered, but treated as not checkable here
+
+
+@pytest.fixture(autouse=True)
+def _quick_verify(monkeypatch):
+    """Check packed answers against the corpus instead of on the CPU pool."""
+
+    async def parse_question(question):
+        return question if question in (FACTOR, EXPAND) else None
+
+    async def verify_answer(problem, answer):
+        return answer == ANSWERS[problem]
+
+    monkeypatch.setattr(batch, "parse_question", parse_question)
+    monkeypatch.setattr(batch, "verify_answer", verify_answer)
+    monkeypatch.setattr(batch, "prerouter", None)
+
+
+def _llm(accuracy: float = 1.0, confidence: float = 0.9):
+    return fake_llm(
+        "fake-base",
+        median=0.001,
+        sigma=0.0,
+        accuracy=accuracy,
+        confidence=(confidence, confidence),
+    )
+
+
+def _packed(llm, questions):
+    return asyncio.run(batch.solve_packed(llm, questions))
+
+
+def test_packed_answers_that_verify_or_are_confident_are_accepted():
+    llm = _llm()
+    checked, unchecked = _packed(llm, [FACTOR, DIFF])
+    assert (checked["answer"], checked["verified"]) == (ANSWERS[FACTOR], True)
+    assert unchecked["verified"] is False and unchecked["confidence"] == 0.9
+    assert llm._model.calls == 1
+
+
+def test_unconfident_unchecked_answer_is_rejected():
+    checked, unchecked = _packed(_llm(confidence=0.3), [FACTOR, DIFF])
+    assert checked["verified"] and unchecked is None
+
+
+def test_wrong_answer_is_rejected_however_confident():
+    assert _packed(_llm(accuracy=0.0, confidence=1.0), [FACTOR, EXPAND]) == [
+        None,
+        None,
+    ]
+
+
+def _route(monkeypatch, llm=None, fail=()):
+    """Stub the single-question path; record what reached it."""
+    solved = []
+
+    async def solve_question(question, level, locale):
+        solved.append(question)
+        if question == "unreadable":
+            raise HTTPException(status_code=422, detail="no question")
+        if question in fail:
+            raise RuntimeError("boom")
+        return SolveResponse(
+            final_answer=f"answer to {question}",
+            steps=[Step(title="Solve", explanation="")],
+            verified=True,
+        )
+
+    monkeypatch.setattr(solve, "_solve_question", solve_question)
+    monkeypatch.setattr(solve, "solution_cache", None)
+    monkeypatch.setattr(solve, "models", SimpleNamespace(text_default=lambda: llm))
+    return solved
+
+
+def _batch(questions, pack=True):
+    req = BatchSolveRequest(items=[{"question": q} for q in questions], pack=pack)
+    return asyncio.run(solve.solve_batch(req, uid="u")).results
+
+
+def test_duplicates_are_solved_once_and_fanned_out(monkeypatch):
+    solved = _route(monkeypatch)
+    results = _batch(["2x + 3 = 11", "  2x + 3 = 11", "x + 1 = 2"], pack=False)
+    assert sorted(solved) == ["2x + 3 = 11", "x + 1 = 2"]
+    assert [r.index for r in results] == [0, 1, 2]
+    assert results[0].result == results[1].result
+    assert results[2].result.final_answer == "answer to x + 1 = 2"
+
+
+def test_errors_stay_with_their_item(monkeypatch):
+    _route(monkeypatch, fail=("x + 1 = 2",))
+    results = _batch(["unreadable", "x + 1 = 2", "2x + 3 = 11"], pack=False)
+    assert [(r.status, r.error) for r in results] == [
+        (422, "no question"),
+        (500, "internal error"),
+        (200, None),
+    ]
+
+
+def test_packed_group_shares_one_call_and_rejects_fall_back(monkeypatch):
+    llm = _llm(confidence=0.3)
+    solved = _route(monkeypatch, llm=llm)
+    results = _batch([FACTOR, EXPAND, DIFF, "2x + 3 = 11"])
+    assert llm._model.calls == 1
+    # DIFF's packed answer is neither checkable nor confident; the equation
+    # is left to the fast path.
+    assert sorted(solved) == ["2x + 3 = 11", DIFF]
+    assert results[0].result.final_answer == ANSWERS[FACTOR]
+    assert results[1].result.verified
+    assert all(r.status == 200 for r in results)
+
+
+def test_oversize_batch_is_413(monkeypatch):
+    solved = _route(monkeypatch)
+    monkeypatch.setattr(solve.settings, "batch_max_items", 2)
+    with pytest.raises(HTTPException) as e:
+        _batch(["a", "b", "c"])
+    assert e.value.status_code == 413
+    assert solved == []
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeChat
+from providers.model_factory import LLM
+from reasoner import graph
+from reasoner.numcheck import parse_problem
+
+QUESTION = "2x + 3 = 11"  # benchmarks.corpus, answer "x = 4"
+PROBLEM = parse_problem(QUESTION)
+
+
+class _Chat(FakeChat):
+    """FakeChat that counts cancelled calls and can fail every call."""
+
+    def __init__(self, name: str, fail: bool = False, **kwargs) -> None:
+        super().__init__(name, sigma=0.0, confidence=(0.9, 0.9), **kwargs)
+        self.fail = fail
+        self.cancelled = 0
+
+    async def _reply(self, messages, structured: bool):
+        try:
+            reply = await super()._reply(messages, structured)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return reply
+
+
+def _llm(name: str, median: float, accuracy: float = 1.0, fail: bool = False) -> LLM:
+    return LLM(
+        name, "fake", model=_Chat(name, median=median, accuracy=accuracy, fail=fail)
+    )
+
+
+@pytest.fixture(autouse=True)
+def _quick_verify(monkeypatch):
+    """Check answers in-process instead of on the CPU pool."""
+
+    async def verify_answer(problem, answer):
+        return answer == "x = 4"
+
+    monkeypatch.setattr(graph, "verify_answer", verify_answer)
+    monkeypatch.setattr(graph, "_base_latency", {})
+    monkeypatch.setattr(graph.settings, "solve_hedge_default_seconds", 0.05)
+
+
+def test_hedge_strong_wins_and_slow_base_is_cancelled():
+    base, strong = _llm("base", median=1.0), _llm("strong", median=0.01)
+    res = asyncio.run(graph._escalate_hedge(QUESTION, PROBLEM, base, strong))
+    assert res["purpose"] == "strong" and res["verified"]
+    assert base._model.cancelled == 1
+
+
+def test_hedge_fast_base_does_not_start_strong():
+    base, strong = _llm("base", median=0.001), _llm("strong", median=0.001)
+    res = asyncio.run(graph._escalate_hedge(QUESTION, PROBLEM, base, strong))
+    assert res["purpose"] == "base" and res["verified"]
+    assert strong._model.calls == 0
+
+
+def test_hedge_falls_back_to_base_when_strong_fails():
+    base = _llm("base", median=0.2)
+    strong = _llm("strong", median=0.01, fail=True)
+    res = asyncio.run(graph._escalate_hedge(QUESTION, PROBLEM, base, strong))
+    assert res["purpose"] == "base" and res["final_answer"] == "x = 4"
+
+
+def test_race_first_verified_wins_and_critique_is_cancelled():
+    base = _llm("base", median=0.2, accuracy=0.0)
+    strong = _llm("strong", median=0.01)
+    res = asyncio.run(graph._escalate_race(QUESTION, PROBLEM, base, strong))
+    assert res["purpose"] == "strong" and res["verified"]
+    assert base._model.calls == 2 and base._model.cancelled == 1
+
+
+def test_race_without_a_verified_answer_keeps_the_strong_one():
+    base = _llm("base", median=0.01, accuracy=0.0)
+    strong = _llm("strong", median=0.05, accuracy=0.0)
+    res = asyncio.run(graph._escalate_race(QUESTION, PROBLEM, base, strong))
+    assert res["purpose"] == "strong" and not res["verified"]
+    assert base._model.cancelled == strong._model.cancelled == 0
+
+
+def test_first_accepted_raises_when_every_attempt_fails():
+    async def attempt(delay: float):
+        await asyncio.sleep(delay)
+        raise RuntimeError(f"failed after {delay}")
+
+    async def main():
+        tasks = [asyncio.create_task(attempt(d)) for d in (0.01, 0.02)]
+        return await graph._first_accepted(tasks, lambda r: True)
+
+    with pytest.raises(RuntimeError, match="after 0.01"):
+        asyncio.run(main())
+
+
+def test_finalize_keeps_the_model_that_answered():
+    base = _llm("base", median=0.001)
+    strong_model = {"provider": "fake", "name": "strong"}
+    assert asyncio.run(graph.finalize({"model": strong_model}, base)) == {}
+    assert asyncio.run(graph.finalize({}, base)) == {
+        "model": {"provider": "fake", "name": "base"}
+    }
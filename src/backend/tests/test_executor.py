@@ -0,0 +1,89 @@
+import asyncio
+import operator
+import time
+
+import pytest
+
+from core.executor import CPUExecutor, ExecutorBusy, _Worker
+
+# Workers import what they run, so the tasks are stdlib callables.
+
+
+def _run(main):
+    async def wrapper():
+        pool = CPUExecutor("test", max_workers=1, max_queue=0)
+        try:
+            await pool.warm()
+            await main(pool)
+        finally:
+            await pool.shutdown()
+
+    asyncio.run(wrapper())
+
+
+async def _replaced(pool: CPUExecutor, pid: int) -> None:
+    """Wait for the one worker to be swapped for a live new one."""
+    for _ in range(200):
+        if pool.killed and pool._workers[0].process.pid != pid:
+            break
+        await asyncio.sleep(0.05)
+    assert pool.killed == 1
+    assert await pool.run(sum, [1, 2], timeout=30) == 3
+
+
+def test_exception_crosses_the_pipe():
+    async def main(pool):
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(operator.truediv, 1, 0)
+        assert await pool.run(operator.add, 2, 3) == 5
+        assert pool.stats()["failed"] == 1
+        assert pool.killed == 0
+
+    _run(main)
+
+
+def test_timeout_replaces_the_worker():
+    async def main(pool):
+        pid = pool._workers[0].process.pid
+        with pytest.raises(TimeoutError):
+            await pool.run(time.sleep, 10, timeout=0.2)
+        assert pool.stats()["timeouts"] == 1
+        await _replaced(pool, pid)
+
+    _run(main)
+
+
+def test_cancel_replaces_the_worker_without_blocking_the_loop(monkeypatch):
+    kill = _Worker.kill
+
+    def slow_kill(self):
+        time.sleep(0.3)  # a worker slow to exit: join() waits on it
+        kill(self)
+
+    monkeypatch.setattr(_Worker, "kill", slow_kill)
+
+    async def main(pool):
+        pid = pool._workers[0].process.pid
+        task = asyncio.create_task(pool.run(time.sleep, 10))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        t0 = time.perf_counter()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Killing, joining and respawning happen off the event loop.
+        assert time.perf_counter() - t0 < 0.05
+        await _replaced(pool, pid)
+
+    _run(main)
+
+
+def test_full_queue_is_busy():
+    async def main(pool):
+        task = asyncio.create_task(pool.run(time.sleep, 0.3))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorBusy):
+            await pool.run(operator.add, 1, 1)
+        await task
+        assert pool.stats()["rejected"] == 1
+
+    _run(main)
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fakes import FakeChat
+from core.streaming import EventSink, event_sink
+from providers import model_factory
+from providers.model_factory import LLM
+from providers.pool import HealthRegistry
+
+MESSAGES = [{"role": "user", "content": "2x + 3 = 11"}]
+
+
+class _Broken(FakeChat):
+    async def ainvoke(self, messages):
+        raise RuntimeError(f"{self.name} is down")
+
+
+@pytest.fixture(autouse=True)
+def _registry(monkeypatch):
+    registry = HealthRegistry(window=10, failures_to_open=3, cooldown=60)
+    monkeypatch.setattr(model_factory, "provider_health", registry)
+    monkeypatch.setattr(model_factory.settings, "llm_failover_timeout_seconds", 0.05)
+    return registry
+
+
+def _ask(primary: LLM):
+    async def main():
+        with event_sink(EventSink()) as sink:
+            text = await primary.ask(MESSAGES, purpose="base")
+        return text, [data for event, data in sink.drain() if event == "attempt"]
+
+    return asyncio.run(main())
+
+
+def _fallback() -> LLM:
+    return LLM("fallback", "fake", model=FakeChat("fallback", median=0.001))
+
+
+def test_slow_primary_fails_over_with_an_attempt_event(_registry):
+    primary = LLM(
+        "primary",
+        "fake",
+        model=FakeChat("primary", median=1.0, sigma=0.0),
+        fallbacks=[_fallback()],
+    )
+    text, attempts = _ask(primary)
+    assert json.loads(text)["final_answer"]
+    assert attempts == [
+        {"purpose": "base", "model": "primary"},
+        {
+            "purpose": "base",
+            "model": "fallback",
+            "failover_from": "primary",
+            "reason": "timeout",
+        },
+    ]
+    assert _registry.failovers == 1
+    assert _registry.get("fake", "primary").failures == 1
+
+
+def test_failing_primary_fails_over(_registry):
+    primary = LLM("primary", "fake", model=_Broken("primary"), fallbacks=[_fallback()])
+    _, attempts = _ask(primary)
+    assert [(a["model"], a.get("reason")) for a in attempts] == [
+        ("primary", None),
+        ("fallback", "error"),
+    ]
+
+
+def test_last_candidate_error_is_raised():
+    primary = LLM(
+        "primary",
+        "fake",
+        model=_Broken("primary"),
+        fallbacks=[LLM("other", "fake", model=_Broken("other"))],
+    )
+    with pytest.raises(RuntimeError, match="is down"):
+        _ask(primary)
@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+from reasoner.fastpath import solve_equation, solve_evaluate
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "x^4 - 4x^2 + x + 1 = 0",  # four real roots, none in closed real form
+        "x^4 - 3x^2 + x + 1 = 0",  # x = 1 plus three casus irreducibilis roots
+    ],
+)
+def test_incomplete_real_roots_fall_back(question):
+    assert solve_equation(question) is None
+
+
+def test_no_real_solution_only_when_none_exist():
+    out = solve_equation("x^4 + x^2 + 1 = 0")
+    assert out is not None
+    assert out["answer"] == "No real solution"
+
+
+def test_quartic_with_closed_form_roots():
+    out = solve_equation("x^4 - 5x^2 + 4 = 0")
+    assert out is not None
+    assert out["answer"] == "x = -2, x = -1, x = 1, x = 2"
+
+
+def test_evaluate_never_runs_the_text():
+    probe = "__import__('sys').modules.__setitem__('fastpath_probe', 1)"
+    assert solve_evaluate(probe) is None
+    assert "fastpath_probe" not in sys.modules
+
+
+def test_evaluate_shows_the_expression_as_written():
+    out = solve_evaluate("2^3 + sqrt(16)")
+    assert out["answer"] == "12"
+    assert out["work"][0]["explanation"] == "sqrt(16) + 2^3"  # not yet computed
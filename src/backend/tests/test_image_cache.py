@@ -0,0 +1,34 @@
+from reasoner.cache import ImageSolutionCache
+
+PH, DH = 0x0F0F_F0F0_1234_5678, 0x1111_2222_3333_4444
+NEAR_PH, NEAR_DH = PH ^ 0b11, DH ^ 0b1  # 2 and 1 bits apart
+
+
+def _cache() -> ImageSolutionCache:
+    cache = ImageSolutionCache(max_entries=8, ttl_seconds=60, max_distance=4)
+    cache.set(PH, DH, "a" * 64, "Solve 2x + 3 = 7", {"answer": "x = 2"})
+    return cache
+
+
+def test_exact_pixels_hit():
+    assert _cache().get(PH, DH, "a" * 64) == {"answer": "x = 2"}
+
+
+def test_look_alike_without_text_misses():
+    cache = _cache()
+    assert not cache.get(NEAR_PH, NEAR_DH, "b" * 64)
+    assert cache.has_near(NEAR_PH, NEAR_DH)
+
+
+def test_look_alike_with_other_text_misses():
+    cache = _cache()
+    assert cache.get(NEAR_PH, NEAR_DH, "b" * 64, "Solve 2x + 3 = 9") is None
+    assert cache.get(PH, DH, "c" * 64, "") is None
+    assert cache.stats()["rejected_near"] == 2
+
+
+def test_look_alike_with_same_text_hits():
+    cache = _cache()
+    hit = cache.get(NEAR_PH, NEAR_DH, "b" * 64, "solve 2x+3 =7 ")
+    assert hit == {"answer": "x = 2"}
+    assert cache.stats()["near_hits"] == 1
@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from utils.image_prep import _decode
+
+
+def _png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _text(mode: str, ink, clear) -> Image.Image:
+    img = Image.new(mode, (80, 40), clear)
+    ImageDraw.Draw(img).rectangle((10, 10, 70, 30), fill=ink)
+    return img
+
+
+def _palette() -> Image.Image:
+    img = _text("P", 1, 0)
+    img.putpalette([0, 0, 0] * 2)
+    img.info["transparency"] = 0
+    return img
+
+
+@pytest.mark.parametrize(
+    "img",
+    [
+        _text("RGBA", (0, 0, 0, 255), (0, 0, 0, 0)),
+        _text("LA", (0, 255), (0, 0)),
+        _palette(),
+    ],
+    ids=["RGBA", "LA", "P"],
+)
+def test_transparent_background_becomes_white(img):
+    px, size = _decode(_png(img))
+    assert size == (80, 40)
+    assert (px[0, 0] == 255).all()
+    assert (px[20, 40] == 0).all()
+
+
+def test_opaque_image_unchanged():
+    px, _ = _decode(_png(_text("RGB", (0, 0, 0), (200, 100, 50))))
+    assert px[0, 0].tolist() == [50, 100, 200]  # BGR
+    assert not np.any(px[20, 40])
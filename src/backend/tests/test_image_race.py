@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+from api.routers import solve
+from core.schemas import SolveResponse, Step
+from core.streaming import EventSink, emit, event_sink
+
+OCR = "2x + 3 = 11"
+
+
+def _race(monkeypatch, vision_seconds, text_seconds, vision_verified, text_verified):
+    async def solve_image_json(data, **kwargs):
+        emit("step", source="vision")
+        await asyncio.sleep(vision_seconds)
+        return {"steps": [{"title": "Look", "explanation": ""}], "final_answer": "4"}
+
+    async def solve_question(question, level, locale):
+        emit("step", source="text")
+        await asyncio.sleep(text_seconds)
+        return SolveResponse(
+            final_answer="x = 4",
+            steps=[Step(title="Solve", explanation="")],
+            verified=text_verified,
+        )
+
+    async def parse_question(text):
+        return object()
+
+    async def verify_answer(problem, answer):
+        return vision_verified
+
+    monkeypatch.setattr(solve, "solve_image_json", solve_image_json)
+    monkeypatch.setattr(solve, "_solve_question", solve_question)
+    monkeypatch.setattr(solve, "parse_question", parse_question)
+    monkeypatch.setattr(solve, "verify_answer", verify_answer)
+
+    async def main():
+        async def ocr():
+            return OCR, 0.9
+
+        ocr_task = asyncio.create_task(ocr())
+        await ocr_task
+        image = SimpleNamespace(data=b"", mime_type="image/png", pixels=None)
+        with event_sink(EventSink()) as sink:
+            resp = await solve._solve_image_concurrent(image, ocr_task)
+        return resp, [data.get("source") for event, data in sink.drain()]
+
+    return asyncio.run(main())
+
+
+def test_losing_text_run_emits_nothing(monkeypatch):
+    resp, sources = _race(monkeypatch, 0.01, 0.5, True, True)
+    assert resp.result["model"]["name"] == "vision"
+    assert sources == ["vision", None]  # vision's step, then its verify
+
+
+def test_winning_text_run_replays_its_events(monkeypatch):
+    resp, sources = _race(monkeypatch, 0.01, 0.05, False, True)
+    assert resp.result["final_answer"] == "x = 4"
+    assert sources == ["vision", None, "text"]
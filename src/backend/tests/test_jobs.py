@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import pytest
+
+from core.jobs import JobQueue, JobRejected, JobStore
+
+
+def _queue(tmp_path) -> JobQueue:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create("job-1", "owner", "text", b"{}")
+    return JobQueue(
+        store,
+        workers=1,
+        max_queued=10,
+        max_per_user=10,
+        timeout=10,
+        retention_seconds=60,
+    )
+
+
+def test_other_users_job_is_not_long_polled(tmp_path):
+    queue = _queue(tmp_path)
+    t0 = time.perf_counter()
+    assert asyncio.run(queue.get("job-1", wait=5, uid="intruder")) is None
+    assert time.perf_counter() - t0 < 1
+    assert "job-1" not in queue._done
+
+
+def test_owner_long_polls_until_the_wait_runs_out(tmp_path):
+    queue = _queue(tmp_path)
+    t0 = time.perf_counter()
+    job = asyncio.run(queue.get("job-1", wait=0.2, uid="owner"))
+    assert job["uid"] == "owner"
+    assert time.perf_counter() - t0 >= 0.2
+
+
+def _bare_queue(tmp_path, **kwargs) -> JobQueue:
+    limits = dict(workers=1, max_queued=10, max_per_user=10, timeout=10)
+    limits.update(kwargs)
+    return JobQueue(
+        JobStore(str(tmp_path / "jobs.sqlite3")), retention_seconds=60, **limits
+    )
+
+
+def test_store_is_opened_lazily(tmp_path):
+    JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert not list(tmp_path.iterdir())
+
+
+def test_users_are_served_round_robin(tmp_path):
+    async def main():
+        queue = _bare_queue(tmp_path)
+        order, gate = [], asyncio.Event()
+
+        async def handler(payload: bytes):
+            order.append(payload.decode())
+            await gate.wait()
+            return {}
+
+        queue.register("t", handler)
+        ids = [await queue.submit("a", "t", b"a1")]
+        await asyncio.sleep(0.1)  # a1 is running
+        for uid, name in (("a", "a2"), ("a", "a3"), ("b", "b1"), ("b", "b2")):
+            ids.append(await queue.submit(uid, "t", name.encode()))
+        gate.set()
+        for job_id in ids:
+            assert (await queue.get(job_id, wait=5))["status"] == "done"
+        await queue.stop()
+        return order
+
+    assert asyncio.run(main()) == ["a1", "a2", "b1", "a3", "b2"]
+
+
+def test_per_user_and_total_caps(tmp_path):
+    async def main():
+        queue = _bare_queue(tmp_path, max_queued=3, max_per_user=2)
+        gate = asyncio.Event()
+
+        async def handler(payload: bytes):
+            await gate.wait()
+            return {}
+
+        queue.register("t", handler)
+        await queue.submit("a", "t", b"")
+        await asyncio.sleep(0.1)  # running, still counts for a
+        await queue.submit("a", "t", b"")
+        with pytest.raises(JobRejected, match="per user"):
+            await queue.submit("a", "t", b"")
+        for uid in ("b", "c"):  # three queued, next to the running one
+            last = await queue.submit(uid, "t", b"")
+        with pytest.raises(JobRejected, match="full") as e:
+            await queue.submit("d", "t", b"")
+        assert e.value.retry_after >= 1
+        assert queue.stats()["rejected"] == 2
+        gate.set()
+        assert (await queue.get(last, wait=5))["status"] == "done"
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_recovery_requeues_only_expired_leases(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    other = JobStore(path)
+    for job_id in ("live", "dead", "queued"):
+        other.create(job_id, "u", "t", b"")
+    other.claim("live", "other-process")
+    other.claim("dead", "crashed-process")
+    other._conn().execute("UPDATE jobs SET lease_until = 0 WHERE id = 'dead'")
+
+    async def main():
+        queue = _bare_queue(tmp_path)
+        ran = []
+
+        async def handler(payload: bytes):
+            return {}
+
+        queue.register("t", handler)
+        real_run = queue._run
+
+        async def run(job_id):
+            ran.append(job_id)
+            await real_run(job_id)
+
+        queue._run = run
+        await queue.start()
+        for job_id in ("dead", "queued"):
+            assert (await queue.get(job_id, wait=5))["status"] == "done"
+        await queue.stop()
+        return queue.recovered, ran
+
+    recovered, ran = asyncio.run(main())
+    assert recovered == 2  # "dead" and "queued"
+    assert sorted(ran) == ["dead", "queued"]
+    assert other.get("live")["status"] == "running"
+
+
+def test_long_poll_sees_a_job_finished_by_another_process(tmp_path):
+    async def main():
+        queue = _queue(tmp_path)
+        other = JobStore(queue.store.path)
+        other.claim("job-1", "other-process")
+
+        async def finish_elsewhere():
+            await asyncio.sleep(0.3)
+            await asyncio.to_thread(other.finish, "job-1", "done", {"x": 1}, None, 200)
+
+        asyncio.create_task(finish_elsewhere())
+        t0 = time.perf_counter()
+        job = await queue.get("job-1", wait=10, uid="owner")
+        assert job["status"] == "done" and job["result"] == {"x": 1}
+        assert time.perf_counter() - t0 < 3
+        assert "job-1" not in queue._done
+
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+import pytest
+
+from providers.json_repair import repair_json
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"final_answer": "4"}', {"final_answer": "4"}),
+        ('Sure:\n```json\n{"final_answer": "4"}\n```', {"final_answer": "4"}),
+        ('Here it is: {"final_answer": "4"} Hope that helps!', {"final_answer": "4"}),
+        (
+            '{"final_answer": "4", "work": ["a", "b",],}',
+            {"final_answer": "4", "work": ["a", "b"]},
+        ),
+        ("{“final_answer”: “4”}", {"final_answer": "4"}),
+        (
+            '{"final_answer": "4", "verified": True, "difficulty": None,}',
+            {"final_answer": "4", "verified": True, "difficulty": None},
+        ),
+        (
+            '{"final_answer": "4", "work": ["x = 2", "y',
+            {"final_answer": "4", "work": ["x = 2", "y"]},
+        ),
+        ('{"final_answer": "4", "confidence":', {"final_answer": "4"}),
+    ],
+    ids=[
+        "plain",
+        "fence",
+        "prose",
+        "trailing-comma",
+        "smart-quotes",
+        "python",
+        "truncated",
+        "dangling-key",
+    ],
+)
+def test_repairs(text, expected):
+    assert repair_json(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, answer",
+    [
+        # LaTeX written with single backslashes
+        (r'{"final_answer": "\frac{1}{2}",}', r"\frac{1}{2}"),
+        (r'{"final_answer": "\theta = \pi",}', r"\theta = \pi"),
+        (
+            r'{"final_answer": "x \neq 0, \nabla f = \beta",}',
+            r"x \neq 0, \nabla f = \beta",
+        ),
+        (r'{"final_answer": "\underline{x} \right)",}', r"\underline{x} \right)"),
+        # Already escaped: kept as is
+        (r'{"final_answer": "\\frac{1}{2}", "confidence": 0.9,}', r"\frac{1}{2}"),
+        (r'{"final_answer": "\\theta = \\pi",}', r"\theta = \pi"),
+        (r'{"final_answer": "\\neq \\nabla",}', r"\neq \nabla"),
+        # Real JSON escapes still decode
+        (r'{"final_answer": "x = 2\nThen y = 3\t°",}', "x = 2\nThen y = 3\t°"),
+    ],
+)
+def test_latex_backslashes(text, answer):
+    assert repair_json(text)["final_answer"] == answer
+
+
+def test_unrecoverable():
+    assert repair_json("no json here") is None
+    assert repair_json('["a list"]') is None
@@ -0,0 +1,33 @@
+import pytest
+
+from reasoner.numcheck import check
+
+
+@pytest.mark.parametrize(
+    "question, answer",
+    [
+        ("Factor x^2+5x+6", "x^2+5x+6"),
+        ("Expand (x+1)^3", "(x+1)^3"),
+        ("Expand (x+1)(x-1)", "(x+1)(x-1)"),
+        ("Simplify (x^2-1)/(x-1)", "(x^2-1)/(x-1)"),
+    ],
+)
+def test_restating_the_question_is_not_verified(question, answer):
+    assert check(question, answer) is None
+
+
+@pytest.mark.parametrize(
+    "question, answer, verdict",
+    [
+        ("Factor x^2+5x+6", "(x+2)(x+3)", True),
+        ("Factor x^2+2x+1", "(x+1)^2", True),
+        ("Factor x^2+5x+6", "(x+2)(x+4)", False),
+        ("Expand (x+2)^3", "x^3 + 6x^2 + 12x + 8", True),
+        ("Expand (x+1)^3", "x^3+3x^2+3x+2", False),
+        ("Simplify (x^2-1)/(x-1)", "x+1", True),
+        ("Simplify 2x + 3x", "5x", True),
+        ("Simplify (x^2-1)/(x-1)", "x+2", False),
+    ],
+)
+def test_answers_in_the_asked_form(question, answer, verdict):
+    assert check(question, answer) is verdict
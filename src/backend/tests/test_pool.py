@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+
+from providers.pool import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    HealthRegistry,
+    ProviderHealth,
+    parse_fallbacks,
+)
+
+
+def _health(cooldown: float = 0.05) -> ProviderHealth:
+    return ProviderHealth("p:m", window=10, failures_to_open=2, cooldown=cooldown)
+
+
+def test_breaker_opens_then_probes_then_closes():
+    h = _health()
+    h.failure()
+    assert h.state == CLOSED and h.available()
+    h.failure()
+    assert h.state == OPEN and not h.available()
+    time.sleep(0.06)
+    assert h.available()
+    h.begin()
+    assert h.state == HALF_OPEN and not h.available()  # one probe at a time
+    h.success(0.1)
+    assert h.state == CLOSED and h.available()
+    assert h.trips == 1
+
+
+def test_failed_probe_reopens_and_released_probe_frees_the_slot():
+    h = _health()
+    h.failure()
+    h.failure()
+    time.sleep(0.06)
+    h.begin()
+    h.release()  # e.g. our own limiter refused the call
+    assert h.available()
+    h.begin()
+    h.failure()
+    assert h.state == OPEN and not h.available()
+    assert h.trips == 2
+
+
+def _llms(*names):
+    return [SimpleNamespace(provider="p", name=n) for n in names]
+
+
+def test_route_orders_new_then_fastest_then_tripped():
+    reg = HealthRegistry(window=10, failures_to_open=1, cooldown=60)
+    a, b, c, d = _llms("a", "b", "c", "d")
+    reg.get("p", "a").success(0.5)
+    reg.get("p", "b").success(0.1)
+    reg.get("p", "d").failure()  # tripped
+    assert [x.name for x in reg.route([a, b, c, d])] == ["c", "b", "a", "d"]
+
+
+def test_route_explores_another_candidate():
+    reg = HealthRegistry(window=10, failures_to_open=1, cooldown=60, explore=1.0)
+    a, b = _llms("a", "b")
+    reg.get("p", "a").success(0.1)
+    reg.get("p", "b").success(0.5)
+    assert [x.name for x in reg.route([a, b])] == ["b", "a"]
+    assert reg.explored == 1
+
+
+def test_parse_fallbacks():
+    assert parse_fallbacks("openai:gpt-4o-mini, ollama:qwen2.5:7b, junk") == [
+        ("openai", "gpt-4o-mini"),
+        ("ollama", "qwen2.5:7b"),
+    ]
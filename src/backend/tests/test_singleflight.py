@@ -0,0 +1,102 @@
+import asyncio
+
+from core.singleflight import SingleFlight
+
+
+class _Work:
+    """A computation the test finishes by hand, counting how often it starts."""
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self, value="done"):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(value, BaseException):
+            raise value
+        return value
+
+
+def test_concurrent_callers_share_one_task():
+    async def main():
+        flight, work = SingleFlight("test"), _Work()
+        callers = [asyncio.create_task(flight.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flight.stats() == {"in_flight": 1, "leaders": 1, "coalesced": 2}
+        work.release.set()
+        assert await asyncio.gather(*callers) == ["done"] * 3
+        assert work.started == 1
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_leader_cancel_leaves_the_task_to_the_others():
+    async def main():
+        flight, work = SingleFlight("test"), _Work()
+        leader = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert leader.cancelled() and not work.cancelled
+        work.release.set()
+        assert await follower == "done"
+        assert work.started == 1
+
+    asyncio.run(main())
+
+
+def test_last_waiter_cancel_cancels_the_task():
+    async def main():
+        flight, work = SingleFlight("test"), _Work()
+        callers = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for c in callers:
+            c.cancel()
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert work.cancelled
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_exception_reaches_every_waiter_and_frees_the_key():
+    async def main():
+        flight, work = SingleFlight("test"), _Work()
+        fn = lambda: work(ValueError("boom"))  # noqa: E731
+        callers = [asyncio.create_task(flight.do("k", fn)) for _ in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert [str(r) for r in results] == ["boom"] * 3
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.stats()["in_flight"] == 0
+
+        # The key is free: the next call runs the computation again.
+        work.release = asyncio.Event()
+        again = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        work.release.set()
+        assert await again == "done"
+        assert work.started == 2
+
+    asyncio.run(main())
+
+
+def test_different_keys_do_not_coalesce():
+    async def main():
+        flight, work = SingleFlight("test"), _Work()
+        work.release.set()
+        await asyncio.gather(flight.do("a", work), flight.do("b", work))
+        assert work.started == 2
+        assert flight.stats()["coalesced"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,14 @@
+import pytest
+
+from reasoner.cache import _canonical_sympy, solution_cache_key
+
+
+def test_equivalent_spellings_share_a_key():
+    assert solution_cache_key("x+1 = 3") == solution_cache_key("solve 1 + x=3")
+    assert solution_cache_key("x+1 = 3") != solution_cache_key("x+1 = 4")
+
+
+@pytest.mark.parametrize("text", ["input()", "globals()", "exit()", "open(x)"])
+def test_builtins_are_not_called(text):
+    name = text.split("(")[0]
+    assert _canonical_sympy(text).startswith(f"Function('{name}')(")
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from api.routers.solve import _event_stream
+from core.admission import user_quota
+from core.schemas import SolveResponse, Step
+from core.streaming import format_ndjson
+
+
+async def _collect(run, uid: str):
+    return [
+        json.loads(line)
+        async for line in _event_stream(run, format_ndjson, "text", uid)
+    ]
+
+
+def test_quota_held_while_the_body_streams():
+    seen = []
+
+    async def run():
+        seen.append(user_quota.stats()["in_flight"])
+        return SolveResponse(
+            final_answer="4", steps=[Step(title="Add", explanation="")], verified=True
+        )
+
+    events = asyncio.run(_collect(run, "stream-user"))
+    assert seen == [1]
+    assert events[-1]["event"] == "result"
+    assert user_quota.stats()["in_flight"] == 0
+
+
+def test_over_quota_is_an_error_event():
+    for _ in range(user_quota.max_concurrent):
+        user_quota.acquire("busy-user")
+    try:
+        events = asyncio.run(_collect(None, "busy-user"))
+    finally:
+        for _ in range(user_quota.max_concurrent):
+            user_quota.release("busy-user")
+    assert [e["event"] for e in events] == ["error"]
+    assert events[0]["data"]["status"] == 429
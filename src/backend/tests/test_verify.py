@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import fake_llm
+from core.executor import ExecutorBusy
+from reasoner import verify
+from reasoner.graph import _escalate_sequential
+from reasoner.numcheck import parse_problem
+
+QUESTION = "2x + 3 = 11"  # benchmarks.corpus, answer "x = 4"
+
+
+def _fake(name: str):
+    return fake_llm(name, median=0.001, sigma=0.0, accuracy=1.0, confidence=(0.9, 0.9))
+
+
+@pytest.mark.parametrize("error", [ExecutorBusy("queue full"), TimeoutError()])
+def test_unchecked_answer_is_undecided(monkeypatch, error):
+    async def overloaded(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(verify.cpu_pool, "run", overloaded)
+    problem = parse_problem(QUESTION)
+    assert asyncio.run(verify.verify_answer(problem, "x = 4")) is None
+
+
+def test_busy_pool_does_not_escalate(monkeypatch):
+    async def busy(*args, **kwargs):
+        raise ExecutorBusy("queue full")
+
+    monkeypatch.setattr(verify.cpu_pool, "run", busy)
+    base, strong = _fake("fake-base"), _fake("fake-strong")
+    res = asyncio.run(
+        _escalate_sequential(QUESTION, parse_problem(QUESTION), base, strong)
+    )
+    assert res["purpose"] == "base"
+    assert (res["verifiable"], res["verified"]) == (False, False)
+    assert (base._model.calls, strong._model.calls) == (1, 0)
@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    out = 0
+    for b in bits.flatten():
+        out = (out << 1) | int(b)
+    return out
+
+
+def phash(img: np.ndarray) -> int:
+    """64-bit DCT perceptual hash of a BGR or grayscale image."""
+    import cv2
+
+    g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(g, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    med = np.median(low.flatten()[1:])  # the DC term would skew the median
+    return _bits_to_int(low > med)
+
+
+def dhash(img: np.ndarray) -> int:
+    """64-bit horizontal-gradient hash of a BGR or grayscale image."""
+    import cv2
+
+    g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(g, (9, 8), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
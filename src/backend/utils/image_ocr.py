@@ -1,8 +1,19 @@
-from typing import Tuple
 import re
-import cv2
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Tuple
+
 import numpy as np
-import pytesseract
+import structlog
+
+from core.config import settings
+from core.executor import ExecutorBusy, cpu_pool
+from core.metrics import record_span
+
+log = structlog.get_logger(__name__)
 
 _MATH_LIKE_RE = re.compile(
     r"(=|[\+\-\*/^]|\\frac|\\sqrt|\\sum|\\int|\\lim|\\pi|\\theta|\\alpha|\\beta|\\le|\\ge|\\approx|\d)",
@@ -19,7 +30,11 @@ def _looks_like_math(text: str) -> bool:
     return bool(_MATH_LIKE_RE.search(s))
 
 
+# cv2, tesserocr and pytesseract are imported where used: they are only needed
+# in the CPU pool (whose workers preload them), not in the web process.
 def _preprocess(img: np.ndarray) -> np.ndarray:
+    import cv2
+
     g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     g = cv2.medianBlur(g, 3)
     thr = cv2.adaptiveThreshold(
@@ -28,15 +43,242 @@ def _preprocess(img: np.ndarray) -> np.ndarray:
     return thr
 
 
-async def extract_text(image_bytes: bytes) -> Tuple[str, str]:
-    """Lightweight OCR (Tesseract) used only as a weak hint for the Vision model."""
-    arr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+# Ink blobs smaller or flatter than this are speckle. Flat glyphs (minus, the
+# bars of "=") go too, but only for finding lines: OCR reads the whole box.
+_SPECK_PX = 12
+_SPECK_HEIGHT = 6
+
+
+def _text_lines(
+    binary: np.ndarray, max_lines: Optional[int] = None
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Boxes (x, y, w, h) of the text lines in a thresholded page, top to bottom.
+
+    Sizes follow the typical glyph height: specks well below it are dropped,
+    the remaining ink is smeared sideways by about a glyph so the symbols of a
+    line join into one blob, and blobs sharing most of their height (a line
+    with a wide gap) are merged unless one is a much shorter fragment. Only
+    the `max_lines` (default OCR_MAX_LINES) largest lines are kept.
+    """
+    import cv2
+
+    h, w = binary.shape[:2]
+    ink = cv2.bitwise_not(binary)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    glyph = (stats[:, cv2.CC_STAT_AREA] >= _SPECK_PX) & (heights >= _SPECK_HEIGHT)
+    glyph[0] = False  # background
+    if not glyph.any():
+        return []
+    glyph_h = float(np.median(heights[glyph]))
+    glyph &= heights >= 0.5 * glyph_h
+    ink = np.where(glyph[labels], 255, 0).astype(np.uint8)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, int(glyph_h)), 3))
+    contours, _ = cv2.findContours(
+        cv2.dilate(ink, kernel), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    boxes = sorted(
+        (b for b in map(cv2.boundingRect, contours) if b[3] >= 0.6 * glyph_h),
+        key=lambda b: b[1],
+    )
+    lines: List[List[int]] = []
+    for x, y, bw, bh in boxes:
+        for line in lines:
+            overlap = min(y + bh, line[1] + line[3]) - max(y, line[1])
+            if overlap >= 0.5 * min(bh, line[3]):
+                if bh < 0.6 * line[3]:
+                    break  # a fragment beside the line: keep it out of the box
+                x0, y0 = min(x, line[0]), min(y, line[1])
+                x1 = max(x + bw, line[0] + line[2])
+                y1 = max(y + bh, line[1] + line[3])
+                line[:] = [x0, y0, x1 - x0, y1 - y0]
+                break
+        else:
+            lines.append([x, y, bw, bh])
+    limit = settings.ocr_max_lines if max_lines is None else max_lines
+    if len(lines) > limit > 0:
+        lines = sorted(lines, key=lambda b: b[2] * b[3], reverse=True)
+        lines = sorted(lines[:limit], key=lambda b: b[1])
+    out = []
+    for x, y, bw, bh in lines:
+        pad = max(2, bh // 4)
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(w, x + bw + pad), min(h, y + bh + pad)
+        out.append((x0, y0, x1 - x0, y1 - y0))
+    return out
+
+
+class _EnginePool:
+    """
+    Initialised tesserocr engines, reused for every image in this process.
+
+    Loading the language model is most of the cost of a `tesseract` run, so an
+    engine is created once per concurrent caller (one per process worker, or
+    one per thread with CPU_EXECUTOR=thread) and handed back after each image.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle: List[Any] = []
+        self.created = 0
+
+    def _new(self) -> Any:
+        from tesserocr import PyTessBaseAPI
+
+        kwargs = {"lang": "eng"}
+        if settings.ocr_tessdata_path:
+            kwargs["path"] = settings.ocr_tessdata_path
+        api = PyTessBaseAPI(**kwargs)
+        if settings.ocr_char_whitelist:
+            api.SetVariable("tessedit_char_whitelist", settings.ocr_char_whitelist)
+        self.created += 1
+        return api
+
+    @contextmanager
+    def engine(self) -> Iterator[Any]:
+        with self._lock:
+            api = self._idle.pop() if self._idle else None
+        if api is None:
+            api = self._new()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            with self._lock:
+                self._idle.append(api)
+
+
+_engines = _EnginePool()
+
+
+@lru_cache(maxsize=1)
+def _engine_kind() -> str:
+    """ "tesserocr" or "pytesseract" for this process, per OCR_ENGINE."""
+    choice = settings.ocr_engine.lower()
+    if choice == "pytesseract":
+        return "pytesseract"
+    try:
+        with _engines.engine():
+            pass
+    except Exception as e:  # ImportError, or no traineddata under the path
+        if choice == "tesserocr":
+            raise
+        log.info("ocr.tesserocr_unavailable", error=str(e))
+        return "pytesseract"
+    return "tesserocr"
+
+
+def _read_lines_tesserocr(
+    binary: np.ndarray, lines: List[Tuple[int, int, int, int]]
+) -> List[str]:
+    """Each line box read from one image handed to a pooled engine."""
+    h, w = binary.shape[:2]
+    with _engines.engine() as api:
+        api.SetImageBytes(np.ascontiguousarray(binary).tobytes(), w, h, 1, w)
+        api.SetPageSegMode(settings.ocr_line_psm)
+        texts = []
+        for x, y, bw, bh in lines:
+            api.SetRectangle(x, y, bw, bh)
+            texts.append((api.GetUTF8Text() or "").strip())
+    return texts
+
+
+def _read_lines_pytesseract(
+    binary: np.ndarray, lines: List[Tuple[int, int, int, int]]
+) -> List[str]:
+    """One `tesseract` run over the region holding the lines, its words sorted
+    into the line boxes (the CLI cannot keep a model loaded, so reading line by
+    line would mean a fork per line)."""
+    import pytesseract
+
+    x0 = min(x for x, _, _, _ in lines)
+    y0 = min(y for _, y, _, _ in lines)
+    x1 = max(x + bw for x, _, bw, _ in lines)
+    y1 = max(y + bh for _, y, _, bh in lines)
+    psm = settings.ocr_line_psm if len(lines) == 1 else 6  # 6 = uniform block
+    config = f"--psm {psm}"
+    if settings.ocr_char_whitelist:
+        config += (
+            f" -c tessedit_char_whitelist={shlex.quote(settings.ocr_char_whitelist)}"
+        )
+    data = pytesseract.image_to_data(
+        binary[y0:y1, x0:x1],
+        lang="eng",
+        config=config,
+        output_type=pytesseract.Output.DICT,
+    )
+    words: List[List[str]] = [[] for _ in lines]
+    for word, top, height in zip(data["text"], data["top"], data["height"]):
+        if not word.strip():
+            continue
+        cy = y0 + top + height / 2
+        for i, (_, y, _, bh) in enumerate(lines):
+            if y <= cy < y + bh:
+                words[i].append(word.strip())
+                break
+    return [" ".join(ws) for ws in words]
+
+
+def _read_lines(
+    binary: np.ndarray, lines: List[Tuple[int, int, int, int]]
+) -> List[str]:
+    """The text of each box in `lines` (a thresholded page), "" where none."""
+    if not lines:
+        return []
+    if _engine_kind() == "tesserocr":
+        return _read_lines_tesserocr(binary, lines)
+    return _read_lines_pytesseract(binary, lines)
+
+
+def _extract_text_sync(image: bytes | np.ndarray) -> Tuple[str, str]:
+    import cv2
+
+    if isinstance(image, np.ndarray):
+        img = image
+    else:
+        img = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
     if img is None:
         return "", "decode-error"
     proc = _preprocess(img)
-    text = pytesseract.image_to_string(proc, lang="eng")
-    text = (text or "").strip()
+    lines = _text_lines(proc)
+    if not lines:
+        return "", "none"
+    text = "\n".join(t for t in _read_lines(proc, lines) if t).strip()
     if _looks_like_math(text):
         return text, "tesseract"
     return "", "none"
+
+
+def tesseract_version() -> str:
+    """Engine and Tesseract version; raises if neither engine is usable.
+
+    With tesserocr this also loads the pooled engine, so the startup probe
+    takes the model load off the first image."""
+    if _engine_kind() == "tesserocr":
+        import tesserocr
+
+        return "tesserocr " + tesserocr.tesseract_version().splitlines()[0]
+    import pytesseract
+
+    return "pytesseract " + str(pytesseract.get_tesseract_version())
+
+
+async def extract_text(image: bytes | np.ndarray) -> Tuple[str, str]:
+    """
+    Lightweight OCR (Tesseract) used only as a weak hint for the Vision model.
+
+    `image` is either encoded bytes or an already decoded BGR array (see
+    utils.image_prep), in which case no decoding happens here.
+    """
+    t0 = time.perf_counter()
+    try:
+        text, status = await cpu_pool.run(
+            _extract_text_sync, image, timeout=settings.ocr_timeout_seconds
+        )
+    except (TimeoutError, ExecutorBusy) as e:
+        log.warning("ocr.skipped", reason=type(e).__name__)
+        text, status = "", "timeout" if isinstance(e, TimeoutError) else "busy"
+    record_span("ocr", time.perf_counter() - t0, outcome=status)
+    return text, status
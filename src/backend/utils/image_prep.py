@@ -0,0 +1,238 @@
+import binascii
+import hashlib
+import io
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import structlog
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from core.config import settings
+from core.executor import cpu_pool
+from core.metrics import record_span
+from utils.image_hash import dhash, phash
+
+log = structlog.get_logger(__name__)
+
+_ENCODINGS = {
+    "jpeg": (".jpg", "image/jpeg"),
+    "png": (".png", "image/png"),
+    "webp": (".webp", "image/webp"),
+}
+# Leading bytes of the formats an upload may have, as Pillow names them
+_MAGIC = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+SNIFF_BYTES = 12
+_B64_CHUNK = 3 * 64 * 1024  # a multiple of 3, so chunks encode without padding
+_CROP_MARGIN = 0.02
+_CROP_MIN_INK_FRACTION = 0.0005
+_CROP_MIN_GAIN = 0.1
+
+
+class InvalidImage(ValueError):
+    """The upload could not be decoded as an image."""
+
+
+class PreparedImage:
+    """
+    An upload decoded once and normalized for OCR and vision.
+
+    `pixels` is the oriented, cropped, downscaled BGR array (what OCR reads);
+    `data` is the same picture re-encoded for the provider, with `mime_type`.
+    `phash` / `dhash` are 64-bit perceptual hashes of `pixels` and `digest`
+    the SHA-256 of its bytes. `origin` is where `pixels` starts in the
+    oriented upload and `scale` its downscale factor, so `upload_box` can map
+    boxes back onto the user's picture.
+    """
+
+    __slots__ = (
+        "pixels",
+        "data",
+        "mime_type",
+        "original_size",
+        "size",
+        "phash",
+        "dhash",
+        "digest",
+        "origin",
+        "scale",
+    )
+
+    def __init__(
+        self,
+        pixels: np.ndarray,
+        data: bytes,
+        mime_type: str,
+        original_size: Tuple[int, int],
+        origin: Tuple[int, int] = (0, 0),
+        scale: float = 1.0,
+    ) -> None:
+        self.pixels = pixels
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.size = (pixels.shape[1], pixels.shape[0])
+        self.phash = phash(pixels)
+        self.dhash = dhash(pixels)
+        self.digest = hashlib.sha256(np.ascontiguousarray(pixels)).hexdigest()
+        self.origin = origin
+        self.scale = scale
+
+    def upload_box(self, x: int, y: int, w: int, h: int) -> Tuple[int, int, int, int]:
+        """(x, y, w, h) in `pixels` as the same box in the oriented upload."""
+        s = self.scale
+        return (
+            round(self.origin[0] + x / s),
+            round(self.origin[1] + y / s),
+            round(w / s),
+            round(h / s),
+        )
+
+
+def sniff_format(head: bytes | memoryview) -> Optional[str]:
+    """The image format the first SNIFF_BYTES of an upload announce, or None."""
+    head = bytes(head[:SNIFF_BYTES])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+def data_url(data: bytes | memoryview, mime_type: str) -> str:
+    """
+    `data` as a base64 data URL, encoded chunk by chunk into one buffer that
+    becomes the string: no separate base64 bytes, decoded copy and formatted
+    copy of the whole image.
+    """
+    view = memoryview(data).cast("B")
+    head = f"data:{mime_type};base64,".encode("ascii")
+    out = bytearray(len(head) + 4 * ((len(view) + 2) // 3))
+    out[: len(head)] = head
+    pos = len(head)
+    for i in range(0, len(view), _B64_CHUNK):
+        chunk = binascii.b2a_base64(view[i : i + _B64_CHUNK], newline=False)
+        out[pos : pos + len(chunk)] = chunk
+        pos += len(chunk)
+    return out.decode("ascii")
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB, with any transparency composited onto white: dropping alpha turns
+    the transparent background of a PNG with black text black as well."""
+    if img.mode in ("RGBA", "LA", "PA", "La", "RGBa") or "transparency" in img.info:
+        rgba = img.convert("RGBA")
+        page = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        return Image.alpha_composite(page, rgba).convert("RGB")
+    return img.convert("RGB")
+
+
+# cv2 is imported inside the functions that use it: they run in the CPU pool,
+# whose workers preload it, so the web process never has to.
+def _decode(raw: bytes | memoryview) -> Tuple[np.ndarray, Tuple[int, int]]:
+    import cv2
+
+    fmt = sniff_format(raw)
+    try:
+        with Image.open(io.BytesIO(raw), formats=[fmt] if fmt else None) as img:
+            original_size = img.size
+            img = ImageOps.exif_transpose(img)
+            rgb = np.asarray(_flatten(img))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage(str(e)) from None
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), original_size
+
+
+def _content_box(img: np.ndarray) -> Tuple[int, int, int, int] | None:
+    """Bounding box (x0, y0, x1, y1) of the ink on the page, or None to keep all."""
+    import cv2
+
+    h, w = img.shape[:2]
+    g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    g = cv2.medianBlur(g, 3)
+    ink = cv2.adaptiveThreshold(
+        g, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 15
+    )
+    ink = cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    if cv2.countNonZero(ink) < _CROP_MIN_INK_FRACTION * h * w:
+        return None
+    x, y, bw, bh = cv2.boundingRect(ink)
+    mx, my = int(w * _CROP_MARGIN), int(h * _CROP_MARGIN)
+    x0, y0 = max(0, x - mx), max(0, y - my)
+    x1, y1 = min(w, x + bw + mx), min(h, y + bh + my)
+    if (x1 - x0) * (y1 - y0) > (1 - _CROP_MIN_GAIN) * h * w:
+        return None
+    return x0, y0, x1, y1
+
+
+def _downscale(img: np.ndarray, max_edge: int) -> np.ndarray:
+    import cv2
+
+    h, w = img.shape[:2]
+    edge = max(h, w)
+    if max_edge <= 0 or edge <= max_edge:
+        return img
+    scale = max_edge / edge
+    return cv2.resize(
+        img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA
+    )
+
+
+def _encode(img: np.ndarray, fmt: str, quality: int) -> Tuple[bytes, str]:
+    import cv2
+
+    ext, mime = _ENCODINGS.get(fmt, _ENCODINGS["jpeg"])
+    params = []
+    if ext == ".jpg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif ext == ".webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+    ok, buf = cv2.imencode(ext, img, params)
+    if not ok:
+        raise InvalidImage(f"could not encode image as {fmt}")
+    return buf.tobytes(), mime
+
+
+def prepare_image_sync(raw: bytes | memoryview) -> PreparedImage:
+    """Decode (honouring EXIF orientation), crop to content, downscale, re-encode."""
+    img, original_size = _decode(raw)
+    origin = (0, 0)
+    if settings.image_crop_to_content:
+        box = _content_box(img)
+        if box is not None:
+            x0, y0, x1, y1 = box
+            img = np.ascontiguousarray(img[y0:y1, x0:x1])
+            origin = (x0, y0)
+    width = img.shape[1]
+    img = _downscale(img, settings.image_max_edge)
+    data, mime = _encode(img, settings.image_encode_format, settings.image_quality)
+    return PreparedImage(
+        img, data, mime, original_size, origin=origin, scale=img.shape[1] / width
+    )
+
+
+async def prepare_image(raw: bytes | memoryview) -> PreparedImage:
+    """`prepare_image_sync` on the CPU pool."""
+    t0 = time.perf_counter()
+    prepared = await cpu_pool.run(
+        prepare_image_sync, raw, timeout=settings.image_prep_timeout_seconds
+    )
+    record_span("image.prepare", time.perf_counter() - t0)
+    log.debug(
+        "image.prepared",
+        original_size=prepared.original_size,
+        size=prepared.size,
+        mime=prepared.mime_type,
+        in_bytes=len(raw),
+        out_bytes=len(prepared.data),
+    )
+    return prepared
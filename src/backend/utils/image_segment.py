@@ -0,0 +1,166 @@
+"""
+Worksheet segmentation: split a page photo into its numbered problems.
+
+Text lines come from the OCR layer (utils.image_ocr); only the start of each
+line is read. A line can open a problem when it begins with a number label
+("3.", "3)", "Problem 3:", "Bài 3."); "(3)" marks an answer choice, as in
+reasoner.graph._extract_options, and does not. OCR misreads some labels, so
+the labels kept are the longest increasing run among the candidates rather
+than every match. A problem is the run of lines up to the next label, cropped
+and encoded as its own PreparedImage so it can take the /solve-image path.
+Pages with fewer than two labels stay one region.
+"""
+
+import re
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from core.config import settings
+from core.executor import ExecutorBusy, cpu_pool
+from core.metrics import record_span
+from utils.image_ocr import _preprocess, _read_lines, _text_lines
+from utils.image_prep import PreparedImage, _encode
+
+log = structlog.get_logger(__name__)
+
+# An optional word ("Problem", "Bài", or what OCR makes of it), the number and
+# its delimiter; group 2 is a digit right after the delimiter.
+_LABEL_RE = re.compile(
+    r"^(?:[^\W\d_]{1,9}\.?[\s'’‘`\"]*)?(\d{1,2})[\s'’‘`]*[.):,'’](\s*\d)?"
+)
+# What OCR makes of specks before a label; "(" and "[" open answer choices.
+_NOISE_RE = re.compile(r"^(?:[^\w(\[]|_)+")
+_LABEL_READ = 6  # how much of a line start is read for its label, in line heights
+
+
+class Region:
+    """One problem: its printed label (None when the page is not numbered),
+    its box (x, y, w, h) in the page's `pixels`, and the cropped image."""
+
+    __slots__ = ("label", "box", "image")
+
+    def __init__(
+        self,
+        label: Optional[str],
+        box: Tuple[int, int, int, int],
+        image: PreparedImage,
+    ) -> None:
+        self.label = label
+        self.box = box
+        self.image = image
+
+
+def _candidates(text: str) -> List[Tuple[int, bool]]:
+    """
+    (number, tight) readings of the label `text` starts with, if any. `tight`
+    is a label run into a digit ("4.3(x-2)", OCR dropping the space), which
+    could be a decimal. A speck before the label can read as a digit, so
+    "21." is also taken as 1.
+    """
+    m = _LABEL_RE.match(_NOISE_RE.sub("", text))
+    if m is None:
+        return []
+    digits, tight = m.group(1), m.group(2) is not None
+    out = [(int(digits), tight)]
+    if len(digits) == 2 and digits[1] != "0":
+        out.append((int(digits[1]), tight))
+    return out
+
+
+def _labels(texts: List[str]) -> List[Tuple[int, int]]:
+    """
+    (line index, number) of the problem labels among line starts `texts`.
+
+    Chooses the most labels that increase down the page, then the fewest
+    skipped numbers. A tight label only counts as the very next number after
+    the one before it (or as 1 at the top).
+    """
+    nodes = [(i, n, t) for i, text in enumerate(texts) for n, t in _candidates(text)]
+    best: List[Tuple[int, int]] = []  # per node: (labels, -skipped)
+    prev: List[Optional[int]] = []
+    for k, (i, n, tight) in enumerate(nodes):
+        score, back = ((1, 0), None) if not tight or n == 1 else ((0, 0), None)
+        for j in range(k):
+            pi, pn, _ = nodes[j]
+            if pi >= i or pn >= n or best[j][0] == 0 or (tight and n != pn + 1):
+                continue
+            cand = (best[j][0] + 1, best[j][1] - (n - pn - 1))
+            if cand > score:
+                score, back = cand, j
+        best.append(score)
+        prev.append(back)
+    if not nodes or max(best)[0] == 0:
+        return []
+    k: Optional[int] = max(range(len(nodes)), key=lambda k: best[k])
+    out = []
+    while k is not None:
+        out.append(nodes[k][:2])
+        k = prev[k]
+    return out[::-1]
+
+
+def _crop(page: PreparedImage, lines: List[Tuple[int, int, int, int]]) -> Region:
+    h, w = page.pixels.shape[:2]
+    margin = max(4, min(bh for _, _, _, bh in lines) // 2)
+    x0 = max(0, min(x for x, _, _, _ in lines) - margin)
+    y0 = max(0, min(y for _, y, _, _ in lines) - margin)
+    x1 = min(w, max(x + bw for x, _, bw, _ in lines) + margin)
+    y1 = min(h, max(y + bh for _, y, _, bh in lines) + margin)
+    pixels = np.ascontiguousarray(page.pixels[y0:y1, x0:x1])
+    data, mime = _encode(pixels, settings.image_encode_format, settings.image_quality)
+    ox, oy, _, _ = page.upload_box(x0, y0, 0, 0)
+    image = PreparedImage(
+        pixels, data, mime, page.original_size, origin=(ox, oy), scale=page.scale
+    )
+    return Region(None, (x0, y0, x1 - x0, y1 - y0), image)
+
+
+def segment_sync(page: PreparedImage) -> List[Region]:
+    """The problems on `page`, top to bottom; [] when it holds no text."""
+    binary = _preprocess(page.pixels)
+    lines = _text_lines(binary, max_lines=settings.segment_max_lines)
+    if not lines:
+        return []
+    starts = [(x, y, min(w, _LABEL_READ * h), h) for x, y, w, h in lines]
+    heads = _labels(_read_lines(binary, starts))
+    if len(heads) < 2:
+        h, w = page.pixels.shape[:2]
+        return [Region(None, (0, 0, w, h), page)]
+
+    regions = []
+    if heads[0][0] > 0 and heads[0][1] > 1:
+        # Lines above the first label when an earlier number went unread
+        # (above label 1 they are a title).
+        regions.append(_crop(page, lines[: heads[0][0]]))
+    for k, (i, n) in enumerate(heads):
+        end = heads[k + 1][0] if k + 1 < len(heads) else len(lines)
+        region = _crop(page, lines[i:end])
+        region.label = str(n)
+        regions.append(region)
+    return regions
+
+
+async def segment(page: PreparedImage) -> List[Region]:
+    """`segment_sync` on the CPU pool. Without a working OCR engine the page
+    is one region; a timeout or a full pool is the caller's to handle."""
+    t0 = time.perf_counter()
+    try:
+        regions = await cpu_pool.run(
+            segment_sync, page, timeout=settings.ocr_timeout_seconds
+        )
+    except (TimeoutError, ExecutorBusy):
+        raise
+    except Exception as e:
+        log.warning("image.segment_failed", error=str(e))
+        h, w = page.pixels.shape[:2]
+        regions = [Region(None, (0, 0, w, h), page)]
+    record_span("image.segment", time.perf_counter() - t0)
+    log.debug(
+        "image.segmented",
+        regions=len(regions),
+        labels=[r.label for r in regions],
+    )
+    return regions